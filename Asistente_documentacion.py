@@ -1,315 +1,536 @@
 # Asistente_documentacion.py
 # Asistente interactivo para consultar la documentación del proyecto Tienda Aurelion
+#
+# Las cifras (estadísticas, métricas del modelo, gráficos) salen de los
+# resultados que guarda proyecto_Aurelion.py (ver aurelion_resultados.py); el
+# asistente nunca vuelve a correr el análisis. La búsqueda usa un índice
+# invertido de Documentacion.md y de los textos de los menús guardado en
+# .cache_aurelion/indice_documentacion.json, que se rehace sólo si cambió
+# alguno de los dos.
+#
+# Uso no interactivo:
+#   python Asistente_documentacion.py --listar
+#   python Asistente_documentacion.py --seccion 5.1 6.7
+#   python Asistente_documentacion.py --seccion doc:5.5 --json
+#   python Asistente_documentacion.py --buscar "ticket promedio"
 
-# Librerías
+from __future__ import annotations
 
-from IPython.display import Image, display
+import argparse
+import bisect
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import unicodedata
+from pathlib import Path
+from typing import Any, Callable, NamedTuple
 
-# MENU PRINCIPAL
+from aurelion_resultados import CACHE_DIR_NOMBRE, GRAFICOS, cargar_resultados
 
-def menu_principal():
-    while True:
-        print("\n=== DOCUMENTACIÓN DEL PROYECTO - TIENDA AURELION ===")
-        print("Bienvenidos/as al asistente interactivo de documentación\n")
-        print("1. Planteamiento General")
-        print("2. Base de Datos")
-        print("3. Programa en Python")
-        print("4. Sugerencias Copilot")
-        print("5. Alcance de análisis estadístico")
-        print("6. Modelo de Machine Learning")
-        print("0. Salir")
-        opcion = input("\nSeleccione una opción: ")
+BASE_DIR = Path(__file__).resolve().parent
+DOCUMENTACION = BASE_DIR / "Documentacion.md"
+INDICE_NOMBRE = "indice_documentacion.json"
+VERSION_INDICE = 1
 
-        if opcion == "1":
-            menu_planteamiento()
-        elif opcion == "2":
-            menu_base_datos()
-        elif opcion == "3":
-            menu_programa()
-        elif opcion == "4":
-            menu_copilot()
-        elif opcion == "5":
-            menu_estadisticas()
-        elif opcion == "6":
-            menu_modelo_ml()
-        elif opcion == "0":
-            print("\nCerrando el asistente.")
-            break
-        else:
-            print("Opción no válida. Intente nuevamente.")
+# Carpeta de resultados del análisis; --resultados la cambia
+resultados_dir = BASE_DIR
 
-# 1. PLANTEAMIENTO GENERAL
+# IMÁGENES
+# En un notebook se muestran con IPython; en la terminal sólo se indica la
+# ruta, sin importar IPython.
 
-def menu_planteamiento():
-    while True:
-        print("\n1. PLANTEAMIENTO GENERAL")
-        print("1. Tema")
-        print("2. Problema")
-        print("3. Solución")
-        print("0. Volver al menú principal")
-        opcion = input("\nSeleccione una opción: ")
+def ruta_imagen(nombre):
+    """Los gráficos están en la carpeta de resultados; el diagrama, junto al script."""
+    for carpeta in (resultados_dir, BASE_DIR):
+        if (carpeta / nombre).exists():
+            return carpeta / nombre
+    return None
 
-        if opcion == "1":
-            print("\nTEMA:")
-            print(
-                "Análisis del comportamiento de compra de los clientes en Tienda Aurelion, "
-                "con el objetivo de identificar patrones que optimicen la experiencia de compra "
-                "y el valor promedio por cliente, a partir de las ventas registradas entre enero "
-                "y junio de 2024, utilizando la base de datos de Clientes, Ventas, Detalle_ventas "
-                "y Productos."
-            )
-        elif opcion == "2":
-            print("\nPROBLEMA:")
-            print(
-                "En Tienda Aurelion no se cuenta con un análisis que permita comprender los factores "
-                "que determinan el valor promedio de compra. La falta de métricas consolidadas dificulta "
-                "la toma de decisiones comerciales y estratégicas, como la planificación de promociones, "
-                "la definición de productos complementarios y la fidelización de clientes con mayor potencial de gasto."
-            )
-        elif opcion == "3":
-            print("\nSOLUCIÓN:")
-            print(
-                "Se desarrolla una herramienta analítica interactiva en Python que integra y analiza los datos de Clientes, "
-                "Ventas, Detalle_ventas y Productos. El sistema identifica patrones de compra, calcula indicadores como el ticket "
-                "promedio por cliente o producto y ofrece una visión integral del rendimiento comercial. Con esta información, la "
-                "empresa puede diseñar estrategias más efectivas, optimizar promociones y fortalecer la relación con sus clientes clave."
-            )
-        elif opcion == "0":
-            break
-        else:
-            print("Opción no válida.")
 
-# 2. BASE DE DATOS
+def mostrar_imagen(nombre):
+    ruta = ruta_imagen(nombre)
+    if ruta is None:
+        print(f"[Imagen no disponible: {nombre}; ejecute proyecto_Aurelion.py]")
+        return
+    ipython = sys.modules.get("IPython")
+    if ipython is None or ipython.get_ipython() is None:
+        print(f"[Imagen: {ruta}]")
+        return
+    from IPython.display import Image, display
 
-def menu_base_datos():
-    while True:
-        print("\n2. BASE DE DATOS")
-        print("1. Fuente")
-        print("2. Definición")
-        print("3. Estructura")
-        print("4. Tipos")
-        print("5. Escala")
-        print("0. Volver al menú principal")
-        opcion = input("\nSeleccione una opción: ")
+    display(Image(filename=str(ruta)))
 
-        if opcion == "1":
-            print("\nFUENTE:")
-            print(
-                "Los datos provienen de los archivos Clientes.xlsx, Ventas.xlsx, Detalle_ventas.xlsx "
-                "y Productos.xlsx, brindados por el programa Fundamentos en Inteligencia Artificial – IBM SkillsBuild & Guayerd (2025)."
-            )
-        elif opcion == "2":
-            print("\nDEFINICIÓN:")
-            print(
-                "La base de datos integra los registros de clientes, productos y ventas realizadas entre enero y junio de 2024. "
-                "Su propósito es centralizar los datos necesarios para analizar el ticket promedio, la frecuencia de compra y los patrones de consumo."
-            )
-        elif opcion == "3":
-            print("\nESTRUCTURA:")
-            print("El modelo está compuesto por cuatro tablas principales: \n")
-            print("- Clientes: información de identificación y ubicación de cada cliente.\n"
-                  "- Ventas: registro de transacciones y métodos de pago.\n"
-                  "- Detalle_ventas: detalle de los productos vendidos en cada operación.\n"
-                  "- Productos: catálogo de artículos, categorías y precios.\n\n"
-                  "Las tablas se relacionan mediante claves primarias y foráneas:\n"
-                  "- id_cliente (Clientes → Ventas)\n"
-                  "- id_venta (Ventas → Detalle_ventas)\n"
-                  "- id_producto (Productos → Detalle_ventas)")
-        elif opcion == "4":
-            print("\nTIPOS:")
-            print(
-                "Los datos son estructurados y almacenados en formato .xlsx. Incluyen variables numéricas, "
-                "de texto y de fecha, adecuadas para su procesamiento en Python."
-            )
-        elif opcion == "5":
-            print("\nESCALA:")
-            print("- Nominal: nombres, categorías, medios de pago.\n"
-                  "- Intervalo: fechas de ventas y registro de clientes.\n"
-                  "- Razón: precios, cantidades e importes.")
-        elif opcion == "0":
-            break
-        else:
-            print("Opción no válida.")
+# RESULTADOS DEL ANÁLISIS
 
-# 3. PROGRAMA EN PYTHON
+def _sin_resultados():
+    return (f"[Sin resultados del análisis en {resultados_dir}; "
+            "ejecute proyecto_Aurelion.py para generarlos.]\n")
 
-def menu_programa():
-    while True:
-        print("\n3. PROGRAMA EN PYTHON")
-        print("1. Pasos")
-        print("2. Pseudocódigo")
-        print("3. Diagrama")
-        print("0. Volver al menú principal")
-        opcion = input("\nSeleccione una opción: ")
 
-        if opcion == "1":
-            print("\nPASOS:")
-            print(
-                "1. Detectar y cargar las fuentes de datos, priorizando archivos .xlsx y aceptando .csv como respaldo.\n"
-                "2. Normalizar nombres/tipos, eliminar duplicados y registros con claves faltantes, asegurar valores positivos y recalcular importes faltantes.\n"
-                "3. Unificar Detalle_ventas con Productos y Clientes para construir ventas_detalle.\n"
-                "4. Exportar las fuentes a CSV y guardar versiones *_limpio.csv depuradas.\n"
-                "5. Calcular métricas descriptivas: resumen general, ticket por venta/cliente e importe por categoría.\n"
-                "6. Generar visualizaciones: distribución del ticket, ventas por medio de pago y matriz de correlación.\n"
-                "7. Guardar las métricas en CSV e imprimir el resumen general en consola."
-            )
-        elif opcion == "2":
-            print("\nPSEUDOCÓDIGO:")
-            print("INICIO\n"
-                  "      ESCRIBIR \"=== ANÁLISIS DE VENTAS - TIENDA AURELION ===\"\n"
-                  "      ESCRIBIR \"Cargando datos...\"\n\n"
-                  "      // 1. CARGA DE DATOS \n"
-                  "      LEER CLIENTES.xlsx/CSV, VENTAS.xlsx/CSV, DETALLE_VENTAS.xlsx/CSV, PRODUCTOS.xlsx/CSV\n\n"
-                  "      // 2. LIMPIEZA Y TIPOS\n"
-                  "      NORMALIZAR columnas, convertir fechas y montos\n"
-                  "      ELIMINAR duplicados y registros sin claves\n"
-                  "      RECALCULAR importes faltantes\n\n"
-                  "      // 3. UNIFICACIÓN\n"
-                  "      UNIR detalle + productos por id_producto\n"
-                  "      UNIR con clientes por id_cliente → ventas_detalle\n\n"
-                  "      // 4. EXPORTACIONES\n"
-                  "      GUARDAR fuentes en CSV\n"
-                  "      GUARDAR archivos *_limpio.csv\n\n"
-                  "      // 5. MÉTRICAS\n"
-                  "      CALCULAR resumen_general, ticket_por_venta, ticket_por_cliente, importe_por_categoria\n\n"
-                  "      // 6. VISUALIZACIONES\n"
-                  "      GENERAR histograma, gráfico por medio de pago y heatmap de correlaciones\n\n"
-                  "      // 7. SALIDAS\n"
-                  "      EXPORTAR CSV de métricas y correlaciones\n"
-                  "      IMPRIMIR resumen_general\n\n"
-                  "FIN")
-        elif opcion == "3":
-            print("\nDIAGRAMA:")
-            display(Image(filename='Diagrama.png'))
-        elif opcion == "0":
-            break
+def detalle_estadisticas(resultados):
+    resumen = (resultados or {}).get("resumen_general")
+    if not resumen:
+        return _sin_resultados()
+    lineas = [
+        f"- Ventas registradas: {resumen['ventas_registradas']:,.0f}",
+        f"- Monto total vendido: S/ {resumen['monto_total']:,.0f}",
+        f"- Ticket promedio por venta: S/ {resumen['ticket_promedio']:,.2f}",
+        f"- Productos distintos vendidos: {resumen['productos_distintos']:,.0f}",
+        f"- Clientes distintos: {resumen['clientes_distintos']:,.0f}",
+    ]
+    categorias = resultados.get("importe_por_categoria")
+    if categorias:
+        lineas.append("- Importe por categoría: " + ", ".join(
+            f"{categoria} S/ {importe:,.0f}" for categoria, importe in categorias.items()))
+    lineas.append(f"(resultados del {resultados['generado']})\n")
+    return "\n".join(lineas)
+
+
+def detalle_predicciones(resultados):
+    modelo = (resultados or {}).get("modelo")
+    if not modelo:
+        return _sin_resultados()
+    metricas = modelo["metricas"]
+    lineas = [f"Modelo v{modelo['version']} entrenado el {modelo['creado']} "
+              f"con {modelo['filas_entrenamiento']:,} filas."]
+    if "r2" in metricas:
+        lineas.append(f"- R^2: {metricas['r2']:.2f}")
+    if "mae" in metricas:
+        lineas.append(f"- MAE: S/ {metricas['mae']:,.2f}")
+    lineas.append("\nimporte ≈ " + " ".join(
+        [f"{modelo['intercepto']:,.2f}"]
+        + [f"{'+' if c >= 0 else '-'} {abs(c):,.2f}·{columna}" for columna, c in modelo["coeficientes"].items()]
+    ) + "\n")
+    return "\n".join(lineas)
+
+
+def detalle_graficos(resultados):
+    graficos = (resultados or {}).get("graficos")
+    if not graficos:
+        return _sin_resultados()
+    return "Gráficos generados en la última ejecución:\n" + "\n".join(f"- {g}" for g in graficos) + "\n"
+
+# SECCIONES
+# clave: "<menú>.<opción>", la misma numeración que los menús
+
+class Seccion(NamedTuple):
+    clave: str
+    opcion: str
+    titulo: str
+    texto: str
+    imagenes: tuple[str, ...] = ()
+    detalle: Callable[[dict[str, Any] | None], str] | None = None
+
+
+MENUS = {
+    "1": "PLANTEAMIENTO GENERAL",
+    "2": "BASE DE DATOS",
+    "3": "PROGRAMA EN PYTHON",
+    "4": "SUGERENCIAS COPILOT",
+    "5": "ALCANCE DE ANÁLISIS ESTADÍSTICO",
+    "6": "MODELO DE MACHINE LEARNING",
+}
+
+SECCIONES = [
+    # 1. PLANTEAMIENTO GENERAL
+    Seccion("1.1", "Tema", "TEMA",
+            "Análisis del comportamiento de compra de los clientes en Tienda Aurelion, "
+            "con el objetivo de identificar patrones que optimicen la experiencia de compra "
+            "y el valor promedio por cliente, a partir de las ventas registradas entre enero "
+            "y junio de 2024, utilizando la base de datos de Clientes, Ventas, Detalle_ventas "
+            "y Productos."),
+    Seccion("1.2", "Problema", "PROBLEMA",
+            "En Tienda Aurelion no se cuenta con un análisis que permita comprender los factores "
+            "que determinan el valor promedio de compra. La falta de métricas consolidadas dificulta "
+            "la toma de decisiones comerciales y estratégicas, como la planificación de promociones, "
+            "la definición de productos complementarios y la fidelización de clientes con mayor potencial de gasto."),
+    Seccion("1.3", "Solución", "SOLUCIÓN",
+            "Se desarrolla una herramienta analítica interactiva en Python que integra y analiza los datos de Clientes, "
+            "Ventas, Detalle_ventas y Productos. El sistema identifica patrones de compra, calcula indicadores como el ticket "
+            "promedio por cliente o producto y ofrece una visión integral del rendimiento comercial. Con esta información, la "
+            "empresa puede diseñar estrategias más efectivas, optimizar promociones y fortalecer la relación con sus clientes clave."),
+
+    # 2. BASE DE DATOS
+    Seccion("2.1", "Fuente", "FUENTE",
+            "Los datos provienen de los archivos Clientes.xlsx, Ventas.xlsx, Detalle_ventas.xlsx "
+            "y Productos.xlsx, brindados por el programa Fundamentos en Inteligencia Artificial – IBM SkillsBuild & Guayerd (2025)."),
+    Seccion("2.2", "Definición", "DEFINICIÓN",
+            "La base de datos integra los registros de clientes, productos y ventas realizadas entre enero y junio de 2024. "
+            "Su propósito es centralizar los datos necesarios para analizar el ticket promedio, la frecuencia de compra y los patrones de consumo."),
+    Seccion("2.3", "Estructura", "ESTRUCTURA",
+            "El modelo está compuesto por cuatro tablas principales: \n\n"
+            "- Clientes: información de identificación y ubicación de cada cliente.\n"
+            "- Ventas: registro de transacciones y métodos de pago.\n"
+            "- Detalle_ventas: detalle de los productos vendidos en cada operación.\n"
+            "- Productos: catálogo de artículos, categorías y precios.\n\n"
+            "Las tablas se relacionan mediante claves primarias y foráneas:\n"
+            "- id_cliente (Clientes → Ventas)\n"
+            "- id_venta (Ventas → Detalle_ventas)\n"
+            "- id_producto (Productos → Detalle_ventas)"),
+    Seccion("2.4", "Tipos", "TIPOS",
+            "Los datos son estructurados y almacenados en formato .xlsx. Incluyen variables numéricas, "
+            "de texto y de fecha, adecuadas para su procesamiento en Python."),
+    Seccion("2.5", "Escala", "ESCALA",
+            "- Nominal: nombres, categorías, medios de pago.\n"
+            "- Intervalo: fechas de ventas y registro de clientes.\n"
+            "- Razón: precios, cantidades e importes."),
+
+    # 3. PROGRAMA EN PYTHON
+    Seccion("3.1", "Pasos", "PASOS",
+            "1. Detectar y cargar las fuentes de datos, priorizando archivos .xlsx y aceptando .csv como respaldo.\n"
+            "2. Normalizar nombres/tipos, eliminar duplicados y registros con claves faltantes, asegurar valores positivos y recalcular importes faltantes.\n"
+            "3. Unificar Detalle_ventas con Productos y Clientes para construir ventas_detalle.\n"
+            "4. Exportar las fuentes a CSV y guardar versiones *_limpio.csv depuradas.\n"
+            "5. Calcular métricas descriptivas: resumen general, ticket por venta/cliente e importe por categoría.\n"
+            "6. Generar visualizaciones: distribución del ticket, ventas por medio de pago y matriz de correlación.\n"
+            "7. Guardar las métricas en CSV e imprimir el resumen general en consola."),
+    Seccion("3.2", "Pseudocódigo", "PSEUDOCÓDIGO",
+            "INICIO\n"
+            "      ESCRIBIR \"=== ANÁLISIS DE VENTAS - TIENDA AURELION ===\"\n"
+            "      ESCRIBIR \"Cargando datos...\"\n\n"
+            "      // 1. CARGA DE DATOS \n"
+            "      LEER CLIENTES.xlsx/CSV, VENTAS.xlsx/CSV, DETALLE_VENTAS.xlsx/CSV, PRODUCTOS.xlsx/CSV\n\n"
+            "      // 2. LIMPIEZA Y TIPOS\n"
+            "      NORMALIZAR columnas, convertir fechas y montos\n"
+            "      ELIMINAR duplicados y registros sin claves\n"
+            "      RECALCULAR importes faltantes\n\n"
+            "      // 3. UNIFICACIÓN\n"
+            "      UNIR detalle + productos por id_producto\n"
+            "      UNIR con clientes por id_cliente → ventas_detalle\n\n"
+            "      // 4. EXPORTACIONES\n"
+            "      GUARDAR fuentes en CSV\n"
+            "      GUARDAR archivos *_limpio.csv\n\n"
+            "      // 5. MÉTRICAS\n"
+            "      CALCULAR resumen_general, ticket_por_venta, ticket_por_cliente, importe_por_categoria\n\n"
+            "      // 6. VISUALIZACIONES\n"
+            "      GENERAR histograma, gráfico por medio de pago y heatmap de correlaciones\n\n"
+            "      // 7. SALIDAS\n"
+            "      EXPORTAR CSV de métricas y correlaciones\n"
+            "      IMPRIMIR resumen_general\n\n"
+            "FIN"),
+    Seccion("3.3", "Diagrama", "DIAGRAMA", "Diagrama de flujo del programa.", ("Diagrama.png",)),
+
+    # 4. SUGERENCIAS COPILOT
+    Seccion("4.1", "Sugerencias aceptadas", "ACEPTADAS",
+            "- Corrección de ortografía y redacción.\n"
+            "- Detalle con precisión de la base de datos.\n"
+            "- División por secciones."),
+    Seccion("4.2", "Sugerencias descartadas", "DESCARTADAS",
+            "- Uso de minúsculas en el pseudocódigo.\n"
+            "- Archivo de requisitos.txt.\n"
+            "- Reglas de validación de los datos."),
+
+    # 5. ALCANCE DE ANÁLISIS ESTADÍSTICO
+    Seccion("5.1", "Estadísticas descriptivas", "ESTADÍSTICAS DESCRIPTIVAS",
+            "Interpretación: ventas de alto valor con pocas transacciones, lo que eleva el ticket promedio.",
+            detalle=detalle_estadisticas),
+    Seccion("5.2", "Distribución de variables principales", "DISTRIBUCIÓN DE VARIABLES PRINCIPALES",
+            "- El histograma del ticket por venta está sesgado a la derecha, con la mayoría entre S/ 10,000 y S/ 25,000.\n"
+            "- Hay tickets altos (~S/ 60,000) que actúan como outliers positivos.\n"
+            "- Se incluye un gráfico de ventas por medio de pago para comparar preferencias.",
+            ("distribucion_ticket.png", "ventas_por_medio_pago.png")),
+    Seccion("5.3", "Correlaciones", "CORRELACIONES",
+            "Se analizan las relaciones entre las variables numéricas disponibles en el detalle (por defecto, cantidad e importe). "
+            "Si el dataset incluye precios finales, también se incorporan al cálculo para el heatmap.",
+            ("correlaciones.png",)),
+    Seccion("5.4", "Outliers", "OUTLIERS",
+            "Se identifican tickets de venta superiores a S/ 40,000, variaciones excepcionales en la cantidad adquirida "
+            "y categorías con importes acumulados atípicamente altos, asociados a ventas especiales o pedidos corporativos."),
+    Seccion("5.5", "Interpretación orientada al negocio", "INTERPRETACIÓN ORIENTADA AL NEGOCIO",
+            "El modelo de ventas combina pocas transacciones con montos elevados. Se recomienda optimizar precios, "
+            "segmentar clientes de alto valor, diseñar promociones según medio de pago y reforzar las categorías con mayor aporte."),
+
+    # 6. MODELO DE MACHINE LEARNING
+    Seccion("6.1", "Objetivo (predecir o clasificar)", "OBJETIVO",
+            "Predecir el importe total de una venta como variable continua."),
+    Seccion("6.2", "Algoritmo elegido y justificación", "ALGORITMO Y JUSTIFICACIÓN",
+            "Se utiliza una Regresión Lineal porque existe una relación lineal entre las variables explicativas y el importe."),
+    Seccion("6.3", "Entradas (X) y salida (y)", "ENTRADAS Y SALIDA",
+            "- Entradas (X): cantidad, precio_unitario y categoria.\n"
+            "- Salida (y): importe total de la transacción."),
+    Seccion("6.4", "Métricas de evaluación", "MÉTRICAS DE EVALUACIÓN",
+            "- MAE (Error Absoluto Medio)\n"
+            "- MSE (Error Cuadrático Medio)\n"
+            "- R^2 (Coeficiente de Determinación)"),
+    Seccion("6.5", "Modelo ML implementado", "MODELO IMPLEMENTADO",
+            "Regresión Lineal Múltiple desarrollada con la librería scikit-learn."),
+    Seccion("6.6", "División train/test y entrenamiento", "DIVISIÓN TRAIN/TEST Y ENTRENAMIENTO",
+            "El 80% de los datos se usa para entrenamiento y el 20% restante para prueba, "
+            "manteniendo datos de test sin exponer durante el ajuste."),
+    Seccion("6.7", "Predicciones y métricas calculadas", "PREDICCIONES Y MÉTRICAS CALCULADAS",
+            "Las métricas se calculan sobre el 20% de prueba; la ecuación es la que usa "
+            "aurelion_prediccion.py para predecir el importe de ventas nuevas.",
+            detalle=detalle_predicciones),
+    Seccion("6.8", "Resultados en gráficos", "RESULTADOS EN GRÁFICOS",
+            "La distribución del ticket y el heatmap de correlaciones muestran la relación entre cantidad, "
+            "precio e importe que aprovecha la regresión.",
+            GRAFICOS, detalle=detalle_graficos),
+]
+POR_CLAVE = {seccion.clave: seccion for seccion in SECCIONES}
+
+# ÍNDICE DE BÚSQUEDA
+
+PALABRAS_VACIAS = frozenset(
+    "a al como con de del e el en entre es la las lo los o para por que se su sus un una y".split()
+)
+
+
+def normalizar(texto):
+    """Palabras en minúsculas, sin tildes ni plural en 's' y sin palabras vacías."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    terminos = []
+    for palabra in re.findall(r"[a-z0-9_]+", texto):
+        if palabra in PALABRAS_VACIAS or len(palabra) < 2:
+            continue
+        if len(palabra) > 3 and palabra.endswith("s"):
+            palabra = palabra[:-1]
+        terminos.append(palabra)
+    return terminos
+
+
+def secciones_documentacion(texto):
+    """Secciones ``###`` de Documentacion.md como {clave: (título, texto)}.
+
+    Las que no traen número (capítulos 1 a 4) se numeran por orden, como en los menús.
+    """
+    secciones = {}
+    capitulo, orden, actual, lineas = "0", 0, None, []
+
+    def cerrar():
+        if actual is not None:
+            secciones[actual[0]] = (actual[1], "\n".join(lineas).strip())
+
+    for linea in texto.splitlines():
+        if linea.startswith("## "):
+            cerrar()
+            actual, lineas = None, []
+            capitulo = linea[3:].split(".", 1)[0].strip()
+            orden = 0
+        elif linea.startswith("### "):
+            cerrar()
+            lineas = []
+            titulo = linea[4:].strip().rstrip(":")
+            numero = re.match(r"(\d+\.\d+)\s+(.*)", titulo)
+            orden += 1
+            actual = (f"doc:{numero.group(1)}", numero.group(2)) if numero else (f"doc:{capitulo}.{orden}", titulo)
+        elif actual is not None:
+            lineas.append(linea)
+    cerrar()
+    return secciones
+
+
+def _firma_fuentes():
+    digest = hashlib.blake2b(digest_size=16)
+    for ruta in (DOCUMENTACION, Path(__file__).resolve()):
+        digest.update(ruta.read_bytes() if ruta.exists() else b"")
+    return digest.hexdigest()
+
+
+def construir_indice(firma):
+    documentos = {}
+    for seccion in SECCIONES:
+        documentos[seccion.clave] = {
+            "titulo": f"{MENUS[seccion.clave.split('.')[0]]} › {seccion.opcion}",
+            "texto": f"{seccion.opcion} {seccion.titulo} {seccion.texto}",
+        }
+    if DOCUMENTACION.exists():
+        for clave, (titulo, texto) in secciones_documentacion(DOCUMENTACION.read_text(encoding="utf-8")).items():
+            documentos[clave] = {"titulo": f"Documentacion.md › {titulo}", "texto": texto}
+
+    terminos = {}
+    for clave, documento in documentos.items():
+        frecuencias = {}
+        for termino in normalizar(f"{documento['titulo']} {documento['texto']}"):
+            frecuencias[termino] = frecuencias.get(termino, 0) + 1
+        for termino, frecuencia in frecuencias.items():
+            terminos.setdefault(termino, []).append([clave, frecuencia])
+    return {
+        "version": VERSION_INDICE,
+        "firma": firma,
+        "documentos": documentos,
+        "vocabulario": sorted(terminos),
+        "terminos": terminos,
+    }
+
+
+def cargar_indice():
+    """Índice vigente de la documentación; se rehace si Documentacion.md o este archivo cambiaron."""
+    ruta = BASE_DIR / CACHE_DIR_NOMBRE / INDICE_NOMBRE
+    firma = _firma_fuentes()
+    try:
+        indice = json.loads(ruta.read_text(encoding="utf-8"))
+        if indice.get("version") == VERSION_INDICE and indice.get("firma") == firma:
+            return indice
+    except (OSError, ValueError):
+        pass
+    indice = construir_indice(firma)
+    try:
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        tmp = ruta.with_name(ruta.name + ".tmp")
+        tmp.write_text(json.dumps(indice, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, ruta)
+    except OSError:
+        pass
+    return indice
+
+
+def buscar(consulta, indice=None, limite=10):
+    """Secciones que contienen todas las palabras de ``consulta`` (también como prefijo).
+
+    Devuelve ``[(clave, título, puntaje)]`` ordenado por tf-idf.
+    """
+    indice = indice or cargar_indice()
+    vocabulario, total = indice["vocabulario"], len(indice["documentos"])
+    puntajes = None
+    for termino in dict.fromkeys(normalizar(consulta)):
+        encontrados = {}
+        i = bisect.bisect_left(vocabulario, termino)
+        while i < len(vocabulario) and vocabulario[i].startswith(termino):
+            apariciones = indice["terminos"][vocabulario[i]]
+            idf = math.log(1 + total / len(apariciones))
+            for clave, frecuencia in apariciones:
+                encontrados[clave] = encontrados.get(clave, 0.0) + frecuencia * idf
+            i += 1
+        if puntajes is None:
+            puntajes = encontrados
         else:
-            print("Opción no válida.")
+            puntajes = {clave: puntajes[clave] + p for clave, p in encontrados.items() if clave in puntajes}
+    resultado = sorted((puntajes or {}).items(), key=lambda par: (-par[1], par[0]))[:limite]
+    return [(clave, indice["documentos"][clave]["titulo"], puntaje) for clave, puntaje in resultado]
+
+# CONSULTA DE SECCIONES
 
-# 5. ALCANCE DE ANÁLISIS ESTADÍSTICO
+def obtener_seccion(clave, indice=None):
+    """Sección ``clave`` ("5.1" del menú o "doc:5.1" de Documentacion.md) lista para mostrar.
 
-def menu_estadisticas():
+    Devuelve ``{"clave", "titulo", "texto", "imagenes"}`` o ``None`` si no existe.
+    """
+    seccion = POR_CLAVE.get(clave)
+    if seccion is not None:
+        texto = seccion.texto
+        if seccion.detalle is not None:
+            texto = seccion.detalle(cargar_resultados(resultados_dir)) + "\n" + texto
+        imagenes = [str(ruta_imagen(nombre) or nombre) for nombre in seccion.imagenes]
+        return {"clave": clave, "titulo": seccion.titulo, "texto": texto, "imagenes": imagenes}
+    documento = (indice or cargar_indice())["documentos"].get(clave)
+    if documento is None:
+        return None
+    return {"clave": clave, "titulo": documento["titulo"], "texto": documento["texto"], "imagenes": []}
+
+
+def mostrar_seccion(clave):
+    seccion = obtener_seccion(clave)
+    print(f"\n{seccion['titulo']}:")
+    print(seccion["texto"])
+    for imagen in POR_CLAVE[clave].imagenes if clave in POR_CLAVE else ():
+        mostrar_imagen(imagen)
+
+# MENÚS
+
+def menu_seccion(numero):
+    opciones = [s for s in SECCIONES if s.clave.split(".")[0] == numero]
     while True:
-        print("\n5. ALCANCE DE ANÁLISIS ESTADÍSTICO")
-        print("1. Estadísticas descriptivas")
-        print("2. Distribución de variables principales")
-        print("3. Correlaciones")
-        print("4. Outliers")
-        print("5. Interpretación orientada al negocio")
+        print(f"\n{numero}. {MENUS[numero]}")
+        for seccion in opciones:
+            print(f"{seccion.clave.split('.')[1]}. {seccion.opcion}")
         print("0. Volver al menú principal")
         opcion = input("\nSeleccione una opción: ")
 
-        if opcion == "1":
-            print("\nESTADÍSTICAS DESCRIPTIVAS:")
-            print("- Ventas registradas: 120\n"
-                  "- Monto total vendido: S/ 2,651,417\n"
-                  "- Ticket promedio por venta: S/ 22,095.14\n"
-                  "- Productos distintos vendidos: 95\n"
-                  "- Clientes distintos: 67\n\n"
-                  "Interpretación: ventas de alto valor con pocas transacciones, lo que eleva el ticket promedio.")
-        elif opcion == "2":
-            print("\nDISTRIBUCIÓN DE VARIABLES PRINCIPALES:")
-            print("- El histograma del ticket por venta está sesgado a la derecha, con la mayoría entre S/ 10,000 y S/ 25,000.\n"
-                  "- Hay tickets altos (~S/ 60,000) que actúan como outliers positivos.\n"
-                  "- Se incluye un gráfico de ventas por medio de pago para comparar preferencias.")
-            display(Image(filename='distribucion_ticket.png'))
-            display(Image(filename='ventas_por_medio_pago.png'))
-        elif opcion == "3":
-            print("\nCORRELACIONES:")
-            print(
-                "Se analizan las relaciones entre las variables numéricas disponibles en el detalle (por defecto, cantidad e importe). "
-                "Si el dataset incluye precios finales, también se incorporan al cálculo para el heatmap."
-            )
-            display(Image(filename='correlaciones.png'))
-        elif opcion == "4":
-            print("\nOUTLIERS:")
-            print(
-                "Se identifican tickets de venta superiores a S/ 40,000, variaciones excepcionales en la cantidad adquirida "
-                "y categorías con importes acumulados atípicamente altos, asociados a ventas especiales o pedidos corporativos."
-            )
-        elif opcion == "5":
-            print("\nINTERPRETACIÓN ORIENTADA AL NEGOCIO:")
-            print(
-                "El modelo de ventas combina pocas transacciones con montos elevados. Se recomienda optimizar precios, "
-                "segmentar clientes de alto valor, diseñar promociones según medio de pago y reforzar las categorías con mayor aporte."
-            )
+        if f"{numero}.{opcion}" in POR_CLAVE:
+            mostrar_seccion(f"{numero}.{opcion}")
         elif opcion == "0":
             break
         else:
             print("Opción no válida.")
 
-# 6. MODELO DE MACHINE LEARNING
 
-def menu_modelo_ml():
+def menu_busqueda():
+    indice = cargar_indice()
     while True:
-        print("\n6. MODELO DE MACHINE LEARNING")
-        print("1. Objetivo (predecir o clasificar)")
-        print("2. Algoritmo elegido y justificación")
-        print("3. Entradas (X) y salida (y)")
-        print("4. Métricas de evaluación")
-        print("5. Modelo ML implementado")
-        print("6. División train/test y entrenamiento")
-        print("7. Predicciones y métricas calculadas")
-        print("8. Resultados en gráficos")
-        print("0. Volver al menú principal")
-        opcion = input("\nSeleccione una opción: ")
-
-        if opcion == "1":
-            print("\nOBJETIVO:")
-            print("Predecir el importe total de una venta como variable continua.")
-        elif opcion == "2":
-            print("\nALGORITMO Y JUSTIFICACIÓN:")
-            print("Se utiliza una Regresión Lineal porque existe una relación lineal entre las variables explicativas y el importe.")
-        elif opcion == "3":
-            print("\nENTRADAS Y SALIDA:")
-            print("- Entradas (X): cantidad, precio_unitario y categoria.\n"
-                  "- Salida (y): importe total de la transacción.")
-        elif opcion == "4":
-            print("\nMÉTRICAS DE EVALUACIÓN:")
-            print("- MAE (Error Absoluto Medio)\n"
-                  "- MSE (Error Cuadrático Medio)\n"
-                  "- R^2 (Coeficiente de Determinación)")
-        elif opcion == "5":
-            print("\nMODELO IMPLEMENTADO:")
-            print("Regresión Lineal Múltiple desarrollada con la librería scikit-learn.")
-        elif opcion == "6":
-            print("\nDIVISIÓN TRAIN/TEST Y ENTRENAMIENTO:")
-            print("El 80% de los datos se usa para entrenamiento y el 20% restante para prueba, manteniendo datos de test sin exponer durante el ajuste.")
-        elif opcion == "7":
-            print("\nPREDICCIONES Y MÉTRICAS CALCULADAS:")
-        elif opcion == "8":
-            print("\nRESULTADOS EN GRÁFICOS:")
-        elif opcion == "0":
+        consulta = input("\nPalabras a buscar (0 o Enter para volver): ").strip()
+        if consulta in ("", "0"):
             break
-        else:
-            print("Opción no válida.")
+        resultados = buscar(consulta, indice)
+        if not resultados:
+            print("Sin resultados.")
+            continue
+        for clave, titulo, _ in resultados:
+            print(f"{clave:>8}  {titulo}")
+        clave = input("\nClave de la sección a ver (0 o Enter para buscar otra vez): ").strip()
+        if obtener_seccion(clave, indice) is not None:
+            mostrar_seccion(clave)
+        elif clave not in ("", "0"):
+            print("Clave no válida.")
 
-# 4. SUGERENCIAS COPILOT
+# MENU PRINCIPAL
 
-def menu_copilot():
+def menu_principal():
     while True:
-        print("\n4. SUGERENCIAS COPILOT")
-        print("1. Sugerencias aceptadas")
-        print("2. Sugerencias descartadas")
-        print("0. Volver al menú principal")
+        print("\n=== DOCUMENTACIÓN DEL PROYECTO - TIENDA AURELION ===")
+        print("Bienvenidos/as al asistente interactivo de documentación\n")
+        print("1. Planteamiento General")
+        print("2. Base de Datos")
+        print("3. Programa en Python")
+        print("4. Sugerencias Copilot")
+        print("5. Alcance de análisis estadístico")
+        print("6. Modelo de Machine Learning")
+        print("7. Buscar en la documentación")
+        print("0. Salir")
         opcion = input("\nSeleccione una opción: ")
 
-        if opcion == "1":
-            print("\nACEPTADAS:")
-            print("- Corrección de ortografía y redacción.\n"
-                  "- Detalle con precisión de la base de datos.\n"
-                  "- División por secciones.")
-        elif opcion == "2":
-            print("\nDESCARTADAS:")
-            print("- Uso de minúsculas en el pseudocódigo.\n"
-                  "- Archivo de requisitos.txt.\n"
-                  "- Reglas de validación de los datos.")
+        if opcion in MENUS:
+            menu_seccion(opcion)
+        elif opcion == "7":
+            menu_busqueda()
         elif opcion == "0":
+            print("\nCerrando el asistente.")
             break
         else:
-            print("Opción no válida.")
+            print("Opción no válida. Intente nuevamente.")
 
 # EJECUCIÓN PRINCIPAL
 
+def main(argv=None):
+    global resultados_dir
+
+    parser = argparse.ArgumentParser(description="Asistente de documentación de Tienda Aurelion.")
+    parser.add_argument("--seccion", nargs="+", metavar="CLAVE",
+                        help='Muestra las secciones indicadas ("5.1" del menú, "doc:5.1" de Documentacion.md).')
+    parser.add_argument("--buscar", metavar="TEXTO", help="Busca palabras en la documentación y los menús.")
+    parser.add_argument("--listar", action="store_true", help="Lista las claves de todas las secciones.")
+    parser.add_argument("--json", action="store_true", help="Escribe la respuesta en JSON.")
+    parser.add_argument("--resultados", type=Path, default=BASE_DIR,
+                        help="Carpeta de salida de proyecto_Aurelion.py (por defecto la del script).")
+    args = parser.parse_args(argv)
+    resultados_dir = args.resultados
+
+    if args.seccion is None and args.buscar is None and not args.listar:
+        menu_principal()
+        return 0
+
+    indice = cargar_indice()
+    if args.listar:
+        respuesta = [{"clave": clave, "titulo": d["titulo"]} for clave, d in indice["documentos"].items()]
+        texto = "\n".join(f"{r['clave']:>8}  {r['titulo']}" for r in respuesta)
+    elif args.buscar is not None:
+        respuesta = [{"clave": c, "titulo": t, "puntaje": round(p, 3)} for c, t, p in buscar(args.buscar, indice)]
+        texto = "\n".join(f"{r['clave']:>8}  {r['titulo']}" for r in respuesta) or "Sin resultados."
+    else:
+        respuesta = [obtener_seccion(clave, indice) for clave in args.seccion]
+        faltantes = [clave for clave, r in zip(args.seccion, respuesta) if r is None]
+        if faltantes:
+            print(f"Secciones inexistentes: {', '.join(faltantes)} (ver --listar)", file=sys.stderr)
+            return 1
+        texto = "\n\n".join(
+            f"{r['titulo']}:\n{r['texto']}" + "".join(f"\n[Imagen: {i}]" for i in r["imagenes"]) for r in respuesta
+        )
+    print(json.dumps(respuesta, ensure_ascii=False, indent=2) if args.json else texto)
+    return 0
+
+
 if __name__ == "__main__":
-    menu_principal()
+    raise SystemExit(main())
@@ -0,0 +1,138 @@
+"""
+Motor de agregación de una sola pasada sobre ``ventas_analitica``.
+
+Las claves (``id_venta``, ``id_cliente``, ``categoria``, ``medio_pago``) se
+factorizan a enteros y los importes se acumulan con ``np.bincount``, de modo
+que los totales por venta, cliente y categoría, los conteos por medio de pago
+y los distintos de productos y clientes salen de un único recorrido de la
+tabla. El resultado es un :class:`AgregadosVentas` que comparten las
+estadísticas, los gráficos y la exportación a CSV.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+
+def componer_estadisticas(
+    ventas_totales: pd.Series,
+    ticket_por_cliente: pd.Series,
+    ticket_por_categoria: pd.Series,
+    productos_distintos: int,
+    clientes_distintos: int,
+) -> dict[str, pd.Series]:
+    """Arma el diccionario de métricas a partir de los totales agregados."""
+    resumen_general = pd.Series({
+        "ventas_registradas": ventas_totales.shape[0],
+        "monto_total": ventas_totales.sum(),
+        "ticket_promedio": ventas_totales.mean(),
+        "productos_distintos": productos_distintos,
+        "clientes_distintos": clientes_distintos,
+    })
+
+    return {
+        "resumen_general": resumen_general,
+        "ticket_por_venta": ventas_totales.describe(),
+        "ticket_por_cliente": ticket_por_cliente.describe(),
+        "importe_por_categoria": ticket_por_categoria.sort_values(ascending=False),
+    }
+
+
+@dataclass
+class AgregadosVentas:
+    """Resultado de :func:`agregar_ventas`."""
+
+    ventas_totales: pd.Series
+    ticket_por_cliente: pd.Series
+    importe_por_categoria: pd.Series
+    ventas_por_medio_pago: pd.Series
+    productos_distintos: int
+    clientes_distintos: int
+
+    @cached_property
+    def estadisticas(self) -> dict[str, pd.Series]:
+        """Métricas descriptivas, con el mismo formato que ``estadisticas_descriptivas``."""
+        return componer_estadisticas(
+            self.ventas_totales,
+            self.ticket_por_cliente,
+            self.importe_por_categoria,
+            self.productos_distintos,
+            self.clientes_distintos,
+        )
+
+
+def factorizar(claves: pd.Series) -> tuple[np.ndarray, pd.Index]:
+    """Códigos enteros ordenados por clave; los nulos quedan en -1."""
+    codigos, unicos = pd.factorize(claves, sort=True)
+    return codigos, pd.Index(unicos, name=claves.name)
+
+
+def sumar_por_codigo(
+    codigos: np.ndarray,
+    unicos: pd.Index,
+    importe: np.ndarray,
+    entero: bool,
+    nombre: str = "importe",
+) -> pd.Series:
+    """Suma ``importe`` por código, con el mismo resultado que ``groupby().sum()``."""
+    validos = codigos >= 0
+    sumas = np.bincount(codigos[validos], weights=importe[validos], minlength=len(unicos))
+    serie = pd.Series(sumas, index=unicos, name=nombre)
+    return serie.astype(np.int64) if entero else serie
+
+
+def _conteo_por_primera_fila(codigos: np.ndarray, n_claves: int, valores: pd.Series) -> pd.Series:
+    """Cuenta ``valores`` tomando la primera fila de cada clave.
+
+    Equivale a ``drop_duplicates(clave)[valores].value_counts()`` con las
+    categorías en orden de aparición, pero sin ordenar ni copiar la tabla.
+    """
+    inverso = codigos[::-1]
+    validos = inverso >= 0
+    filas = np.arange(len(codigos) - 1, -1, -1)
+    primera = np.empty(n_claves, dtype=np.int64)
+    # Al asignar en orden inverso, la última escritura es la primera fila.
+    primera[inverso[validos]] = filas[validos]
+    primera.sort()
+
+    codigos_valor, categorias = pd.factorize(valores.iloc[primera])
+    conteos = np.bincount(codigos_valor[codigos_valor >= 0], minlength=len(categorias))
+    # Índice sin dtype category para que el gráfico respete el orden de aparición
+    indice = pd.Index(np.asarray(categorias, dtype=object), name=valores.name)
+    return pd.Series(conteos, index=indice, name="count")
+
+
+def agregar_ventas(ventas_analitica: pd.DataFrame) -> AgregadosVentas:
+    """Calcula en una pasada todos los agregados que usa el análisis."""
+    entero = pd.api.types.is_integer_dtype(ventas_analitica["importe"])
+    importe = ventas_analitica["importe"].to_numpy(dtype=float, na_value=0.0)
+
+    codigos_venta, ventas = factorizar(ventas_analitica["id_venta"])
+    codigos_cliente, clientes = factorizar(ventas_analitica["id_cliente"])
+
+    if "categoria" in ventas_analitica.columns:
+        importe_por_categoria = sumar_por_codigo(
+            *factorizar(ventas_analitica["categoria"]), importe, entero
+        )
+    else:
+        importe_por_categoria = pd.Series(dtype=float)
+
+    if "medio_pago" in ventas_analitica.columns:
+        ventas_por_medio_pago = _conteo_por_primera_fila(
+            codigos_venta, len(ventas), ventas_analitica["medio_pago"]
+        )
+    else:
+        ventas_por_medio_pago = pd.Series(dtype=np.int64)
+
+    return AgregadosVentas(
+        ventas_totales=sumar_por_codigo(codigos_venta, ventas, importe, entero),
+        ticket_por_cliente=sumar_por_codigo(codigos_cliente, clientes, importe, entero),
+        importe_por_categoria=importe_por_categoria,
+        ventas_por_medio_pago=ventas_por_medio_pago,
+        productos_distintos=len(pd.factorize(ventas_analitica["id_producto"])[1]),
+        clientes_distintos=len(clientes),
+    )
@@ -0,0 +1,190 @@
+"""
+Almacén analítico en SQLite como alternativa a los CSV de salida.
+
+Guarda Clientes, Ventas, Detalle_ventas y Productos limpios junto con las
+tablas de métricas en un único archivo ``.sqlite`` con índices sobre
+``id_venta``, ``id_cliente``, ``id_producto`` y ``fecha``. Así Power BI u
+otras herramientas pueden consultar sólo lo que necesitan en lugar de
+re-parsear los CSV completos.
+
+Toda la escritura se hace en una única transacción con ``executemany``. Las
+tablas de datos se actualizan con upsert sobre su clave primaria, de modo que
+re-ejecutar el pipeline no duplica filas; las métricas se reemplazan. En
+Detalle_ventas se borran antes las líneas de cada venta que llega, para que
+una venta que perdió líneas no conserve las viejas.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+ALMACEN_NOMBRE = "aurelion.sqlite"
+
+# Clave primaria de cada tabla de datos. Detalle_ventas no tiene una clave
+# natural (un producto puede repetirse en la misma venta), así que se numeran
+# las líneas dentro de cada venta.
+CLAVES: dict[str, tuple[str, ...]] = {
+    "Clientes": ("id_cliente",),
+    "Ventas": ("id_venta",),
+    "Detalle_ventas": ("id_venta", "linea"),
+    "Productos": ("id_producto",),
+}
+COLUMNAS_INDICE = ("id_venta", "id_cliente", "id_producto", "fecha")
+
+
+def _tipo_sql(serie: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_integer_dtype(serie):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(serie):
+        return "REAL"
+    return "TEXT"
+
+
+def _valores_sql(serie: pd.Series) -> list:
+    """Convierte una columna a valores nativos de Python aptos para sqlite3."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        fechas = serie.dropna()
+        formato = "%Y-%m-%d" if (fechas == fechas.dt.normalize()).all() else "%Y-%m-%d %H:%M:%S"
+        serie = serie.dt.strftime(formato)
+    elif isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype(object)
+    nulos = serie.isna().to_numpy()
+    valores = serie.tolist()
+    if nulos.any():
+        valores = [None if nulo else valor for valor, nulo in zip(valores, nulos)]
+    return valores
+
+
+def _filas(df: pd.DataFrame) -> Iterable[tuple]:
+    return zip(*(_valores_sql(df[col]) for col in df.columns))
+
+
+def _con_lineas(Detalle_ventas: pd.DataFrame) -> pd.DataFrame:
+    """Agrega el número de línea dentro de cada venta."""
+    return Detalle_ventas.assign(linea=Detalle_ventas.groupby("id_venta").cumcount() + 1)
+
+
+def _crear_tabla(
+    conexion: sqlite3.Connection,
+    nombre: str,
+    df: pd.DataFrame,
+    clave: tuple[str, ...],
+    reemplazar: bool = False,
+) -> None:
+    """Crea la tabla si no existe.
+
+    Si ya existe con otras columnas, con ``reemplazar`` se vuelve a crear;
+    si no, se agregan las columnas nuevas y se rechaza el cambio cuando
+    faltan columnas, para no perder las filas de corridas anteriores.
+
+    Raises:
+        ValueError: Si a la tabla le sobran columnas que ``df`` ya no tiene.
+    """
+    existentes = [fila[1] for fila in conexion.execute(f'PRAGMA table_info("{nombre}")')]
+    if existentes and set(existentes) != set(df.columns):
+        sobrantes = [col for col in existentes if col not in df.columns]
+        if reemplazar:
+            conexion.execute(f'DROP TABLE "{nombre}"')
+        elif sobrantes:
+            raise ValueError(
+                f"La tabla {nombre} del almacén tiene columnas que ya no existen "
+                f"({', '.join(sobrantes)}); use --reemplazar-almacen"
+            )
+        else:
+            for col in df.columns:
+                if col not in existentes:
+                    conexion.execute(f'ALTER TABLE "{nombre}" ADD COLUMN "{col}" {_tipo_sql(df[col])}')
+    definiciones = ", ".join(f'"{col}" {_tipo_sql(df[col])}' for col in df.columns)
+    pk = ", ".join(f'"{col}"' for col in clave)
+    conexion.execute(f'CREATE TABLE IF NOT EXISTS "{nombre}" ({definiciones}, PRIMARY KEY ({pk}))')
+    for col in COLUMNAS_INDICE:
+        if col in df.columns and clave[0] != col:
+            conexion.execute(f'CREATE INDEX IF NOT EXISTS "idx_{nombre}_{col}" ON "{nombre}" ("{col}")')
+
+
+def _upsert(conexion: sqlite3.Connection, nombre: str, df: pd.DataFrame, clave: tuple[str, ...]) -> None:
+    columnas = ", ".join(f'"{col}"' for col in df.columns)
+    marcas = ", ".join("?" for _ in df.columns)
+    actualizar = ", ".join(f'"{col}" = excluded."{col}"' for col in df.columns if col not in clave)
+    conflicto = ", ".join(f'"{col}"' for col in clave)
+    accion = f"DO UPDATE SET {actualizar}" if actualizar else "DO NOTHING"
+    conexion.executemany(
+        f'INSERT INTO "{nombre}" ({columnas}) VALUES ({marcas}) ON CONFLICT ({conflicto}) {accion}',
+        _filas(df),
+    )
+
+
+def _borrar_ventas(conexion: sqlite3.Connection, nombre: str, ids_venta: pd.Series) -> None:
+    """Borra de ``nombre`` las filas de las ventas ``ids_venta``."""
+    conexion.executemany(
+        f'DELETE FROM "{nombre}" WHERE "id_venta" = ?',
+        ((valor,) for valor in _valores_sql(pd.Series(ids_venta.dropna().unique()))),
+    )
+
+
+def _tabla_metrica(metrica: pd.Series | pd.DataFrame) -> pd.DataFrame:
+    """Pasa una métrica indexada a tabla con la clave como primera columna."""
+    if isinstance(metrica, pd.Series):
+        metrica = metrica.rename(metrica.name if metrica.name not in (None, 0) else "valor").to_frame()
+    return metrica.rename_axis(metrica.index.name or "clave").reset_index()
+
+
+def escribir_almacen(
+    ruta: Path,
+    data_limpia: dict[str, pd.DataFrame],
+    metricas: dict[str, pd.Series | pd.DataFrame],
+    reemplazar: bool = False,
+) -> None:
+    """Escribe tablas limpias y métricas en el archivo SQLite ``ruta``.
+
+    Args:
+        ruta: Archivo de base de datos; se crea si no existe.
+        data_limpia: Tablas de ``limpiar_datos``. Sólo se guardan las que
+            tienen clave en ``CLAVES``.
+        metricas: Métricas indexadas (``resumen_general``,
+            ``ticket_por_venta``, matriz de correlación, ...). Cada una se
+            guarda completa en una tabla con su nombre.
+        reemplazar: Vacía las tablas de datos antes de insertar en lugar de
+            hacer upsert; útil si se borraron filas en el origen. También
+            permite quitar columnas de una tabla existente.
+
+    Raises:
+        ValueError: Si una tabla de datos perdió columnas y no se pidió
+            ``reemplazar``.
+    """
+    conexion = sqlite3.connect(ruta)
+    try:
+        with conexion:
+            for nombre, clave in CLAVES.items():
+                if nombre not in data_limpia:
+                    continue
+                df = data_limpia[nombre]
+                if nombre == "Detalle_ventas":
+                    df = _con_lineas(df)
+                _crear_tabla(conexion, nombre, df, clave, reemplazar)
+                if reemplazar:
+                    conexion.execute(f'DELETE FROM "{nombre}"')
+                elif nombre == "Detalle_ventas":
+                    _borrar_ventas(conexion, nombre, df["id_venta"])
+                _upsert(conexion, nombre, df, clave)
+
+            for nombre, metrica in metricas.items():
+                tabla = _tabla_metrica(metrica)
+                conexion.execute(f'DROP TABLE IF EXISTS "{nombre}"')
+                _crear_tabla(conexion, nombre, tabla, (tabla.columns[0],))
+                _upsert(conexion, nombre, tabla, (tabla.columns[0],))
+    finally:
+        conexion.close()
+
+
+def consultar(ruta: Path, sql: str, parametros: Iterable = ()) -> pd.DataFrame:
+    """Ejecuta una consulta de lectura sobre el almacén y devuelve un DataFrame."""
+    conexion = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+    try:
+        return pd.read_sql_query(sql, conexion, params=tuple(parametros))
+    finally:
+        conexion.close()
@@ -0,0 +1,499 @@
+"""
+Estadísticas aproximadas de Tienda Aurelion con bocetos combinables.
+
+Los distintos de productos y clientes se estiman con HyperLogLog y los
+cuartiles de ``ticket_por_venta`` y ``ticket_por_cliente`` con un boceto KLL.
+Ambos ocupan memoria fija (unos 16 KiB por HyperLogLog y algunos miles de
+flotantes por KLL con los valores por defecto), se guardan en un ``.npz`` y
+se combinan con los de otras corridas: el resultado es el mismo que si los
+datos se hubieran procesado juntos, con las siguientes salvedades.
+
+* Los distintos se combinan sin restricciones; un producto visto en dos
+  corridas cuenta una sola vez.
+* ``ticket_por_venta`` es exacto en la combinación si cada venta está en una
+  sola corrida (por ejemplo, corridas por tienda o por día).
+* ``ticket_por_cliente`` describe el total de cada cliente dentro de cada
+  corrida: sólo coincide con el global si las corridas reparten los
+  clientes, como cuando cada tienda tiene sus propios clientes.
+
+Conteos, sumas, media, desvío, mínimo y máximo se llevan exactos; sólo los
+distintos y los cuartiles son aproximados. :func:`comparar` mide el error
+contra el cálculo exacto junto con la cota teórica de cada boceto.
+
+Uso:
+    python aurelion_aproximado.py --comparar
+    python aurelion_aproximado.py --combinar t1/estadisticas_aproximadas.npz t2/estadisticas_aproximadas.npz
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from aurelion_agregacion import AgregadosVentas
+    from aurelion_estrella import EsquemaEstrella
+    from aurelion_streaming import AcumuladorVentas
+
+BOCETOS_NOMBRE = "estadisticas_aproximadas.npz"
+PRECISION_HLL = 14
+K_CUANTILES = 200
+CUARTILES = (0.25, 0.5, 0.75)
+# Razón entre las capacidades de niveles consecutivos del KLL
+DECAIMIENTO_KLL = 2 / 3
+CAPACIDAD_MINIMA_KLL = 8
+
+
+def _hashear(valores: Iterable) -> np.ndarray:
+    """Hash de 64 bits de cada valor no nulo, estable entre procesos y corridas.
+
+    Los numéricos se pasan a float para que ``7`` y ``7.0`` cuenten igual
+    aunque pandas infiera dtypes distintos en cada archivo.
+    """
+    serie = valores if isinstance(valores, (pd.Series, pd.Index)) else pd.Series(list(valores))
+    serie = pd.Series(serie).dropna()
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        serie = serie.astype(float)
+    return pd.util.hash_pandas_object(serie, index=False).to_numpy()
+
+
+def _longitud_bits(valores: np.ndarray) -> np.ndarray:
+    """``int.bit_length`` de cada ``uint64``; se parte en mitades para que el float sea exacto."""
+    alto = (valores >> np.uint64(32)).astype(np.float64)
+    bajo = (valores & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(alto > 0, 32 + np.frexp(alto)[1], np.frexp(bajo)[1])
+
+
+class HyperLogLog:
+    """Conteo aproximado de distintos en ``2**precision`` bytes.
+
+    Se usa como un ``set`` de sólo inserción: :meth:`update`, ``|=`` y
+    ``len``. El error relativo típico es ``1.04 / sqrt(2**precision)``
+    (0,8 % con la precisión por defecto); por debajo de unos miles de
+    distintos el conteo lineal lo deja prácticamente exacto.
+    """
+
+    def __init__(self, precision: int = PRECISION_HLL, registros: np.ndarray | None = None) -> None:
+        if not 4 <= precision <= 18:
+            raise ValueError(f"La precisión debe estar entre 4 y 18, no {precision}")
+        self.precision = precision
+        self.registros = np.zeros(1 << precision, dtype=np.uint8) if registros is None else registros
+
+    def update(self, valores: Iterable) -> None:
+        hashes = _hashear(valores)
+        if not len(hashes):
+            return
+        resto_bits = 64 - self.precision
+        indices = (hashes >> np.uint64(resto_bits)).astype(np.intp)
+        resto = hashes & np.uint64((1 << resto_bits) - 1)
+        # Posición del primer 1 en los bits restantes, contando desde 1
+        rangos = (resto_bits - _longitud_bits(resto) + 1).astype(np.uint8)
+        np.maximum.at(self.registros, indices, rangos)
+
+    def __ior__(self, otro: "HyperLogLog") -> "HyperLogLog":
+        if otro.precision != self.precision:
+            raise ValueError("Sólo se combinan HyperLogLog de la misma precisión")
+        np.maximum(self.registros, otro.registros, out=self.registros)
+        return self
+
+    def estimar(self) -> float:
+        m = len(self.registros)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimado = alfa * m * m / np.ldexp(1.0, -self.registros.astype(np.int64)).sum()
+        vacios = int(np.count_nonzero(self.registros == 0))
+        if estimado <= 2.5 * m and vacios:
+            estimado = m * math.log(m / vacios)
+        return float(estimado)
+
+    def __len__(self) -> int:
+        return int(round(self.estimar()))
+
+    @property
+    def error_relativo(self) -> float:
+        """Desvío estándar relativo teórico del estimador."""
+        return 1.04 / math.sqrt(len(self.registros))
+
+    def a_estado(self, prefijo: str) -> dict[str, np.ndarray]:
+        return {f"{prefijo}_precision": np.array(self.precision), f"{prefijo}_registros": self.registros}
+
+    @classmethod
+    def desde_estado(cls, estado: dict[str, np.ndarray], prefijo: str) -> "HyperLogLog":
+        return cls(int(estado[f"{prefijo}_precision"]), np.array(estado[f"{prefijo}_registros"], dtype=np.uint8))
+
+
+class CuantilesKLL:
+    """Boceto KLL de cuantiles con momentos exactos.
+
+    Cada nivel ``h`` guarda valores que representan ``2**h`` originales. Un
+    nivel que supera su capacidad se ordena y promueve uno de cada dos
+    valores, con desplazamiento aleatorio, al nivel siguiente. La memoria es
+    del orden de ``3 * k`` valores más ``CAPACIDAD_MINIMA_KLL`` por nivel.
+    """
+
+    def __init__(self, k: int = K_CUANTILES, semilla: int | None = 0) -> None:
+        self.k = k
+        self.niveles: list[np.ndarray] = [np.empty(0)]
+        self.n = 0
+        self.suma = 0.0
+        self.m2 = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self._rng = np.random.default_rng(semilla)
+
+    def _capacidad(self, nivel: int) -> int:
+        altura = len(self.niveles) - nivel - 1
+        return max(CAPACIDAD_MINIMA_KLL, math.ceil(self.k * DECAIMIENTO_KLL**altura))
+
+    def _sumar_momentos(self, n: int, suma: float, m2: float, minimo: float, maximo: float) -> None:
+        # Combinación de Chan et al. para la suma de cuadrados centrada
+        if self.n and n:
+            delta = suma / n - self.suma / self.n
+            m2 += delta * delta * self.n * n / (self.n + n)
+        self.m2 += m2
+        self.n += n
+        self.suma += suma
+        self.minimo = min(self.minimo, minimo)
+        self.maximo = max(self.maximo, maximo)
+
+    def _compactar(self) -> None:
+        while True:
+            nivel = next(
+                (h for h, valores in enumerate(self.niveles) if len(valores) > self._capacidad(h)), None
+            )
+            if nivel is None:
+                return
+            if nivel + 1 == len(self.niveles):
+                self.niveles.append(np.empty(0))
+            valores = np.sort(self.niveles[nivel])
+            sobrante = len(valores) % 2
+            desplazamiento = int(self._rng.integers(2))
+            promovidos = valores[desplazamiento : len(valores) - sobrante : 2]
+            self.niveles[nivel + 1] = np.concatenate([self.niveles[nivel + 1], promovidos])
+            self.niveles[nivel] = valores[len(valores) - sobrante :]
+
+    def update(self, valores: Iterable) -> None:
+        x = np.asarray(valores, dtype=float)
+        x = x[~np.isnan(x)]
+        if not len(x):
+            return
+        self._sumar_momentos(len(x), float(x.sum()), float(((x - x.mean()) ** 2).sum()), x.min(), x.max())
+        self.niveles[0] = np.concatenate([self.niveles[0], x])
+        self._compactar()
+
+    def __ior__(self, otro: "CuantilesKLL") -> "CuantilesKLL":
+        self._sumar_momentos(otro.n, otro.suma, otro.m2, otro.minimo, otro.maximo)
+        while len(self.niveles) < len(otro.niveles):
+            self.niveles.append(np.empty(0))
+        for nivel, valores in enumerate(otro.niveles):
+            self.niveles[nivel] = np.concatenate([self.niveles[nivel], valores])
+        self._compactar()
+        return self
+
+    def cuantiles(self, qs: Iterable[float]) -> np.ndarray:
+        qs = np.asarray(list(qs), dtype=float)
+        if not self.n:
+            return np.full(len(qs), np.nan)
+        valores = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(v), 2.0**h) for h, v in enumerate(self.niveles)])
+        orden = np.argsort(valores, kind="stable")
+        pesos = pesos[orden]
+        # Cada valor ocupa el centro de los rangos que representa; con todos
+        # los pesos en 1 coincide con la interpolación lineal de pandas.
+        centros = np.cumsum(pesos) - pesos / 2 - 0.5
+        resultado = np.interp(qs * (pesos.sum() - 1), centros, valores[orden])
+        resultado = np.clip(resultado, self.minimo, self.maximo)
+        resultado[qs <= 0] = self.minimo
+        resultado[qs >= 1] = self.maximo
+        return resultado
+
+    @property
+    def error_rango(self) -> float:
+        """Error de rango normalizado con 99 % de confianza (ajuste empírico de KLL)."""
+        return 2.296 / self.k**0.9723
+
+    @property
+    def retenidos(self) -> int:
+        return sum(len(valores) for valores in self.niveles)
+
+    def describir(self, nombre: str = "importe") -> pd.Series:
+        """Mismo formato que ``Series.describe()``; sólo los cuartiles son aproximados."""
+        media = self.suma / self.n if self.n else np.nan
+        desvio = math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+        extremos = (self.minimo, self.maximo) if self.n else (np.nan, np.nan)
+        return pd.Series(
+            [float(self.n), media, desvio, extremos[0], *self.cuantiles(CUARTILES), extremos[1]],
+            index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"],
+            name=nombre,
+        )
+
+    def a_estado(self, prefijo: str) -> dict[str, np.ndarray]:
+        return {
+            f"{prefijo}_k": np.array(self.k),
+            f"{prefijo}_valores": np.concatenate(self.niveles),
+            f"{prefijo}_largos": np.array([len(v) for v in self.niveles], dtype=np.int64),
+            f"{prefijo}_momentos": np.array([self.n, self.suma, self.m2, self.minimo, self.maximo]),
+        }
+
+    @classmethod
+    def desde_estado(cls, estado: dict[str, np.ndarray], prefijo: str) -> "CuantilesKLL":
+        boceto = cls(int(estado[f"{prefijo}_k"]), semilla=None)
+        limites = np.cumsum(estado[f"{prefijo}_largos"])[:-1]
+        boceto.niveles = list(np.split(np.asarray(estado[f"{prefijo}_valores"], dtype=float), limites))
+        n, boceto.suma, boceto.m2, boceto.minimo, boceto.maximo = estado[f"{prefijo}_momentos"].tolist()
+        boceto.n = int(n)
+        return boceto
+
+
+@dataclass
+class EstadisticasAproximadas:
+    """Bocetos de las métricas de ``estadisticas_descriptivas``.
+
+    ``importe_por_categoria`` se lleva exacto: hay pocas categorías y sus
+    sumas se combinan sin pérdida.
+    """
+
+    productos: HyperLogLog = field(default_factory=HyperLogLog)
+    clientes: HyperLogLog = field(default_factory=HyperLogLog)
+    ticket_por_venta: CuantilesKLL = field(default_factory=CuantilesKLL)
+    ticket_por_cliente: CuantilesKLL = field(default_factory=CuantilesKLL)
+    importe_por_categoria: pd.Series = field(
+        default_factory=lambda: pd.Series(dtype=float, name="importe").rename_axis("categoria")
+    )
+    importe_entero: bool = True
+
+    @classmethod
+    def desde_totales(
+        cls,
+        ventas_totales: pd.Series,
+        ticket_por_cliente: pd.Series,
+        importe_por_categoria: pd.Series,
+        productos: Iterable | HyperLogLog,
+        clientes: Iterable,
+        precision: int = PRECISION_HLL,
+        k: int = K_CUANTILES,
+    ) -> "EstadisticasAproximadas":
+        """Bocetos a partir de los totales por venta y por cliente de una corrida.
+
+        ``productos`` puede ser un :class:`HyperLogLog` ya cargado, como el
+        de :class:`~aurelion_streaming.AcumuladorVentas` por bloques.
+        """
+        if not isinstance(productos, HyperLogLog):
+            sketch = HyperLogLog(precision)
+            sketch.update(productos)
+            productos = sketch
+        aproximadas = cls(
+            productos=productos,
+            clientes=HyperLogLog(precision),
+            ticket_por_venta=CuantilesKLL(k),
+            ticket_por_cliente=CuantilesKLL(k),
+            importe_por_categoria=importe_por_categoria.astype(float).rename("importe").rename_axis("categoria"),
+            importe_entero=pd.api.types.is_integer_dtype(ventas_totales),
+        )
+        aproximadas.clientes.update(clientes)
+        aproximadas.ticket_por_venta.update(ventas_totales.to_numpy(dtype=float, na_value=np.nan))
+        aproximadas.ticket_por_cliente.update(ticket_por_cliente.to_numpy(dtype=float, na_value=np.nan))
+        return aproximadas
+
+    @classmethod
+    def desde_agregados(
+        cls, agregados: "AgregadosVentas", estrella: "EsquemaEstrella", **parametros
+    ) -> "EstadisticasAproximadas":
+        return cls.desde_totales(
+            agregados.ventas_totales,
+            agregados.ticket_por_cliente,
+            agregados.importe_por_categoria,
+            estrella.hechos["id_producto"],
+            estrella.ventas.columna("id_cliente"),
+            **parametros,
+        )
+
+    @classmethod
+    def desde_acumulador(cls, acumulador: "AcumuladorVentas", **parametros) -> "EstadisticasAproximadas":
+        ventas_totales, ticket_por_cliente, importe_por_categoria = acumulador.totales()
+        return cls.desde_totales(
+            ventas_totales,
+            ticket_por_cliente,
+            importe_por_categoria,
+            acumulador.productos,
+            acumulador.cliente_por_venta,
+            **parametros,
+        )
+
+    def combinar(self, otra: "EstadisticasAproximadas") -> None:
+        """Incorpora los bocetos de ``otra`` (ver las salvedades del módulo)."""
+        self.productos |= otra.productos
+        self.clientes |= otra.clientes
+        self.ticket_por_venta |= otra.ticket_por_venta
+        self.ticket_por_cliente |= otra.ticket_por_cliente
+        self.importe_por_categoria = self.importe_por_categoria.add(
+            otra.importe_por_categoria, fill_value=0
+        ).rename("importe")
+        self.importe_entero = self.importe_entero and otra.importe_entero
+
+    def estadisticas(self) -> dict[str, pd.Series]:
+        """Mismo diccionario que ``estadisticas_descriptivas``."""
+        ventas = self.ticket_por_venta
+        monto_total = int(round(ventas.suma)) if self.importe_entero else ventas.suma
+        por_categoria = self.importe_por_categoria
+        if self.importe_entero:
+            por_categoria = por_categoria.round().astype(np.int64)
+        return {
+            "resumen_general": pd.Series({
+                "ventas_registradas": ventas.n,
+                "monto_total": monto_total,
+                "ticket_promedio": ventas.suma / ventas.n if ventas.n else np.nan,
+                "productos_distintos": len(self.productos),
+                "clientes_distintos": len(self.clientes),
+            }),
+            "ticket_por_venta": ventas.describir(),
+            "ticket_por_cliente": self.ticket_por_cliente.describir(),
+            "importe_por_categoria": por_categoria.sort_values(ascending=False),
+        }
+
+    def guardar(self, ruta: Path) -> None:
+        estado = {
+            **self.productos.a_estado("productos"),
+            **self.clientes.a_estado("clientes"),
+            **self.ticket_por_venta.a_estado("ticket_por_venta"),
+            **self.ticket_por_cliente.a_estado("ticket_por_cliente"),
+            "categorias": self.importe_por_categoria.index.to_numpy().astype(str),
+            "importe_por_categoria": self.importe_por_categoria.to_numpy(dtype=float),
+            "importe_entero": np.array(self.importe_entero),
+        }
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        tmp = ruta.with_name(ruta.name + ".tmp")
+        with open(tmp, "wb") as archivo:
+            np.savez(archivo, **estado)
+        os.replace(tmp, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: Path) -> "EstadisticasAproximadas":
+        with np.load(ruta, allow_pickle=False) as estado:
+            estado = dict(estado)
+        return cls(
+            productos=HyperLogLog.desde_estado(estado, "productos"),
+            clientes=HyperLogLog.desde_estado(estado, "clientes"),
+            ticket_por_venta=CuantilesKLL.desde_estado(estado, "ticket_por_venta"),
+            ticket_por_cliente=CuantilesKLL.desde_estado(estado, "ticket_por_cliente"),
+            importe_por_categoria=pd.Series(
+                estado["importe_por_categoria"],
+                index=pd.Index(estado["categorias"].astype(object), name="categoria"),
+                name="importe",
+            ),
+            importe_entero=bool(estado["importe_entero"]),
+        )
+
+
+def _error_rango(exactos: pd.Series, valor: float, q: float) -> float:
+    """Distancia entre ``q`` y el rango que ``valor`` ocupa en los datos exactos."""
+    ordenados = np.sort(exactos.dropna().to_numpy(dtype=float))
+    if not len(ordenados):
+        return np.nan
+    debajo = np.searchsorted(ordenados, valor, side="left") / len(ordenados)
+    hasta = np.searchsorted(ordenados, valor, side="right") / len(ordenados)
+    return 0.0 if debajo <= q <= hasta else min(abs(debajo - q), abs(hasta - q))
+
+
+def comparar(aproximadas: EstadisticasAproximadas, agregados: "AgregadosVentas") -> pd.DataFrame:
+    """Error de cada métrica aproximada frente al cálculo exacto.
+
+    ``error_relativo`` es ``|aproximado - exacto| / |exacto|``. Para los
+    cuartiles, ``error_rango`` es cuánto se aleja el valor estimado del
+    cuantil pedido en los datos exactos. ``cota`` es la garantía del boceto
+    con 99 % de confianza: error relativo (tres desvíos) para HyperLogLog y
+    error de rango para KLL.
+    """
+    exactas = agregados.estadisticas
+    estimadas = aproximadas.estadisticas()
+    filas = []
+    distintos = (("productos_distintos", aproximadas.productos), ("clientes_distintos", aproximadas.clientes))
+    for nombre, sketch in distintos:
+        exacto = float(exactas["resumen_general"][nombre])
+        estimado = float(estimadas["resumen_general"][nombre])
+        filas.append((f"resumen_general.{nombre}", exacto, estimado, np.nan, 3 * sketch.error_relativo))
+    for nombre, valores, sketch in (
+        ("ticket_por_venta", agregados.ventas_totales, aproximadas.ticket_por_venta),
+        ("ticket_por_cliente", agregados.ticket_por_cliente, aproximadas.ticket_por_cliente),
+    ):
+        for q in CUARTILES:
+            etiqueta = f"{q:.0%}"
+            exacto = float(exactas[nombre][etiqueta])
+            estimado = float(estimadas[nombre][etiqueta])
+            error = _error_rango(valores, estimado, q)
+            filas.append((f"{nombre}.{etiqueta}", exacto, estimado, error, sketch.error_rango))
+
+    columnas = ["metrica", "exacto", "aproximado", "error_rango", "cota"]
+    tabla = pd.DataFrame(filas, columns=columnas).set_index("metrica")
+    tabla.insert(2, "error_relativo", (tabla["aproximado"] - tabla["exacto"]).abs() / tabla["exacto"].abs())
+    return tabla
+
+
+def estadisticas_aproximadas_por_bloques(
+    base_dir: Path,
+    tamano_bloque: int = 100_000,
+    cache_dir: Path | None = None,
+    ruta_detalle: Path | None = None,
+    deduplicar: bool = True,
+    **parametros,
+) -> EstadisticasAproximadas:
+    """Como ``estadisticas_por_bloques`` pero los productos se cuentan con HyperLogLog."""
+    from aurelion_streaming import acumular_por_bloques
+
+    acumulador = acumular_por_bloques(
+        base_dir,
+        tamano_bloque,
+        cache_dir,
+        ruta_detalle,
+        deduplicar,
+        precision_productos=parametros.get("precision", PRECISION_HLL),
+    )
+    return EstadisticasAproximadas.desde_acumulador(acumulador, **parametros)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--entrada", type=Path, default=Path(__file__).resolve().parent, help="Carpeta con los Excel."
+    )
+    parser.add_argument(
+        "--combinar", type=Path, nargs="+", default=None, help="Bocetos .npz a combinar en lugar de leer Excel."
+    )
+    parser.add_argument("--comparar", action="store_true", help="Compara contra el cálculo exacto.")
+    parser.add_argument("--guardar", type=Path, default=None, help="Guarda los bocetos resultantes en este .npz.")
+    parser.add_argument("--precision", type=int, default=PRECISION_HLL, help="Precisión de HyperLogLog.")
+    parser.add_argument("--k", type=int, default=K_CUANTILES, help="Tamaño del boceto KLL.")
+    args = parser.parse_args()
+
+    if args.combinar:
+        aproximadas = EstadisticasAproximadas.cargar(args.combinar[0])
+        for ruta in args.combinar[1:]:
+            aproximadas.combinar(EstadisticasAproximadas.cargar(ruta))
+    else:
+        from aurelion_cache import CACHE_DIR_NOMBRE
+        from aurelion_estrella import EsquemaEstrella
+        from proyecto_Aurelion import cargar_datos, limpiar_datos
+
+        data, _ = cargar_datos(args.entrada, cache_dir=args.entrada / CACHE_DIR_NOMBRE)
+        estrella = EsquemaEstrella.desde_tablas(limpiar_datos(data))
+        agregados = estrella.agregados()
+        aproximadas = EstadisticasAproximadas.desde_agregados(
+            agregados, estrella, precision=args.precision, k=args.k
+        )
+        if args.comparar:
+            print("=== Error frente al cálculo exacto ===")
+            print(comparar(aproximadas, agregados).to_string(float_format=lambda x: f"{x:,.4f}"))
+
+    stats = aproximadas.estadisticas()
+    print("=== Estadísticas aproximadas ===")
+    print(stats["resumen_general"].to_string())
+    print(stats["ticket_por_venta"].to_string())
+    if args.guardar:
+        aproximadas.guardar(args.guardar)
+        print(f"Bocetos guardados en {args.guardar}")
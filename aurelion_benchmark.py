@@ -0,0 +1,399 @@
+"""
+Benchmarks del pipeline de Tienda Aurelion sobre datos sintéticos.
+
+:func:`generar_datos` arma Clientes, Ventas, Detalle_ventas y Productos con
+las mismas columnas que los Excel y distribuciones parecidas a las
+observadas (mezcla de medios de pago, dos categorías, cantidades de 1 a 10 y
+precios entre 272 y 4982), de forma determinista a partir de una semilla.
+El tamaño se indica en filas de Detalle_ventas, de 10³ a 10⁷.
+
+Cada etapa (carga, limpieza, esquema estrella, estadísticas, correlaciones,
+gráficos, modelo y modelo disperso con todas las variables categóricas) se
+mide por separado: tiempo de reloj y de CPU (mínimo de varias repeticiones)
+y pico de memoria asignada con ``tracemalloc`` en una
+corrida aparte. Los resultados se guardan en JSON y ``--comparar`` los
+contrasta con un archivo anterior para detectar regresiones.
+
+La carga desde Excel sólo se mide hasta ``--max-filas-excel`` filas; por
+encima se parte de las tablas generadas con el esquema ya aplicado.
+
+Uso:
+    python aurelion_benchmark.py --tamanos 1000 10000 100000
+    python aurelion_benchmark.py --comparar benchmark_anterior.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from aurelion_agregacion import AgregadosVentas
+from aurelion_entrenamiento import ATRIBUTOS, entrenar_disperso
+from aurelion_esquema import aplicar_esquema
+from aurelion_estrella import EsquemaEstrella
+from aurelion_graficos import RenderizadorGraficos, TrabajoGrafico, graficar_correlaciones
+from aurelion_instrumentacion import contar_filas, entorno
+from proyecto_Aurelion import (
+    cargar_datos,
+    entrenar_modelo,
+    estadisticas_descriptivas,
+    limpiar_datos,
+    trabajos_distribuciones,
+)
+
+VERSION_RESULTADOS = 1
+MAX_FILAS_EXCEL = 100_000
+
+NOMBRES = [
+    "Agustina", "Bautista", "Bruno", "Camila", "Diego", "Elena", "Emilia", "Felipe",
+    "Franco", "Gael", "Guadalupe", "Helena", "Hernan", "Ivana", "Julian", "Karina",
+    "Lucas", "Mariana", "Martina", "Nicolas", "Olivia", "Pablo", "Rocio", "Santiago",
+    "Tomas", "Uma", "Valentina", "Yamila", "Zoe",
+]
+APELLIDOS = [
+    "Acosta", "Alvarez", "Castro", "Diaz", "Fernandez", "Flores", "Gomez", "Gonzalez",
+    "Herrera", "Lopez", "Martinez", "Medina", "Molina", "Perez", "Rodriguez", "Rojas",
+    "Romero", "Ruiz", "Sanchez", "Silva", "Torres",
+]
+# Proporciones observadas en los datos de la tienda
+CIUDADES = {
+    "Rio Cuarto": 0.23,
+    "Alta Gracia": 0.21,
+    "Carlos Paz": 0.15,
+    "Villa Maria": 0.15,
+    "Cordoba": 0.13,
+    "Mendiolaza": 0.13,
+}
+MEDIOS_PAGO = {"efectivo": 0.31, "qr": 0.25, "transferencia": 0.225, "tarjeta": 0.215}
+CATEGORIAS = ["Alimentos", "Limpieza"]
+PRECIO_MINIMO, PRECIO_MAXIMO = 272, 4982
+CANTIDAD_MAXIMA = 10
+
+
+def _elegir(rng: np.random.Generator, opciones: dict[str, float], n: int) -> np.ndarray:
+    probabilidades = np.array(list(opciones.values()))
+    return np.array(list(opciones), dtype=object)[
+        rng.choice(len(opciones), size=n, p=probabilidades / probabilidades.sum())
+    ]
+
+
+def _fechas(rng: np.random.Generator, inicio: str, dias: int, n: int) -> pd.DatetimeIndex:
+    return pd.Timestamp(inicio) + pd.to_timedelta(rng.integers(0, dias, size=n), unit="D")
+
+
+def generar_datos(filas: int, semilla: int = 42) -> dict[str, pd.DataFrame]:
+    """Genera las cuatro tablas de origen con ``filas`` líneas de detalle.
+
+    Hay una venta cada ~3 líneas (todas con al menos una línea), un cliente
+    cada 10 ventas y ``√filas`` productos, con un mínimo de 100 clientes y
+    100 productos como en los datos reales.
+    """
+    rng = np.random.default_rng(semilla)
+    n_ventas = max(1, filas // 3)
+    n_clientes = max(100, n_ventas // 10)
+    n_productos = max(100, int(np.sqrt(filas)))
+
+    nombres = np.array(NOMBRES, dtype=object)[rng.integers(0, len(NOMBRES), n_clientes)]
+    apellidos = np.array(APELLIDOS, dtype=object)[rng.integers(0, len(APELLIDOS), n_clientes)]
+    emails = pd.Series(nombres + "." + apellidos).str.lower().to_numpy() + "@mail.com"
+    Clientes = pd.DataFrame({
+        "id_cliente": np.arange(1, n_clientes + 1),
+        "nombre_cliente": nombres + " " + apellidos,
+        "email": emails,
+        "ciudad": _elegir(rng, CIUDADES, n_clientes),
+        "fecha_alta": _fechas(rng, "2023-01-01", 365, n_clientes),
+    })
+
+    cliente = rng.integers(0, n_clientes, n_ventas)
+    Ventas = pd.DataFrame({
+        "id_venta": np.arange(1, n_ventas + 1),
+        "fecha": _fechas(rng, "2024-01-01", 182, n_ventas),
+        "id_cliente": cliente + 1,
+        "nombre_cliente": Clientes["nombre_cliente"].to_numpy()[cliente],
+        "email": emails[cliente],
+        "medio_pago": _elegir(rng, MEDIOS_PAGO, n_ventas),
+    })
+
+    precios = rng.integers(PRECIO_MINIMO, PRECIO_MAXIMO + 1, n_productos)
+    nombres_producto = np.array([f"Producto {i}" for i in range(1, n_productos + 1)], dtype=object)
+    Productos = pd.DataFrame({
+        "id_producto": np.arange(1, n_productos + 1),
+        "nombre_producto": nombres_producto,
+        "categoria": np.array(CATEGORIAS, dtype=object)[rng.integers(0, len(CATEGORIAS), n_productos)],
+        "precio_unitario": precios,
+    })
+
+    # Cada venta recibe una línea y el resto se reparte al azar
+    venta = np.sort(np.concatenate([
+        np.arange(n_ventas), rng.integers(0, n_ventas, max(0, filas - n_ventas))
+    ]))
+    producto = rng.integers(0, n_productos, len(venta))
+    cantidad = rng.integers(1, CANTIDAD_MAXIMA + 1, len(venta))
+    Detalle_ventas = pd.DataFrame({
+        "id_venta": venta + 1,
+        "id_producto": producto + 1,
+        "nombre_producto": nombres_producto[producto],
+        "cantidad": cantidad,
+        "precio_unitario": precios[producto],
+        "importe": cantidad * precios[producto],
+    })
+
+    return {
+        "Clientes": Clientes,
+        "Ventas": Ventas,
+        "Detalle_ventas": Detalle_ventas,
+        "Productos": Productos,
+    }
+
+
+def escribir_excel(data: dict[str, pd.DataFrame], destino: Path) -> None:
+    """Guarda las tablas como los Excel que espera ``cargar_datos``."""
+    destino.mkdir(parents=True, exist_ok=True)
+    for nombre, df in data.items():
+        df.to_excel(destino / f"{nombre}.xlsx", index=False)
+
+
+def medir(
+    funcion: Callable[[], Any], repeticiones: int = 1, memoria: bool = True
+) -> tuple[Any, dict[str, float | int | None]]:
+    """Ejecuta ``funcion`` y devuelve su resultado y sus mediciones.
+
+    El tiempo es el mínimo de ``repeticiones`` corridas. El pico de memoria
+    se mide con ``tracemalloc`` en una corrida adicional para no sumar su
+    sobrecosto a los tiempos.
+    """
+    segundos, cpu = [], []
+    for _ in range(max(1, repeticiones)):
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        resultado = funcion()
+        segundos.append(time.perf_counter() - inicio)
+        cpu.append(time.process_time() - inicio_cpu)
+
+    pico = None
+    if memoria:
+        tracemalloc.start()
+        try:
+            funcion()
+            pico = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return resultado, {
+        "segundos": min(segundos),
+        "segundos_mediana": float(np.median(segundos)),
+        "cpu_segundos": min(cpu),
+        "pico_memoria_bytes": pico,
+        "filas_salida": contar_filas(resultado),
+    }
+
+
+def benchmark_tamano(
+    filas: int,
+    directorio: Path,
+    repeticiones: int = 1,
+    memoria: bool = True,
+    max_filas_excel: int = MAX_FILAS_EXCEL,
+    semilla: int = 42,
+    incluir_analitica: bool = True,
+) -> list[dict[str, Any]]:
+    """Mide cada etapa del pipeline para un tamaño de Detalle_ventas."""
+    resultados: list[dict[str, Any]] = []
+
+    def etapa(nombre: str, funcion: Callable[[], Any], filas_entrada: int | None) -> Any:
+        resultado, medicion = medir(funcion, repeticiones, memoria)
+        resultados.append({"filas": filas, "etapa": nombre, "filas_entrada": filas_entrada, **medicion})
+        print(f"  {nombre:<26} {medicion['segundos']:>9.3f} s")
+        return resultado
+
+    print(f"== {filas:,} filas de detalle ==")
+    fuentes = etapa("generacion", lambda: generar_datos(filas, semilla), None)
+    total_fuentes = contar_filas(fuentes)
+
+    if filas <= max_filas_excel:
+        origen = directorio / f"filas_{filas}"
+        escribir_excel(fuentes, origen)
+        cache_dir = origen / ".cache_aurelion"
+        etapa(
+            "carga_excel",
+            lambda: cargar_datos(origen, cache_dir=cache_dir, forzar_cache=True),
+            total_fuentes,
+        )
+        data, _ = etapa("carga_cache", lambda: cargar_datos(origen, cache_dir=cache_dir), total_fuentes)
+    else:
+        data = {nombre: aplicar_esquema(df, nombre) for nombre, df in fuentes.items()}
+    del fuentes
+
+    data_limpia = etapa("limpieza", lambda: limpiar_datos(data), total_fuentes)
+    hechos = len(data_limpia["Detalle_ventas"])
+    estrella = etapa("esquema_estrella", lambda: EsquemaEstrella.desde_tablas(data_limpia), hechos)
+
+    def estadisticas() -> AgregadosVentas:
+        agregados = estrella.agregados()
+        agregados.estadisticas
+        return agregados
+
+    agregados = etapa("estadisticas", estadisticas, hechos)
+    corr = etapa("correlaciones", estrella.matriz_correlacion, hechos)
+
+    if incluir_analitica:
+        ventas_analitica = etapa("ventas_analitica", estrella.ventas_analitica, hechos)
+        etapa(
+            "estadisticas_descriptivas",
+            lambda: estadisticas_descriptivas(ventas_analitica),
+            len(ventas_analitica),
+        )
+        del ventas_analitica
+
+    graficos_dir = directorio / f"graficos_{filas}"
+    graficos_dir.mkdir(parents=True, exist_ok=True)
+
+    def graficar() -> list[Path]:
+        renderizador = RenderizadorGraficos(0)
+        renderizador.enviar(trabajos_distribuciones(agregados, graficos_dir))
+        renderizador.enviar(
+            [TrabajoGrafico(graficar_correlaciones, (corr,), graficos_dir / "correlaciones.png")]
+        )
+        return renderizador.esperar()
+
+    etapa("graficos", graficar, len(agregados.ventas_totales))
+    etapa("modelo", lambda: entrenar_modelo(data_limpia["Detalle_ventas"]), hechos)
+    # tracemalloc lo maneja medir(); el entrenamiento no abre su propia medición
+    etapa("modelo_disperso", lambda: entrenar_disperso(estrella, ATRIBUTOS, memoria=False), hechos)
+    return resultados
+
+
+def comparar(
+    actual: list[dict[str, Any]],
+    anterior: list[dict[str, Any]],
+    tolerancia: float = 0.2,
+    minimo_segundos: float = 0.05,
+) -> list[str]:
+    """Etapas más lentas o con más memoria que en ``anterior``.
+
+    Una etapa es regresión si supera el valor anterior en más de
+    ``tolerancia`` (proporción) y, para el tiempo, en más de
+    ``minimo_segundos`` absolutos, para no reportar ruido en etapas cortas.
+    """
+    previos = {(r["filas"], r["etapa"]): r for r in anterior}
+    regresiones = []
+    for registro in actual:
+        previo = previos.get((registro["filas"], registro["etapa"]))
+        if previo is None:
+            continue
+        antes, ahora = previo["segundos"], registro["segundos"]
+        if ahora > antes * (1 + tolerancia) and ahora - antes > minimo_segundos:
+            regresiones.append(
+                f"{registro['etapa']} ({registro['filas']:,} filas): {antes:.3f} s -> {ahora:.3f} s"
+            )
+        antes, ahora = previo.get("pico_memoria_bytes"), registro.get("pico_memoria_bytes")
+        if antes and ahora and ahora > antes * (1 + tolerancia):
+            regresiones.append(
+                f"{registro['etapa']} ({registro['filas']:,} filas): "
+                f"{antes / 2**20:.1f} MiB -> {ahora / 2**20:.1f} MiB"
+            )
+    return regresiones
+
+
+def main(
+    tamanos: list[int],
+    salida: Path,
+    repeticiones: int = 1,
+    memoria: bool = True,
+    max_filas_excel: int = MAX_FILAS_EXCEL,
+    semilla: int = 42,
+    incluir_analitica: bool = True,
+    archivo_comparar: Path | None = None,
+    tolerancia: float = 0.2,
+) -> int:
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+    resultados: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="aurelion_bench_") as tmp:
+        for filas in tamanos:
+            resultados.extend(
+                benchmark_tamano(
+                    filas,
+                    Path(tmp),
+                    repeticiones=repeticiones,
+                    memoria=memoria,
+                    max_filas_excel=max_filas_excel,
+                    semilla=semilla,
+                    incluir_analitica=incluir_analitica,
+                )
+            )
+
+    documento = {
+        "version": VERSION_RESULTADOS,
+        "entorno": entorno(),
+        "parametros": {"repeticiones": repeticiones, "semilla": semilla, "max_filas_excel": max_filas_excel},
+        "resultados": resultados,
+    }
+    salida.write_text(json.dumps(documento, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados guardados en {salida}")
+
+    if archivo_comparar is not None:
+        anterior = json.loads(archivo_comparar.read_text(encoding="utf-8"))
+        regresiones = comparar(resultados, anterior["resultados"], tolerancia)
+        if regresiones:
+            print("Regresiones respecto de", archivo_comparar)
+            for linea in regresiones:
+                print(" ", linea)
+            return 1
+        print(f"Sin regresiones respecto de {archivo_comparar}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--tamanos",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="Filas de Detalle_ventas a generar (de 10^3 a 10^7).",
+    )
+    parser.add_argument(
+        "--salida", type=Path, default=Path("benchmark_aurelion.json"), help="Archivo JSON de resultados."
+    )
+    parser.add_argument("--repeticiones", type=int, default=1, help="Corridas por etapa; se informa el mínimo.")
+    parser.add_argument("--sin-memoria", action="store_true", help="No mide el pico de memoria con tracemalloc.")
+    parser.add_argument(
+        "--max-filas-excel",
+        type=int,
+        default=MAX_FILAS_EXCEL,
+        help="Tamaño máximo para el que se escriben y leen Excel.",
+    )
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla del generador sintético.")
+    parser.add_argument(
+        "--omitir-analitica",
+        action="store_true",
+        help="No mide la tabla ancha ventas_analitica ni estadisticas_descriptivas.",
+    )
+    parser.add_argument("--comparar", type=Path, default=None, help="JSON de una corrida anterior.")
+    parser.add_argument(
+        "--tolerancia", type=float, default=0.2, help="Aumento relativo tolerado antes de marcar regresión."
+    )
+    args = parser.parse_args()
+    raise SystemExit(
+        main(
+            args.tamanos,
+            args.salida,
+            repeticiones=args.repeticiones,
+            memoria=not args.sin_memoria,
+            max_filas_excel=args.max_filas_excel,
+            semilla=args.semilla,
+            incluir_analitica=not args.omitir_analitica,
+            archivo_comparar=args.comparar,
+            tolerancia=args.tolerancia,
+        )
+    )
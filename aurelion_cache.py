@@ -0,0 +1,188 @@
+"""
+Caché columnar en disco para los Excel de Tienda Aurelion.
+
+Cada dataset se guarda en un directorio propio con un archivo ``.npy`` por
+columna y un ``meta.json`` que registra la ruta de origen, su mtime y su
+tamaño. Mientras el Excel no cambie, la carga se resuelve leyendo los arreglos
+binarios y se evita el parseo con openpyxl.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR_NOMBRE = ".cache_aurelion"
+VERSION_CACHE = 1
+
+
+@dataclass
+class ReporteCache:
+    """Acumula los aciertos y fallos de caché de una ejecución.
+
+    ``no_cacheables`` son las tablas con alguna columna que no se puede
+    guardar sin pickle: se leen del Excel en cada ejecución.
+    """
+
+    aciertos: list[str] = field(default_factory=list)
+    fallos: list[str] = field(default_factory=list)
+    no_cacheables: list[str] = field(default_factory=list)
+
+    def resumen(self) -> str:
+        """Devuelve una línea legible con el conteo de aciertos y fallos."""
+        partes = [f"aciertos={len(self.aciertos)}", f"fallos={len(self.fallos)}"]
+        if self.fallos:
+            partes.append(f"reconstruidos: {', '.join(self.fallos)}")
+        if self.no_cacheables:
+            partes.append(f"no cacheables: {', '.join(self.no_cacheables)}")
+        return "Caché columnar: " + ", ".join(partes)
+
+
+def firma_origen(ruta_origen: Path) -> dict[str, object]:
+    """Construye la clave de validez de un archivo fuente."""
+    stat = ruta_origen.stat()
+    return {
+        "ruta": str(ruta_origen.resolve()),
+        "mtime_ns": stat.st_mtime_ns,
+        "tamano": stat.st_size,
+        "version": VERSION_CACHE,
+        "pandas": pd.__version__,
+    }
+
+
+def _leer_meta(dir_cache: Path) -> dict | None:
+    try:
+        return json.loads((dir_cache / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def cache_valida(ruta_origen: Path, dir_cache: Path) -> bool:
+    """Indica si ``dir_cache`` corresponde a la versión actual de ``ruta_origen``."""
+    meta = _leer_meta(dir_cache)
+    if meta is None or not ruta_origen.exists():
+        return False
+    return meta.get("firma") == firma_origen(ruta_origen)
+
+
+def _codificar_columna(serie: pd.Series) -> tuple[str, np.ndarray, np.ndarray | None] | None:
+    """Convierte una columna en arreglos NumPy tipados.
+
+    Devuelve ``None`` si la columna mezcla tipos que no se pueden guardar sin
+    pickle; en ese caso el dataset no se cachea.
+    """
+    if isinstance(serie.dtype, np.dtype) and serie.dtype.kind in "biufmM":
+        return "numero", serie.to_numpy(), None
+    if not pd.api.types.is_object_dtype(serie) and not pd.api.types.is_string_dtype(serie):
+        return None
+    if pd.api.types.infer_dtype(serie, skipna=True) not in ("string", "empty"):
+        return None
+    nulos = serie.isna().to_numpy()
+    valores = np.where(nulos, "", serie.to_numpy(dtype=object)).astype(str)
+    return "texto", valores, nulos
+
+
+def guardar_cache(df: pd.DataFrame, ruta_origen: Path, dir_cache: Path) -> bool:
+    """Escribe ``df`` como columnas ``.npy`` junto a la firma de su origen.
+
+    La escritura se hace en un directorio temporal que luego reemplaza al
+    anterior, de modo que una caché a medio escribir nunca se considera válida.
+    """
+    columnas = []
+    codificadas = []
+    for i, nombre in enumerate(df.columns):
+        codificada = _codificar_columna(df[nombre])
+        if codificada is None:
+            return False
+        tipo, valores, nulos = codificada
+        columnas.append({
+            "nombre": str(nombre),
+            "archivo": f"col_{i:03d}",
+            "tipo": tipo,
+            "dtype": str(df[nombre].dtype),
+        })
+        codificadas.append((valores, nulos))
+
+    tmp = dir_cache.with_name(dir_cache.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for columna, (valores, nulos) in zip(columnas, codificadas):
+        np.save(tmp / f"{columna['archivo']}.npy", valores, allow_pickle=False)
+        if nulos is not None:
+            np.save(tmp / f"{columna['archivo']}.nulos.npy", nulos, allow_pickle=False)
+    meta = {"firma": firma_origen(ruta_origen), "filas": len(df), "columnas": columnas}
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    shutil.rmtree(dir_cache, ignore_errors=True)
+    os.replace(tmp, dir_cache)
+    return True
+
+
+def _decodificar_columna(
+    columna: dict, valores: np.ndarray, nulos: np.ndarray | None
+) -> pd.Series:
+    """Convierte los arreglos guardados de una columna en una ``Series``."""
+    dtype = pd.api.types.pandas_dtype(columna["dtype"])
+    if nulos is None:
+        return pd.Series(np.asarray(valores)).astype(dtype)
+    objetos = np.asarray(valores).astype(object)
+    objetos[np.asarray(nulos)] = np.nan
+    serie = pd.Series(objetos, dtype=object)
+    return serie if dtype == object else serie.astype(dtype)
+
+
+def _abrir_columnas(
+    dir_cache: Path, mmap_mode: str | None = None
+) -> tuple[dict, list[tuple[dict, np.ndarray, np.ndarray | None]]]:
+    meta = _leer_meta(dir_cache)
+    if meta is None:
+        raise FileNotFoundError(f"No hay caché en {dir_cache}")
+
+    arreglos = []
+    for columna in meta["columnas"]:
+        base = dir_cache / columna["archivo"]
+        valores = np.load(f"{base}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+        nulos = None
+        if columna["tipo"] == "texto":
+            nulos = np.load(f"{base}.nulos.npy", mmap_mode=mmap_mode, allow_pickle=False)
+        arreglos.append((columna, valores, nulos))
+    return meta, arreglos
+
+
+def leer_cache(dir_cache: Path) -> pd.DataFrame:
+    """Reconstruye el DataFrame guardado en ``dir_cache``."""
+    meta, arreglos = _abrir_columnas(dir_cache)
+    df = pd.DataFrame({
+        columna["nombre"]: _decodificar_columna(columna, valores, nulos)
+        for columna, valores, nulos in arreglos
+    })
+    df.index = pd.RangeIndex(meta["filas"])
+    return df
+
+
+def iterar_cache(dir_cache: Path, tamano_bloque: int, desde: int = 0) -> Iterator[pd.DataFrame]:
+    """Recorre la caché en bloques de ``tamano_bloque`` filas a partir de la fila ``desde``.
+
+    Los arreglos se abren con ``mmap_mode="r"``, por lo que sólo se copian a
+    memoria las filas del bloque en curso; las anteriores a ``desde`` no se leen.
+    """
+    meta, arreglos = _abrir_columnas(dir_cache, mmap_mode="r")
+    for inicio in range(desde, meta["filas"], tamano_bloque):
+        fin = min(inicio + tamano_bloque, meta["filas"])
+        bloque = pd.DataFrame({
+            columna["nombre"]: _decodificar_columna(
+                columna,
+                valores[inicio:fin],
+                None if nulos is None else nulos[inicio:fin],
+            )
+            for columna, valores, nulos in arreglos
+        })
+        bloque.index = pd.RangeIndex(inicio, fin)
+        yield bloque
@@ -0,0 +1,268 @@
+"""
+Productos complementarios de Tienda Aurelion a partir de los tickets.
+
+Con Detalle_ventas se arma la matriz de incidencia dispersa ``B`` (venta ×
+producto, 1 si el producto está en la venta). ``B.T @ B`` da, en una sola
+multiplicación dispersa, cuántos tickets comparten cada par de productos;
+sólo se generan los pares que aparecen juntos, así que el costo crece con
+el tamaño de los tickets y no con el cuadrado del catálogo. De esos conteos
+salen, por par ``a → b``:
+
+    soporte = tickets con a y b / tickets
+    confianza = tickets con a y b / tickets con a
+    lift = confianza / soporte de b
+
+La poda por soporte mínimo descarta antes de multiplicar los productos
+menos frecuentes (un par nunca es más frecuente que sus productos) y
+después los pares por debajo del umbral. Por categoría, ``B`` se agrega a
+venta × categoría y se cruza con los productos de las demás categorías.
+
+Uso:
+    python aurelion_canasta.py --top 5 --soporte-minimo 0.01
+    python aurelion_canasta.py --producto 12 --ordenar confianza
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from aurelion_cache import CACHE_DIR_NOMBRE
+from aurelion_estrella import EsquemaEstrella
+
+METRICAS = ("lift", "confianza", "soporte", "tickets")
+
+
+def _top_por_fila(
+    filas: np.ndarray, orden: np.ndarray, desempate: np.ndarray, top: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Posiciones y rango (desde 1) de las ``top`` entradas de mayor ``orden`` por fila."""
+    indice = np.lexsort((-desempate, -orden, filas))
+    filas_ordenadas = filas[indice]
+    inicio_fila = np.r_[0, np.flatnonzero(np.diff(filas_ordenadas)) + 1]
+    rango = np.arange(len(indice)) - np.repeat(inicio_fila, np.diff(np.r_[inicio_fila, len(indice)]))
+    elegidos = rango < top
+    return indice[elegidos], rango[elegidos] + 1
+
+
+@dataclass
+class MotorCanasta:
+    """Incidencia venta × producto y los conteos que se derivan de ella.
+
+    Attributes:
+        incidencia: ``csr_matrix`` binaria de tickets × productos podados.
+        productos: ``id_producto`` de cada columna.
+        categorias: Categoría de cada columna (``None`` si no hay catálogo).
+        nombres: Nombre de cada columna, si el catálogo lo tiene.
+        tickets: Ventas con al menos una línea (denominador del soporte).
+    """
+
+    incidencia: sparse.csr_matrix
+    productos: pd.Index
+    categorias: pd.Categorical | None
+    nombres: np.ndarray | None
+    tickets: int
+
+    @classmethod
+    def desde_estrella(cls, estrella: EsquemaEstrella, soporte_minimo: float = 0.0) -> "MotorCanasta":
+        """Arma la incidencia desde las posiciones ya resueltas del esquema estrella."""
+        validos = estrella.pos_producto >= 0
+        filas = estrella.pos_venta[validos]
+        columnas = estrella.pos_producto[validos]
+        # Sólo cuentan los tickets con líneas; se renumeran para no guardar filas vacías
+        tickets, filas = np.unique(filas, return_inverse=True)
+        productos = estrella.productos
+        incidencia = sparse.csr_matrix(
+            (np.ones(len(filas), dtype=np.int32), (filas, columnas)),
+            shape=(len(tickets), len(productos)),
+        )
+        incidencia.data[:] = 1  # Un producto repetido en una venta cuenta una vez
+        categorias = (
+            pd.Categorical(productos.columna("categoria")) if productos.tiene("categoria") else None
+        )
+        nombres = (
+            productos.columna("nombre_producto").to_numpy(dtype=object)
+            if productos.tiene("nombre_producto")
+            else None
+        )
+        motor = cls(incidencia, productos.indice, categorias, nombres, len(tickets))
+        return motor.podar(soporte_minimo)
+
+    @classmethod
+    def desde_detalle(cls, Detalle_ventas: pd.DataFrame, soporte_minimo: float = 0.0) -> "MotorCanasta":
+        """Incidencia directa desde un Detalle_ventas, con ``categoria`` si la trae."""
+        filas, _ = pd.factorize(Detalle_ventas["id_venta"])
+        columnas, productos = pd.factorize(Detalle_ventas["id_producto"], sort=True)
+        validos = (filas >= 0) & (columnas >= 0)
+        incidencia = sparse.csr_matrix(
+            (np.ones(validos.sum(), dtype=np.int32), (filas[validos], columnas[validos])),
+            shape=(filas.max() + 1 if len(filas) else 0, len(productos)),
+        )
+        incidencia.data[:] = 1
+        primeras = Detalle_ventas.drop_duplicates("id_producto").set_index("id_producto")
+        categorias = (
+            pd.Categorical(primeras["categoria"].reindex(productos).to_numpy())
+            if "categoria" in primeras
+            else None
+        )
+        nombres = (
+            primeras["nombre_producto"].reindex(productos).to_numpy(dtype=object)
+            if "nombre_producto" in primeras
+            else None
+        )
+        motor = cls(incidencia, pd.Index(productos, name="id_producto"), categorias, nombres, incidencia.shape[0])
+        return motor.podar(soporte_minimo)
+
+    @property
+    def conteos(self) -> np.ndarray:
+        """Tickets en los que aparece cada producto."""
+        return np.asarray(self.incidencia.sum(axis=0)).ravel()
+
+    def podar(self, soporte_minimo: float) -> "MotorCanasta":
+        """Descarta productos con soporte menor a ``soporte_minimo`` (y los que no se vendieron)."""
+        conservar = np.flatnonzero(self.conteos >= max(soporte_minimo * self.tickets, 1))
+        if len(conservar) == len(self.productos):
+            return self
+        return MotorCanasta(
+            self.incidencia[:, conservar].tocsr(),
+            self.productos[conservar],
+            None if self.categorias is None else self.categorias[conservar],
+            None if self.nombres is None else self.nombres[conservar],
+            self.tickets,
+        )
+
+    def _metricas(
+        self, conjunta: sparse.coo_matrix, conteo_origen: np.ndarray, conteo_destino: np.ndarray
+    ) -> pd.DataFrame:
+        tickets_juntos = conjunta.data.astype(np.int64)
+        origen = conteo_origen[conjunta.row]
+        destino = conteo_destino[conjunta.col]
+        return pd.DataFrame({
+            "origen": conjunta.row,
+            "destino": conjunta.col,
+            "tickets": tickets_juntos,
+            "soporte": tickets_juntos / self.tickets,
+            "confianza": tickets_juntos / origen,
+            "lift": tickets_juntos * self.tickets / (origen * destino.astype(float)),
+        })
+
+    def pares(self, soporte_minimo: float = 0.0) -> pd.DataFrame:
+        """Todos los pares ``a → b`` (ambos sentidos) con soporte suficiente."""
+        conjunta = (self.incidencia.T @ self.incidencia).tocoo()
+        fuera_diagonal = conjunta.row != conjunta.col
+        fuera_diagonal &= conjunta.data >= max(soporte_minimo * self.tickets, 1)
+        conjunta = sparse.coo_matrix(
+            (conjunta.data[fuera_diagonal], (conjunta.row[fuera_diagonal], conjunta.col[fuera_diagonal])),
+            shape=conjunta.shape,
+        )
+        conteos = self.conteos
+        return self._metricas(conjunta, conteos, conteos)
+
+    def _top(self, pares: pd.DataFrame, top: int, ordenar: str) -> pd.DataFrame:
+        if ordenar not in METRICAS:
+            raise ValueError(f"Métrica de orden desconocida: {ordenar}")
+        elegidos, rango = _top_por_fila(
+            pares["origen"].to_numpy(),
+            pares[ordenar].to_numpy(dtype=float),
+            pares["tickets"].to_numpy(dtype=float),
+            top,
+        )
+        resultado = pares.iloc[elegidos].reset_index(drop=True)
+        resultado.insert(2, "rango", rango)
+        return resultado
+
+    def complementarios_producto(
+        self, top: int = 5, soporte_minimo: float = 0.0, ordenar: str = "lift"
+    ) -> pd.DataFrame:
+        """Los ``top`` productos más afines a cada ``id_producto``."""
+        resultado = self._top(self.pares(soporte_minimo), top, ordenar)
+        origen, destino = resultado.pop("origen").to_numpy(), resultado.pop("destino").to_numpy()
+        columnas = {
+            "id_producto": self.productos[origen],
+            "id_complementario": self.productos[destino],
+        }
+        if self.nombres is not None:
+            columnas["nombre_producto"] = self.nombres[origen]
+            columnas["nombre_complementario"] = self.nombres[destino]
+        if self.categorias is not None:
+            columnas["categoria_complementario"] = np.asarray(self.categorias)[destino]
+        return pd.concat([pd.DataFrame(columnas), resultado], axis=1).set_index(["id_producto", "rango"])
+
+    def complementarios_categoria(
+        self, top: int = 5, soporte_minimo: float = 0.0, ordenar: str = "lift"
+    ) -> pd.DataFrame:
+        """Los ``top`` productos de otras categorías más afines a cada categoría."""
+        if self.categorias is None:
+            raise ValueError("No hay categoría de producto para agrupar")
+        codigos = np.asarray(self.categorias.codes)
+        conocidos = np.flatnonzero(codigos >= 0)
+        pertenencia = sparse.csr_matrix(
+            (np.ones(len(conocidos), dtype=np.int32), (conocidos, codigos[conocidos])),
+            shape=(len(self.productos), len(self.categorias.categories)),
+        )
+        # Tickets × categoría: 1 si el ticket tiene algún producto de la categoría
+        por_categoria = (self.incidencia @ pertenencia).tocsr()
+        por_categoria.data[:] = 1
+        conjunta = (por_categoria.T @ self.incidencia).tocoo()
+        propia = codigos[conjunta.col] == conjunta.row
+        conjunta.data[propia] = 0
+        conjunta.eliminate_zeros()
+        conjunta.data[conjunta.data < max(soporte_minimo * self.tickets, 1)] = 0
+        conjunta.eliminate_zeros()
+        conteo_categoria = np.asarray(por_categoria.sum(axis=0)).ravel()
+        resultado = self._top(self._metricas(conjunta.tocoo(), conteo_categoria, self.conteos), top, ordenar)
+        origen, destino = resultado.pop("origen").to_numpy(), resultado.pop("destino").to_numpy()
+        columnas = {
+            "categoria": np.asarray(self.categorias.categories, dtype=object)[origen],
+            "id_complementario": self.productos[destino],
+        }
+        if self.nombres is not None:
+            columnas["nombre_complementario"] = self.nombres[destino]
+        columnas["categoria_complementario"] = np.asarray(self.categorias)[destino]
+        return pd.concat([pd.DataFrame(columnas), resultado], axis=1).set_index(["categoria", "rango"])
+
+
+def main(
+    top: int,
+    soporte_minimo: float,
+    ordenar: str,
+    producto: int | None,
+    salida: Path | None,
+) -> int:
+    from proyecto_Aurelion import cargar_datos, limpiar_datos
+
+    base_dir = Path(__file__).resolve().parent
+    data, _ = cargar_datos(base_dir, cache_dir=base_dir / CACHE_DIR_NOMBRE)
+    estrella = EsquemaEstrella.desde_tablas(limpiar_datos(data))
+    motor = MotorCanasta.desde_estrella(estrella, soporte_minimo)
+    print(
+        f"Tickets: {motor.tickets:,}, productos con soporte >= {soporte_minimo}: {len(motor.productos):,}"
+    )
+    por_producto = motor.complementarios_producto(top, soporte_minimo, ordenar)
+    if producto is not None:
+        por_producto = por_producto[por_producto.index.get_level_values("id_producto") == producto]
+    print(por_producto.to_string(float_format=lambda x: f"{x:.3f}"))
+    if motor.categorias is not None and producto is None:
+        print(motor.complementarios_categoria(top, soporte_minimo, ordenar).to_string(float_format=lambda x: f"{x:.3f}"))
+    if salida is not None:
+        por_producto.to_csv(salida)
+        print(f"Complementarios guardados en {salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=5, help="Complementarios por producto o categoría.")
+    parser.add_argument(
+        "--soporte-minimo", type=float, default=0.0, help="Proporción mínima de tickets de productos y pares."
+    )
+    parser.add_argument("--ordenar", choices=METRICAS, default="lift", help="Métrica para elegir el top.")
+    parser.add_argument("--producto", type=int, default=None, help="Muestra sólo este id_producto.")
+    parser.add_argument("--salida", type=Path, default=None, help="CSV de complementarios por producto.")
+    args = parser.parse_args()
+    raise SystemExit(main(args.top, args.soporte_minimo, args.ordenar, args.producto, args.salida))
@@ -0,0 +1,187 @@
+"""
+Línea de comandos de Tienda Aurelion por etapas.
+
+Cada subcomando importa sólo lo que necesita y recién al ejecutarse:
+``estadisticas`` no carga matplotlib, seaborn ni scikit-learn, que dominan
+el arranque de ``proyecto_Aurelion.py``. Al terminar se informa cuánto tardó
+cada importación del subcomando y el total.
+
+Subcomandos:
+    cargar: lee los Excel (o su caché) y exporta los CSV de origen.
+    limpiar: además limpia, valida y exporta los ``*_limpio.csv``.
+    estadisticas: además calcula las métricas y la matriz de correlación.
+    graficos: estadísticas y los tres gráficos.
+    modelo: entrena la regresión del importe y guarda su artefacto.
+    todo: el análisis completo de ``proyecto_Aurelion.main``.
+
+Uso:
+    python aurelion_cli.py estadisticas --entrada datos/ --salida resultados/
+    python aurelion_cli.py todo --entrada datos/
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aurelion_exportacion import ExportadorCSV
+
+# Módulos pesados de cada subcomando, en orden de importación
+BASE = ("numpy", "pandas", "proyecto_Aurelion")
+IMPORTACIONES = {
+    "cargar": BASE,
+    "limpiar": BASE,
+    "estadisticas": (*BASE, "aurelion_estrella"),
+    "graficos": (*BASE, "aurelion_estrella", "matplotlib", "matplotlib.pyplot", "seaborn"),
+    "modelo": (*BASE, "sklearn.linear_model", "sklearn.model_selection", "aurelion_prediccion"),
+    "todo": (*BASE, "aurelion_estrella", "matplotlib", "matplotlib.pyplot", "seaborn", "sklearn.linear_model"),
+}
+
+
+def importar(modulos: tuple[str, ...]) -> dict[str, float]:
+    """Importa ``modulos`` en orden y devuelve los segundos que agregó cada uno.
+
+    Un módulo ya importado por uno anterior cuenta cero.
+    """
+    tiempos = {}
+    for modulo in modulos:
+        inicio = time.perf_counter()
+        importlib.import_module(modulo)
+        tiempos[modulo] = time.perf_counter() - inicio
+    return tiempos
+
+
+def resumen_importaciones(comando: str, tiempos: dict[str, float]) -> str:
+    detalle = ", ".join(f"{modulo} {segundos:.3f} s" for modulo, segundos in tiempos.items())
+    return f"Importaciones de '{comando}': {sum(tiempos.values()):.3f} s ({detalle})"
+
+
+def _cargar(args: argparse.Namespace, exportador: "ExportadorCSV") -> tuple[dict, dict]:
+    from aurelion_cache import CACHE_DIR_NOMBRE, ReporteCache
+    from proyecto_Aurelion import cargar_datos, exportar_fuentes_csv
+
+    reporte = ReporteCache()
+    data, rutas = cargar_datos(
+        args.entrada,
+        cache_dir=None if args.sin_cache else args.entrada / CACHE_DIR_NOMBRE,
+        reporte=reporte,
+    )
+    if not args.sin_cache:
+        print(reporte.resumen())
+    exportar_fuentes_csv(data, rutas, args.salida, exportador)
+    return data, rutas
+
+
+def _limpiar(args: argparse.Namespace, exportador: "ExportadorCSV") -> dict:
+    from aurelion_validacion import ReporteValidacion
+    from proyecto_Aurelion import limpiar_datos
+
+    data, rutas = _cargar(args, exportador)
+    reporte = ReporteValidacion()
+    data_limpia = limpiar_datos(data, reporte_validacion=reporte)
+    reporte.guardar(args.salida, exportador)
+    print(reporte.resumen())
+    for nombre, df in data_limpia.items():
+        exportador.exportar(df, f"{rutas[nombre].stem}_limpio.csv")
+    return data_limpia
+
+
+def _estadisticas(args: argparse.Namespace, exportador: "ExportadorCSV") -> tuple:
+    from aurelion_estrella import EsquemaEstrella
+    from proyecto_Aurelion import guardar_estadisticas
+
+    estrella = EsquemaEstrella.desde_tablas(_limpiar(args, exportador))
+    agregados = estrella.agregados()
+    corr = estrella.matriz_correlacion()
+    guardar_estadisticas(agregados.estadisticas, args.salida, exportador)
+    exportador.exportar(corr, "matriz_correlacion.csv", index=True)
+    print("=== Estadísticas descriptivas ===")
+    print(agregados.estadisticas["resumen_general"].to_string())
+    return agregados, corr
+
+
+def _graficos(args: argparse.Namespace, exportador: "ExportadorCSV") -> None:
+    from aurelion_graficos import RenderizadorGraficos, TrabajoGrafico, graficar_correlaciones
+    from proyecto_Aurelion import trabajos_distribuciones
+
+    agregados, corr = _estadisticas(args, exportador)
+    with RenderizadorGraficos(args.procesos_graficos) as graficos:
+        graficos.enviar(trabajos_distribuciones(agregados, args.salida))
+        graficos.enviar([TrabajoGrafico(graficar_correlaciones, (corr,), args.salida / "correlaciones.png")])
+        rutas = graficos.esperar()
+    for ruta in rutas:
+        print(f"Gráfico: {ruta}")
+
+
+def _modelo(args: argparse.Namespace, exportador: "ExportadorCSV") -> None:
+    from aurelion_prediccion import MODELOS_DIR_NOMBRE, ArtefactoModelo, CodificadorImporte, guardar_artefacto
+    from proyecto_Aurelion import entrenar_modelo
+
+    Detalle_ventas = _limpiar(args, exportador)["Detalle_ventas"]
+    codificador = CodificadorImporte.ajustar(Detalle_ventas)
+    modelo, metricas = entrenar_modelo(Detalle_ventas, codificador)
+    artefacto = ArtefactoModelo.desde_modelo(modelo, codificador, metricas, len(Detalle_ventas))
+    ruta, nuevo = guardar_artefacto(artefacto, args.salida / MODELOS_DIR_NOMBRE)
+    print(f"R2 Score: {metricas['r2']:.2f}")
+    print(f"MAE: {metricas['mae']:.2f}")
+    print(f"Modelo v{artefacto.version} {'guardado en' if nuevo else 'sin cambios:'} {ruta}")
+
+
+ETAPAS = {
+    "cargar": _cargar,
+    "limpiar": _limpiar,
+    "estadisticas": _estadisticas,
+    "graficos": _graficos,
+    "modelo": _modelo,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    for comando in IMPORTACIONES:
+        sub = comandos.add_parser(comando, help=f"Ejecuta hasta la etapa '{comando}'.")
+        sub.add_argument(
+            "--entrada",
+            type=Path,
+            default=Path.cwd(),
+            help="Carpeta con Clientes, Ventas, Detalle_ventas y Productos .xlsx (por defecto la actual).",
+        )
+        sub.add_argument("--salida", type=Path, default=None, help="Carpeta de resultados (por defecto --entrada).")
+        sub.add_argument("--sin-cache", action="store_true", help="Lee siempre los Excel sin la caché columnar.")
+        if comando in ("graficos", "todo"):
+            sub.add_argument(
+                "--procesos-graficos", type=int, default=None, help="Procesos para renderizar gráficos."
+            )
+    args = parser.parse_args(argv)
+    args.salida = args.salida or args.entrada
+    args.salida.mkdir(parents=True, exist_ok=True)
+
+    tiempos = importar(IMPORTACIONES[args.comando])
+    if args.comando == "todo":
+        from proyecto_Aurelion import main as analisis_completo
+
+        analisis_completo(
+            usar_cache=not args.sin_cache,
+            procesos_graficos=args.procesos_graficos,
+            entrada=args.entrada,
+            salida=args.salida,
+        )
+    else:
+        from aurelion_exportacion import ExportadorCSV
+
+        exportador = ExportadorCSV(args.salida)
+        ETAPAS[args.comando](args, exportador)
+        exportador.guardar_manifiesto()
+        print(exportador.resumen())
+    print(resumen_importaciones(args.comando, tiempos), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
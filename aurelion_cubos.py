@@ -0,0 +1,344 @@
+"""
+Cubos de ventas por fecha para consultas rápidas de tableros.
+
+:class:`CuboVentas` guarda, por día, categoría, medio de pago y ciudad del
+cliente, el importe y la cantidad de ventas, más la pertenencia de cada
+cliente a esas celdas para contar clientes únicos. Los rollups semanales y
+mensuales se obtienen sumando días, y :meth:`CuboVentas.consultar` responde
+rangos como "marzo a mayo, tarjeta, Limpieza" sin volver a Detalle_ventas.
+
+Se guardan tres tablas chicas:
+    celdas: día × categoría × medio de pago × ciudad, con importe y ventas
+        (una venta con líneas en dos categorías cuenta en ambas).
+    totales: día × medio de pago × ciudad, con importe y ventas de cada
+        venta completa; incluye las ventas sin líneas.
+    clientes: combinaciones distintas de día × categoría × medio de pago ×
+        ciudad × cliente, para contar clientes únicos en cualquier rango.
+
+El cubo se persiste en un ``.npz`` con las dimensiones codificadas y se
+actualiza de forma incremental: sólo se recalculan los días desde el
+último día guardado, que puede haber quedado incompleto.
+
+Uso:
+    python aurelion_cubos.py --desde 2024-03 --hasta 2024-05 --medio-pago tarjeta --categoria Limpieza
+    python aurelion_cubos.py --grano semana --por ciudad
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from aurelion_cache import CACHE_DIR_NOMBRE
+from aurelion_estrella import EsquemaEstrella
+
+CUBOS_NOMBRE = "cubos_ventas.npz"
+DIMENSIONES = ("categoria", "medio_pago", "ciudad")
+GRANOS = {"dia": "D", "semana": "W", "mes": "M"}
+TABLAS = ("celdas", "totales", "clientes")
+SIN_DATO = "(sin dato)"
+
+
+def _dimension(valores: pd.Series | pd.api.extensions.ExtensionArray | np.ndarray) -> pd.Categorical:
+    """Dimensión como categoría, con los faltantes en ``SIN_DATO``."""
+    serie = pd.Series(np.asarray(valores, dtype=object))
+    return pd.Categorical(serie.where(serie.notna(), SIN_DATO))
+
+
+def _tomar(columna: pd.Series, posiciones: np.ndarray) -> np.ndarray:
+    return pd.api.extensions.take(columna.array, posiciones, allow_fill=True).to_numpy(dtype=object)
+
+
+def _a_lista(valor: str | Iterable[str] | None) -> list[str] | None:
+    if valor is None:
+        return None
+    return [valor] if isinstance(valor, str) else list(valor)
+
+
+def _limite(valor: str | pd.Timestamp | None, fin: bool) -> pd.Timestamp | None:
+    """Un texto como ``"2024-03"`` abarca el período entero (todo marzo)."""
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        periodo = pd.Period(valor)
+        return (periodo.end_time if fin else periodo.start_time).normalize()
+    return pd.Timestamp(valor).normalize()
+
+
+@dataclass
+class CuboVentas:
+    """Rollups de ventas por día y dimensiones. Ver el docstring del módulo."""
+
+    celdas: pd.DataFrame
+    totales: pd.DataFrame
+    clientes: pd.DataFrame
+
+    @classmethod
+    def desde_estrella(cls, estrella: EsquemaEstrella, desde: pd.Timestamp | None = None) -> "CuboVentas":
+        """Arma el cubo desde el esquema estrella, opcionalmente sólo desde un día."""
+        ventas = estrella.ventas.tabla
+        dia = ventas["fecha"].dt.normalize()
+        importe = estrella.hechos["importe"].to_numpy(dtype=float, na_value=0.0)
+        entero = pd.api.types.is_integer_dtype(estrella.hechos["importe"])
+
+        ciudad = (
+            _tomar(estrella.clientes.columna("ciudad"), estrella.pos_cliente_venta)
+            if estrella.clientes.tiene("ciudad")
+            else np.full(len(ventas), None, dtype=object)
+        )
+        por_venta = pd.DataFrame({
+            "dia": dia.to_numpy(),
+            "medio_pago": _dimension(ventas["medio_pago"]),
+            "ciudad": _dimension(ciudad),
+            "id_cliente": ventas["id_cliente"].to_numpy(),
+            "importe": np.bincount(estrella.pos_venta, weights=importe, minlength=len(ventas)),
+        })
+        en_rango = por_venta["dia"].notna().to_numpy()
+        if desde is not None:
+            en_rango = en_rango & (por_venta["dia"] >= desde).to_numpy()
+
+        categoria = (
+            _tomar(estrella.productos.columna("categoria"), estrella.pos_producto)
+            if estrella.productos.tiene("categoria")
+            else np.full(len(estrella.hechos), None, dtype=object)
+        )
+        lineas = pd.DataFrame({
+            "venta": estrella.pos_venta,
+            "categoria": _dimension(categoria),
+            "importe": importe,
+        })
+        lineas = lineas[en_rango[estrella.pos_venta]]
+        # Una fila por venta y categoría, con las dimensiones de la venta
+        por_categoria = lineas.groupby(["venta", "categoria"], observed=True).agg(importe=("importe", "sum"))
+        por_categoria = por_categoria.reset_index()
+        por_categoria = por_categoria.join(
+            por_venta.drop(columns="importe"), on="venta"
+        ).drop(columns="venta")
+
+        claves = ["dia", *DIMENSIONES]
+        celdas = (
+            por_categoria.groupby(claves, observed=True)
+            .agg(importe=("importe", "sum"), ventas=("importe", "size"))
+            .reset_index()
+        )
+        totales = (
+            por_venta[en_rango]
+            .groupby(["dia", "medio_pago", "ciudad"], observed=True)
+            .agg(importe=("importe", "sum"), ventas=("importe", "size"))
+            .reset_index()
+        )
+        clientes = por_categoria[[*claves, "id_cliente"]].drop_duplicates().reset_index(drop=True)
+
+        if entero:
+            celdas["importe"] = celdas["importe"].astype(np.int64)
+            totales["importe"] = totales["importe"].astype(np.int64)
+        for tabla in (celdas, totales):
+            tabla["ventas"] = tabla["ventas"].astype(np.int32)
+        return cls(celdas, totales, clientes)
+
+    @property
+    def ultimo_dia(self) -> pd.Timestamp | None:
+        if self.totales.empty:
+            return None
+        return self.totales["dia"].max()
+
+    def reemplazar_desde(self, nuevo: "CuboVentas", desde: pd.Timestamp) -> "CuboVentas":
+        """Conserva los días anteriores a ``desde`` y toma el resto de ``nuevo``."""
+        partes = {}
+        for nombre in TABLAS:
+            viejo = getattr(self, nombre)
+            combinado = pd.concat([viejo[viejo["dia"] < desde], getattr(nuevo, nombre)], ignore_index=True)
+            for dimension in DIMENSIONES:
+                if dimension in combinado.columns:
+                    combinado[dimension] = _dimension(combinado[dimension])
+            partes[nombre] = combinado
+        return CuboVentas(**partes)
+
+    def _filtrar(
+        self,
+        tabla: pd.DataFrame,
+        desde: pd.Timestamp | None,
+        hasta: pd.Timestamp | None,
+        filtros: dict[str, list[str] | None],
+    ) -> pd.DataFrame:
+        mascara = np.ones(len(tabla), dtype=bool)
+        if desde is not None:
+            mascara &= (tabla["dia"] >= desde).to_numpy()
+        if hasta is not None:
+            mascara &= (tabla["dia"] <= hasta).to_numpy()
+        for dimension, valores in filtros.items():
+            if valores is not None:
+                mascara &= tabla[dimension].isin(valores).to_numpy()
+        return tabla[mascara]
+
+    def consultar(
+        self,
+        desde: str | pd.Timestamp | None = None,
+        hasta: str | pd.Timestamp | None = None,
+        categoria: str | Iterable[str] | None = None,
+        medio_pago: str | Iterable[str] | None = None,
+        ciudad: str | Iterable[str] | None = None,
+        grano: str | None = None,
+        por: Iterable[str] = (),
+    ) -> pd.DataFrame:
+        """Importe, ventas, clientes únicos y ticket promedio de un rango.
+
+        Args:
+            desde: Primer día incluido; ``"2024-03"`` empieza el 1 de marzo.
+            hasta: Último día incluido; ``"2024-05"`` llega al 31 de mayo.
+            categoria: Una o varias categorías. Si se filtra o agrupa por
+                categoría, una venta con líneas en varias cuenta en cada una.
+            medio_pago: Uno o varios medios de pago.
+            ciudad: Una o varias ciudades del cliente.
+            grano: ``"dia"``, ``"semana"`` o ``"mes"``; sin grano se
+                devuelve una sola fila con el total del rango.
+            por: Dimensiones adicionales por las que agrupar.
+
+        Returns:
+            Un DataFrame con ``importe``, ``ventas``, ``clientes_unicos`` y
+            ``ticket_promedio`` indexado por período y dimensiones pedidas.
+        """
+        por = list(por)
+        desconocidas = set(por) - set(DIMENSIONES)
+        if desconocidas or (grano is not None and grano not in GRANOS):
+            raise ValueError(f"Agrupación no soportada: grano={grano}, por={sorted(desconocidas)}")
+
+        desde, hasta = _limite(desde, fin=False), _limite(hasta, fin=True)
+        filtros = {
+            "categoria": _a_lista(categoria),
+            "medio_pago": _a_lista(medio_pago),
+            "ciudad": _a_lista(ciudad),
+        }
+        # La tabla sin categoría cuenta cada venta una sola vez
+        usa_categoria = "categoria" in por or filtros["categoria"] is not None
+        base = self.celdas if usa_categoria else self.totales
+        medidas = self._filtrar(base, desde, hasta, filtros)
+        miembros = self._filtrar(self.clientes, desde, hasta, filtros)
+
+        def claves(tabla: pd.DataFrame) -> list[pd.Series]:
+            grupos = [tabla[dimension] for dimension in por]
+            if grano is not None:
+                grupos.insert(0, tabla["dia"].dt.to_period(GRANOS[grano]).rename("periodo"))
+            return grupos
+
+        if grano is None and not por:
+            resultado = pd.DataFrame(
+                {
+                    "importe": [medidas["importe"].sum()],
+                    "ventas": [int(medidas["ventas"].sum())],
+                    "clientes_unicos": [miembros["id_cliente"].nunique()],
+                },
+                index=pd.Index(["total"], name="periodo"),
+            )
+        else:
+            resultado = medidas.groupby(claves(medidas), observed=True)[["importe", "ventas"]].sum()
+            unicos = miembros.groupby(claves(miembros), observed=True)["id_cliente"].nunique()
+            resultado["clientes_unicos"] = unicos.reindex(resultado.index, fill_value=0)
+        resultado["ticket_promedio"] = resultado["importe"] / resultado["ventas"].where(resultado["ventas"] > 0)
+        return resultado
+
+    def rollup(self, grano: str, por: Iterable[str] = DIMENSIONES) -> pd.DataFrame:
+        """Rollup completo en ``grano`` por las dimensiones ``por``."""
+        return self.consultar(grano=grano, por=por)
+
+    def a_estado(self) -> dict[str, np.ndarray]:
+        """Arreglos para ``np.savez``: días como ``datetime64[D]`` y dimensiones como códigos."""
+        estado: dict[str, np.ndarray] = {}
+        for nombre in TABLAS:
+            tabla = getattr(self, nombre)
+            for columna in tabla.columns:
+                clave = f"{nombre}__{columna}"
+                serie = tabla[columna]
+                if isinstance(serie.dtype, pd.CategoricalDtype):
+                    estado[clave] = serie.cat.codes.to_numpy()
+                    estado[f"{clave}__categorias"] = np.asarray(serie.cat.categories, dtype=str)
+                elif columna == "dia":
+                    estado[clave] = serie.to_numpy(dtype="datetime64[D]")
+                else:
+                    estado[clave] = serie.to_numpy()
+        return estado
+
+    @classmethod
+    def desde_estado(cls, estado: dict[str, np.ndarray]) -> "CuboVentas":
+        partes: dict[str, dict[str, object]] = {nombre: {} for nombre in TABLAS}
+        for clave, valores in estado.items():
+            nombre, _, columna = clave.partition("__")
+            if columna.endswith("__categorias"):
+                continue
+            if f"{clave}__categorias" in estado:
+                valores = pd.Categorical.from_codes(valores, estado[f"{clave}__categorias"].astype(object))
+            elif columna == "dia":
+                valores = valores.astype("datetime64[ns]")
+            partes[nombre][columna] = valores
+        return cls(**{nombre: pd.DataFrame(columnas) for nombre, columnas in partes.items()})
+
+
+def cargar_cubo(ruta: Path) -> CuboVentas | None:
+    if not ruta.exists():
+        return None
+    with np.load(ruta, allow_pickle=False) as archivo:
+        return CuboVentas.desde_estado({clave: archivo[clave] for clave in archivo.files})
+
+
+def guardar_cubo(cubo: CuboVentas, ruta: Path) -> None:
+    """Escribe el cubo de forma atómica (archivo temporal y ``os.replace``)."""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    with open(tmp, "wb") as archivo:
+        np.savez_compressed(archivo, **cubo.a_estado())
+    os.replace(tmp, ruta)
+
+
+def actualizar_cubo(estrella: EsquemaEstrella, ruta: Path, reconstruir: bool = False) -> CuboVentas:
+    """Agrega al cubo guardado los días nuevos de ``estrella`` y lo persiste.
+
+    Se recalcula desde el último día guardado inclusive. Si cambiaron ventas
+    de días anteriores hay que reconstruir el cubo (``reconstruir=True``).
+    """
+    previo = None if reconstruir else cargar_cubo(ruta)
+    desde = None if previo is None else previo.ultimo_dia
+    nuevo = CuboVentas.desde_estrella(estrella, desde=desde)
+    cubo = nuevo if previo is None or desde is None else previo.reemplazar_desde(nuevo, desde)
+    guardar_cubo(cubo, ruta)
+    return cubo
+
+
+def main(
+    desde: str | None,
+    hasta: str | None,
+    categoria: list[str] | None,
+    medio_pago: list[str] | None,
+    ciudad: list[str] | None,
+    grano: str | None,
+    por: list[str],
+) -> int:
+    base_dir = Path(__file__).resolve().parent
+    ruta = base_dir / CACHE_DIR_NOMBRE / CUBOS_NOMBRE
+    cubo = cargar_cubo(ruta)
+    if cubo is None:
+        print(f"No hay cubos en {ruta}; ejecutar proyecto_Aurelion.py --cubos primero.")
+        return 1
+    resultado = cubo.consultar(desde, hasta, categoria, medio_pago, ciudad, grano, por)
+    print(resultado.to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--desde", default=None, help="Primer día o mes incluido (AAAA-MM o AAAA-MM-DD).")
+    parser.add_argument("--hasta", default=None, help="Último día o mes incluido (AAAA-MM o AAAA-MM-DD).")
+    parser.add_argument("--categoria", nargs="+", default=None, help="Categorías a incluir.")
+    parser.add_argument("--medio-pago", nargs="+", default=None, help="Medios de pago a incluir.")
+    parser.add_argument("--ciudad", nargs="+", default=None, help="Ciudades a incluir.")
+    parser.add_argument("--grano", choices=list(GRANOS), default=None, help="Período de agrupación.")
+    parser.add_argument("--por", nargs="+", choices=DIMENSIONES, default=[], help="Dimensiones a desglosar.")
+    args = parser.parse_args()
+    raise SystemExit(
+        main(args.desde, args.hasta, args.categoria, args.medio_pago, args.ciudad, args.grano, args.por)
+    )
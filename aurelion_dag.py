@@ -0,0 +1,890 @@
+"""
+Ejecución del análisis de Tienda Aurelion como un grafo de etapas.
+
+Cada :class:`Etapa` declara las salidas que consume y las que produce, y el
+:class:`EjecutorDAG` la lanza en cuanto sus entradas están listas: en un
+``ThreadPoolExecutor`` si es E/S o pandas sobre tablas grandes (que no
+conviene serializar hacia otro proceso) o en un ``ProcessPoolExecutor`` si
+recibe poco y calcula mucho, como los gráficos y el modelo.
+
+Las salidas se direccionan por contenido. La clave de una etapa es el hash
+del código de sus módulos, de sus parámetros y de la huella de cada entrada;
+la huella de una salida es el hash de su contenido (tablas, series,
+arreglos, diccionarios de ellos) o, si no se puede calcular, se deriva de la
+clave. Si la clave coincide con la de la corrida anterior y los archivos que
+la etapa escribió siguen intactos, la etapa se omite; su valor se lee del
+disco sólo si una etapa posterior tiene que ejecutarse. Al terminar,
+:meth:`EjecucionDAG.resumen` informa la ruta crítica y la holgura de cada
+etapa.
+
+Uso:
+    python proyecto_Aurelion.py --dag --tiempos
+"""
+
+from __future__ import annotations
+
+import cProfile
+import dataclasses
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from aurelion_cache import CACHE_DIR_NOMBRE
+from aurelion_exportacion import escribir_atomico
+from aurelion_graficos import UMBRAL_KDE
+from aurelion_instrumentacion import RegistroEtapa, contar_filas
+
+if TYPE_CHECKING:
+    from aurelion_exportacion import ExportadorCSV
+    from aurelion_instrumentacion import Instrumentacion
+
+ESTADO_DIR_NOMBRE = "etapas"
+VERSION_ESTADO = 1
+EJECUTORES = ("hilo", "proceso")
+
+
+@dataclass
+class Etapa:
+    """Un paso del grafo.
+
+    ``funcion`` recibe cada entrada y cada parámetro como argumento con
+    nombre, y devuelve el valor de la única salida o una tupla con una por
+    salida. Las salidas que son rutas (o listas de rutas) se tratan como
+    archivos escritos por la etapa. ``modulos`` son los módulos cuyo código
+    entra en la clave, además del de ``funcion``. Una etapa no ``cacheable``
+    se ejecuta siempre, como la carga, que ya tiene su propia caché.
+    """
+
+    nombre: str
+    funcion: Callable[..., Any]
+    entradas: tuple[str, ...] = ()
+    salidas: tuple[str, ...] = ()
+    ejecutor: str = "hilo"
+    parametros: dict[str, Any] = field(default_factory=dict)
+    modulos: tuple[str, ...] = ()
+    cacheable: bool = True
+
+    def __post_init__(self) -> None:
+        if self.ejecutor not in EJECUTORES:
+            raise ValueError(f"Ejecutor desconocido para {self.nombre}: {self.ejecutor}")
+        self.salidas = self.salidas or (self.nombre,)
+
+
+def _alimentar(digest: Any, valor: Any, memo: dict[int, tuple[Any, bytes]]) -> bool:
+    """Agrega ``valor`` al hash; devuelve ``False`` si no se sabe hashear su contenido."""
+    if valor is None or isinstance(valor, (bool, int, float, str, bytes, Path)):
+        digest.update(repr((type(valor).__name__, valor)).encode())
+        return True
+    if isinstance(valor, (pd.DataFrame, pd.Series, pd.Index, np.ndarray)):
+        # Una tabla puede aparecer en varias salidas (un dict y una de sus tablas)
+        if id(valor) not in memo:
+            parcial = hashlib.blake2b(digest_size=16)
+            if isinstance(valor, np.ndarray):
+                if valor.dtype == object:
+                    return False
+                parcial.update(repr((valor.dtype.str, valor.shape)).encode())
+                parcial.update(np.ascontiguousarray(valor).tobytes())
+            else:
+                columnas = list(valor.columns) if isinstance(valor, pd.DataFrame) else [valor.name]
+                tipos = list(valor.dtypes) if isinstance(valor, pd.DataFrame) else [valor.dtype]
+                parcial.update(repr((type(valor).__name__, columnas, tipos, list(valor.index.names))).encode())
+                try:
+                    filas = pd.util.hash_pandas_object(valor, index=not isinstance(valor, pd.Index))
+                except TypeError:
+                    return False
+                parcial.update(filas.to_numpy().tobytes())
+            memo[id(valor)] = (valor, parcial.digest())
+        digest.update(memo[id(valor)][1])
+        return True
+    if isinstance(valor, dict):
+        digest.update(b"dict")
+        return all(
+            _alimentar(digest, clave, memo) and _alimentar(digest, valor[clave], memo)
+            for clave in sorted(valor, key=repr)
+        )
+    if isinstance(valor, (list, tuple)):
+        digest.update(type(valor).__name__.encode())
+        return all(_alimentar(digest, elemento, memo) for elemento in valor)
+    if dataclasses.is_dataclass(valor) and not isinstance(valor, type):
+        digest.update(type(valor).__qualname__.encode())
+        return all(_alimentar(digest, getattr(valor, campo.name), memo) for campo in dataclasses.fields(valor))
+    return False
+
+
+def huella(valor: Any, memo: dict[int, tuple[Any, bytes]] | None = None) -> str | None:
+    """Hash del contenido de ``valor``, o ``None`` si incluye objetos opacos."""
+    digest = hashlib.blake2b(digest_size=16)
+    return digest.hexdigest() if _alimentar(digest, valor, {} if memo is None else memo) else None
+
+
+def _huella_derivada(clave: str, salida: str, cacheable: bool) -> str:
+    """Huella de una salida que no se puede hashear.
+
+    En una etapa cacheable sale de su clave: mismas entradas, misma salida.
+    Una etapa no cacheable (la carga) puede devolver otra cosa con la misma
+    clave, así que recibe una huella nueva y las etapas siguientes corren.
+    """
+    if not cacheable:
+        return uuid.uuid4().hex
+    return hashlib.blake2b(f"{clave}:{salida}".encode(), digest_size=16).hexdigest()
+
+
+def _archivos(valor: Any) -> list[Path]:
+    if isinstance(valor, Path):
+        return [valor]
+    if isinstance(valor, (list, tuple)) and valor and all(isinstance(v, Path) for v in valor):
+        return list(valor)
+    return []
+
+
+def _correr(
+    funcion: Callable[..., Any],
+    argumentos: dict[str, Any],
+    salidas: tuple[str, ...],
+    clave: str,
+    ruta_valores: Path | None,
+    ruta_perfil: Path | None = None,
+    cacheable: bool = True,
+) -> tuple[dict[str, Any], dict[str, str], float, float]:
+    """Ejecuta una etapa en el hilo o proceso trabajador.
+
+    Las huellas y el pickle de las salidas se calculan acá para no frenar al
+    planificador. El CPU es el del hilo que ejecutó la etapa. Con
+    ``ruta_perfil`` la etapa corre bajo ``cProfile`` y el perfil se guarda ahí.
+    """
+    inicio, inicio_cpu = time.perf_counter(), time.thread_time()
+    if ruta_perfil is None:
+        resultado = funcion(**argumentos)
+    else:
+        perfil = cProfile.Profile()
+        try:
+            resultado = perfil.runcall(funcion, **argumentos)
+        finally:
+            ruta_perfil.parent.mkdir(parents=True, exist_ok=True)
+            perfil.dump_stats(ruta_perfil)
+    valores = dict(zip(salidas, resultado if len(salidas) > 1 else (resultado,), strict=True))
+    cpu_segundos = time.thread_time() - inicio_cpu
+    memo: dict[int, tuple[Any, bytes]] = {}
+    huellas = {
+        salida: huella(valor, memo) or _huella_derivada(clave, salida, cacheable)
+        for salida, valor in valores.items()
+    }
+    if ruta_valores is not None:
+        contenido = pickle.dumps(valores, protocol=pickle.HIGHEST_PROTOCOL)
+        escribir_atomico(ruta_valores, lambda tmp: tmp.write_bytes(contenido))
+    return valores, huellas, time.perf_counter() - inicio, cpu_segundos
+
+
+@dataclass
+class TiempoEtapa:
+    """Cuándo se lanzó y terminó una etapa, en segundos desde el inicio de la corrida."""
+
+    nombre: str
+    ejecutor: str
+    omitida: bool
+    lanzada: float
+    fin: float
+    segundos: float
+    cpu_segundos: float
+    filas_salida: int | None = None
+    perfil: str | None = None
+
+
+class EjecucionDAG:
+    """Valores, huellas y tiempos de una corrida de :class:`EjecutorDAG`."""
+
+    def __init__(self, ejecutor: "EjecutorDAG") -> None:
+        self.ejecutor = ejecutor
+        self.valores: dict[str, Any] = {}
+        self.huellas: dict[str, str] = {}
+        self.tiempos: dict[str, TiempoEtapa] = {}
+        self.segundos_totales = 0.0
+
+    def valor(self, salida: str) -> Any:
+        """Valor de ``salida``; si su etapa se omitió, se lee del disco."""
+        if salida not in self.valores:
+            etapa = self.ejecutor.productor[salida]
+            with open(self.ejecutor.ruta_valores(etapa), "rb") as archivo:
+                self.valores.update(pickle.load(archivo))
+        return self.valores[salida]
+
+    @property
+    def omitidas(self) -> list[str]:
+        return [t.nombre for t in self.tiempos.values() if t.omitida]
+
+    def ruta_critica(self) -> tuple[list[str], dict[str, float]]:
+        """Cadena de etapas más larga según su duración y la holgura de cada una."""
+        etapas = self.ejecutor.orden
+        predecesoras = {
+            e.nombre: sorted({self.ejecutor.productor[entrada].nombre for entrada in e.entradas}) for e in etapas
+        }
+        duracion = {e.nombre: self.tiempos[e.nombre].segundos for e in etapas}
+        fin_temprano: dict[str, float] = {}
+        for etapa in etapas:
+            inicio = max((fin_temprano[p] for p in predecesoras[etapa.nombre]), default=0.0)
+            fin_temprano[etapa.nombre] = inicio + duracion[etapa.nombre]
+        total = max(fin_temprano.values(), default=0.0)
+
+        fin_tardio = {e.nombre: total for e in etapas}
+        for etapa in reversed(etapas):
+            for previa in predecesoras[etapa.nombre]:
+                fin_tardio[previa] = min(fin_tardio[previa], fin_tardio[etapa.nombre] - duracion[etapa.nombre])
+        holgura = {nombre: fin_tardio[nombre] - fin_temprano[nombre] for nombre in fin_temprano}
+
+        ruta: list[str] = []
+        actual = max(fin_temprano, key=fin_temprano.get) if fin_temprano else None
+        while actual is not None:
+            ruta.append(actual)
+            previas = predecesoras[actual]
+            actual = max(previas, key=fin_temprano.get) if previas else None
+        return ruta[::-1], holgura
+
+    def tabla(self) -> pd.DataFrame:
+        ruta, holgura = self.ruta_critica()
+        tiempos = [self.tiempos[e.nombre] for e in self.ejecutor.orden]
+        return pd.DataFrame(
+            {
+                "ejecutor": [t.ejecutor for t in tiempos],
+                "estado": ["omitida" if t.omitida else "ejecutada" for t in tiempos],
+                "lanzada": [t.lanzada for t in tiempos],
+                "fin": [t.fin for t in tiempos],
+                "segundos": [t.segundos for t in tiempos],
+                # Cola y arranque del trabajador (importaciones de un proceso nuevo)
+                "espera": [t.fin - t.lanzada - t.segundos for t in tiempos],
+                "holgura": [holgura[t.nombre] for t in tiempos],
+                "critica": ["*" if t.nombre in ruta else "" for t in tiempos],
+            },
+            index=pd.Index([t.nombre for t in tiempos], name="etapa"),
+        )
+
+    def resumen(self) -> str:
+        """Tabla de etapas con la ruta crítica, el paralelismo y las omitidas."""
+        ruta, _ = self.ruta_critica()
+        largo = sum(self.tiempos[nombre].segundos for nombre in ruta)
+        suma = sum(t.segundos for t in self.tiempos.values())
+        paralelismo = suma / self.segundos_totales if self.segundos_totales else 0.0
+        return (
+            "=== Etapas del grafo ===\n"
+            + self.tabla().to_string(float_format=lambda valor: f"{valor:.3f}")
+            + f"\nRuta crítica ({largo:.3f} s): {' → '.join(ruta)}"
+            + f"\nReloj: {self.segundos_totales:.3f} s; suma de etapas: {suma:.3f} s"
+            + f" (paralelismo {paralelismo:.2f}x); {len(self.omitidas)} omitidas sin cambios"
+        )
+
+    def registros(self) -> list[RegistroEtapa]:
+        """Las etapas ejecutadas como registros de :class:`~aurelion_instrumentacion.Instrumentacion`."""
+        return [
+            RegistroEtapa(t.nombre, t.segundos, t.cpu_segundos, filas_salida=t.filas_salida, perfil=t.perfil)
+            for t in self.tiempos.values()
+            if not t.omitida
+        ]
+
+
+class EjecutorDAG:
+    """Ejecuta :class:`Etapa` en orden de dependencias y en paralelo.
+
+    Args:
+        etapas: Etapas del grafo; cada salida debe tener un solo productor.
+        dir_estado: Carpeta de las claves y los valores de cada etapa. Con
+            ``None`` no se omite ninguna etapa.
+        hilos: Trabajadores del pool de hilos.
+        procesos: Trabajadores del pool de procesos; ``0`` corre las etapas
+            de proceso en el pool de hilos.
+        perfilar: Etapa que corre bajo ``cProfile`` (nunca se omite); el
+            perfil va a ``dir_perfiles / perfil_<etapa>.prof``.
+        dir_perfiles: Carpeta de los perfiles; por defecto la actual.
+    """
+
+    def __init__(
+        self,
+        etapas: list[Etapa],
+        dir_estado: Path | None = None,
+        hilos: int | None = None,
+        procesos: int | None = None,
+        perfilar: str | None = None,
+        dir_perfiles: Path | None = None,
+    ) -> None:
+        self.etapas = {}
+        self.productor: dict[str, Etapa] = {}
+        for etapa in etapas:
+            if etapa.nombre in self.etapas:
+                raise ValueError(f"Etapa repetida: {etapa.nombre}")
+            self.etapas[etapa.nombre] = etapa
+            for salida in etapa.salidas:
+                if salida in self.productor:
+                    otra = self.productor[salida].nombre
+                    raise ValueError(f"La salida {salida} la producen {otra} y {etapa.nombre}")
+                self.productor[salida] = etapa
+        faltantes = {e for etapa in etapas for e in etapa.entradas} - self.productor.keys()
+        if faltantes:
+            raise ValueError(f"Entradas sin productor: {', '.join(sorted(faltantes))}")
+        if perfilar is not None and perfilar not in self.etapas:
+            raise ValueError(f"No hay una etapa {perfilar!r} para perfilar; etapas: {', '.join(self.etapas)}")
+        self.orden = self._ordenar(etapas)
+        self.perfilar = perfilar
+        self.dir_perfiles = dir_perfiles or Path.cwd()
+        self.dir_estado = dir_estado
+        self.hilos = hilos
+        self.procesos = procesos
+        self._codigo: dict[str, str] = {}
+
+    def _ordenar(self, etapas: list[Etapa]) -> list[Etapa]:
+        """Orden topológico estable; falla si hay un ciclo."""
+        listas: set[str] = set()
+        orden: list[Etapa] = []
+        restantes = list(etapas)
+        while restantes:
+            siguientes = [e for e in restantes if all(self.productor[x].nombre in listas for x in e.entradas)]
+            if not siguientes:
+                raise ValueError(f"Hay un ciclo entre: {', '.join(e.nombre for e in restantes)}")
+            for etapa in siguientes:
+                listas.add(etapa.nombre)
+                orden.append(etapa)
+                restantes.remove(etapa)
+        return orden
+
+    def ruta_valores(self, etapa: Etapa) -> Path:
+        return self.dir_estado / f"{etapa.nombre}.pkl"
+
+    def _ruta_registro(self, etapa: Etapa) -> Path:
+        return self.dir_estado / f"{etapa.nombre}.json"
+
+    def _huella_codigo(self, etapa: Etapa) -> str:
+        funcion = etapa.funcion.func if isinstance(etapa.funcion, functools.partial) else etapa.funcion
+        digest = hashlib.blake2b(funcion.__qualname__.encode(), digest_size=16)
+        for modulo in sorted({funcion.__module__, *etapa.modulos}):
+            if modulo not in self._codigo:
+                spec = importlib.util.find_spec(modulo)
+                origen = Path(spec.origin) if spec and spec.origin else None
+                contenido = origen.read_bytes() if origen and origen.is_file() else modulo.encode()
+                self._codigo[modulo] = hashlib.blake2b(contenido, digest_size=16).hexdigest()
+            digest.update(self._codigo[modulo].encode())
+        return digest.hexdigest()
+
+    def _clave(self, etapa: Etapa, huellas: dict[str, str]) -> str:
+        digest = hashlib.blake2b(str(VERSION_ESTADO).encode(), digest_size=16)
+        digest.update(etapa.nombre.encode())
+        digest.update(self._huella_codigo(etapa).encode())
+        for nombre in sorted(etapa.parametros):
+            parametro = huella(etapa.parametros[nombre]) or type(etapa.parametros[nombre]).__qualname__
+            digest.update(f"{nombre}={parametro}".encode())
+        for entrada in etapa.entradas:
+            digest.update(f"{entrada}={huellas[entrada]}".encode())
+        return digest.hexdigest()
+
+    def _vigente(self, etapa: Etapa, clave: str) -> dict[str, Any] | None:
+        """El registro guardado si la etapa puede omitirse."""
+        if not etapa.cacheable or self.dir_estado is None:
+            return None
+        try:
+            registro = json.loads(self._ruta_registro(etapa).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if registro.get("clave") != clave or not self.ruta_valores(etapa).exists():
+            return None
+        for ruta, (tamano, mtime_ns) in registro["archivos"].items():
+            try:
+                estado = os.stat(ruta)
+            except OSError:
+                return None
+            if estado.st_size != tamano or estado.st_mtime_ns != mtime_ns:
+                return None
+        return registro
+
+    def _guardar_registro(
+        self, etapa: Etapa, clave: str, huellas: dict[str, str], valores: dict[str, Any]
+    ) -> None:
+        archivos = {}
+        for ruta in (r for valor in valores.values() for r in _archivos(valor)):
+            if ruta.exists():
+                estado = ruta.stat()
+                archivos[str(ruta.resolve())] = (estado.st_size, estado.st_mtime_ns)
+        contenido = json.dumps({"clave": clave, "huellas": huellas, "archivos": archivos}, indent=2)
+        escribir_atomico(self._ruta_registro(etapa), lambda tmp: tmp.write_text(contenido, encoding="utf-8"))
+
+    def ejecutar(self) -> EjecucionDAG:
+        """Corre el grafo; el primer error cancela lo pendiente y se relanza."""
+        ejecucion = EjecucionDAG(self)
+        persistir = self.dir_estado is not None
+        if persistir:
+            self.dir_estado.mkdir(parents=True, exist_ok=True)
+        inicio = time.perf_counter()
+        pendientes = list(self.orden)
+        en_curso: dict[Future, tuple[Etapa, str, float, Path | None]] = {}
+        pool_hilos = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix="etapa")
+        pool_procesos: ProcessPoolExecutor | None = None
+        try:
+            while pendientes or en_curso:
+                # Omitir una etapa puede dejar lista a otra, por eso se repite
+                avanzo = True
+                while avanzo:
+                    avanzo = False
+                    for etapa in [e for e in pendientes if all(x in ejecucion.huellas for x in e.entradas)]:
+                        pendientes.remove(etapa)
+                        avanzo = True
+                        clave = self._clave(etapa, ejecucion.huellas)
+                        perfilada = etapa.nombre == self.perfilar
+                        registro = None if perfilada else self._vigente(etapa, clave)
+                        ahora = time.perf_counter() - inicio
+                        if registro is not None:
+                            ejecucion.huellas.update(registro["huellas"])
+                            ejecucion.tiempos[etapa.nombre] = TiempoEtapa(
+                                etapa.nombre, etapa.ejecutor, True, ahora, ahora, 0.0, 0.0
+                            )
+                            continue
+                        argumentos = {x: ejecucion.valor(x) for x in etapa.entradas} | etapa.parametros
+                        pool = pool_hilos
+                        if etapa.ejecutor == "proceso" and self.procesos != 0:
+                            pool_procesos = pool_procesos or ProcessPoolExecutor(max_workers=self.procesos)
+                            pool = pool_procesos
+                        ruta = self.ruta_valores(etapa) if persistir and etapa.cacheable else None
+                        perfil = self.dir_perfiles / f"perfil_{etapa.nombre}.prof" if perfilada else None
+                        futuro = pool.submit(
+                            _correr, etapa.funcion, argumentos, etapa.salidas, clave, ruta, perfil, etapa.cacheable
+                        )
+                        en_curso[futuro] = (etapa, clave, ahora, perfil)
+                if not en_curso:
+                    break
+                listos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    etapa, clave, lanzada, perfil = en_curso.pop(futuro)
+                    try:
+                        valores, huellas, segundos, cpu_segundos = futuro.result()
+                    except BaseException as error:
+                        error.add_note(f"En la etapa {etapa.nombre} del grafo")
+                        raise
+                    ejecucion.valores.update(valores)
+                    ejecucion.huellas.update(huellas)
+                    ejecucion.tiempos[etapa.nombre] = TiempoEtapa(
+                        etapa.nombre,
+                        etapa.ejecutor,
+                        False,
+                        lanzada,
+                        time.perf_counter() - inicio,
+                        segundos,
+                        cpu_segundos,
+                        contar_filas(valores[etapa.salidas[0]]),
+                        None if perfil is None else str(perfil),
+                    )
+                    if persistir and etapa.cacheable:
+                        self._guardar_registro(etapa, clave, huellas, valores)
+        finally:
+            pool_hilos.shutdown(wait=True, cancel_futures=True)
+            if pool_procesos is not None:
+                pool_procesos.shutdown(wait=True, cancel_futures=True)
+        ejecucion.segundos_totales = time.perf_counter() - inicio
+        return ejecucion
+
+
+# --- Etapas del análisis ----------------------------------------------------
+# Funciones de módulo para que las etapas de proceso se puedan serializar.
+# Las que exportan CSV reciben el exportador con functools.partial y corren
+# siempre en hilos.
+
+_CANDADO_GRAFICOS = threading.Lock()
+
+
+def _exportando(exportador: "ExportadorCSV | None", escribir: Callable[["ExportadorCSV"], Any]) -> list[Path]:
+    """Exporta con un derivado de ``exportador`` y devuelve los archivos de la etapa."""
+    if exportador is None:
+        return []
+    hijo = exportador.derivado()
+    escribir(hijo)
+    exportador.incorporar(hijo)
+    return [hijo.salida / relativa for relativa in hijo.escritos + hijo.omitidos]
+
+
+def _cargar(base_dir: Path, usar_cache: bool, forzar_cache: bool) -> tuple[dict, dict]:
+    from proyecto_Aurelion import cargar_datos
+
+    return cargar_datos(
+        base_dir, cache_dir=base_dir / CACHE_DIR_NOMBRE if usar_cache else None, forzar_cache=forzar_cache
+    )
+
+
+def _limpiar(data: dict[str, pd.DataFrame], materializar_analitica: bool) -> tuple:
+    from aurelion_validacion import ReporteValidacion
+    from proyecto_Aurelion import limpiar_datos
+
+    reporte = ReporteValidacion()
+    data_limpia = limpiar_datos(data, materializar_analitica=materializar_analitica, reporte_validacion=reporte)
+    return data_limpia, data_limpia["Detalle_ventas"], reporte
+
+
+def _guardar_validacion(validacion: Any, exportador: "ExportadorCSV | None") -> list[Path]:
+    return _exportando(exportador, lambda hijo: validacion.guardar(hijo.salida, hijo))
+
+
+def _exportar_fuentes(data: dict, rutas: dict, exportador: "ExportadorCSV | None") -> list[Path]:
+    from proyecto_Aurelion import exportar_fuentes_csv
+
+    return _exportando(exportador, lambda hijo: exportar_fuentes_csv(data, rutas, hijo.salida, hijo))
+
+
+def _exportar_limpios(
+    data_limpia: dict, rutas: dict, particionar_mes: bool, exportador: "ExportadorCSV | None"
+) -> list[Path]:
+    from proyecto_Aurelion import meses_de_tabla
+
+    def escribir(hijo: "ExportadorCSV") -> None:
+        for nombre, df in data_limpia.items():
+            base_nombre = rutas[nombre].stem if nombre in rutas else nombre
+            meses = meses_de_tabla(nombre, df, data_limpia) if particionar_mes else None
+            if meses is None:
+                hijo.exportar(df, f"{base_nombre}_limpio.csv")
+            else:
+                hijo.exportar_por_mes(df, f"{base_nombre}_limpio.csv", meses)
+
+    return _exportando(exportador, escribir)
+
+
+def _esquema_estrella(data_limpia: dict) -> Any:
+    from aurelion_estrella import EsquemaEstrella
+
+    return EsquemaEstrella.desde_tablas(data_limpia)
+
+
+def _estadisticas(estrella: Any) -> Any:
+    agregados = estrella.agregados()
+    agregados.estadisticas  # Se calcula acá para que viaje en el pickle
+    return agregados
+
+
+def _guardar_estadisticas(agregados: Any, exportador: "ExportadorCSV | None") -> list[Path]:
+    from proyecto_Aurelion import guardar_estadisticas
+
+    return _exportando(exportador, lambda hijo: guardar_estadisticas(agregados.estadisticas, hijo.salida, hijo))
+
+
+def _correlaciones(estrella: Any) -> pd.DataFrame:
+    return estrella.matriz_correlacion()
+
+
+def _exportar_correlaciones(corr: pd.DataFrame, exportador: "ExportadorCSV | None") -> list[Path]:
+    return _exportando(exportador, lambda hijo: hijo.exportar(corr, "matriz_correlacion.csv", index=True))
+
+
+def _graficar_distribuciones(
+    agregados: Any, salida: Path, umbral_kde: int | None, muestrear_kde: bool
+) -> list[Path]:
+    from aurelion_graficos import _iniciar_trabajador
+    from proyecto_Aurelion import trabajos_distribuciones
+
+    # pyplot no es seguro entre hilos; en un proceso propio el candado no compite
+    with _CANDADO_GRAFICOS:
+        _iniciar_trabajador()
+        trabajos = trabajos_distribuciones(agregados, salida, umbral_kde, muestrear_kde)
+        return [trabajo.ejecutar() for trabajo in trabajos]
+
+
+def _graficar_correlaciones(corr: pd.DataFrame, salida: Path) -> Path:
+    from aurelion_graficos import _iniciar_trabajador, graficar_correlaciones
+
+    with _CANDADO_GRAFICOS:
+        _iniciar_trabajador()
+        graficar_correlaciones(corr, salida / "correlaciones.png")
+    return salida / "correlaciones.png"
+
+
+def _modelo(detalle_limpio: pd.DataFrame, salida: Path) -> tuple[dict, Path]:
+    from aurelion_prediccion import MODELOS_DIR_NOMBRE, ArtefactoModelo, CodificadorImporte, guardar_artefacto
+    from proyecto_Aurelion import entrenar_modelo
+
+    codificador = CodificadorImporte.ajustar(detalle_limpio)
+    modelo, metricas = entrenar_modelo(detalle_limpio, codificador)
+    artefacto = ArtefactoModelo.desde_modelo(modelo, codificador, metricas, len(detalle_limpio))
+    ruta, nuevo = guardar_artefacto(artefacto, salida / MODELOS_DIR_NOMBRE)
+    return {**metricas, "version": artefacto.version, "nuevo": nuevo}, ruta
+
+
+def _modelo_disperso(estrella: Any, variables: tuple[str, ...], pliegues: int) -> str:
+    from aurelion_entrenamiento import entrenar_disperso
+
+    _, _, reporte = entrenar_disperso(estrella, variables, pliegues=pliegues)
+    return reporte.resumen()
+
+
+def _cubos(estrella: Any, ruta: Path, reconstruir: bool, exportador: "ExportadorCSV | None") -> list[Path]:
+    from aurelion_cubos import GRANOS, actualizar_cubo
+
+    cubo = actualizar_cubo(estrella, ruta, reconstruir=reconstruir)
+
+    def escribir(hijo: "ExportadorCSV") -> None:
+        for grano in GRANOS:
+            hijo.exportar(cubo.rollup(grano), f"rollup_{grano}.csv", index=True)
+
+    return [ruta, *_exportando(exportador, escribir)]
+
+
+def _rfm(estrella: Any, ruta: Path, clusters: int, exportador: "ExportadorCSV | None") -> list[Path]:
+    from aurelion_rfm import actualizar_rfm
+
+    segmentacion, _ = actualizar_rfm(estrella, ruta, clusters=clusters)
+    archivos = _exportando(
+        exportador, lambda hijo: hijo.exportar(segmentacion.tabla(), "rfm_clientes.csv", index=True)
+    )
+    return [ruta, *archivos]
+
+
+def _canasta(
+    estrella: Any, top: int, soporte_minimo: float, exportador: "ExportadorCSV | None"
+) -> list[Path]:
+    from aurelion_canasta import MotorCanasta
+
+    motor = MotorCanasta.desde_estrella(estrella, soporte_minimo)
+
+    def escribir(hijo: "ExportadorCSV") -> None:
+        hijo.exportar(
+            motor.complementarios_producto(top, soporte_minimo), "complementarios_producto.csv", index=True
+        )
+        if motor.categorias is not None:
+            hijo.exportar(
+                motor.complementarios_categoria(top, soporte_minimo), "complementarios_categoria.csv", index=True
+            )
+
+    return _exportando(exportador, escribir)
+
+
+def _aproximado(agregados: Any, estrella: Any, salida: Path, exportador: "ExportadorCSV | None") -> list[Path]:
+    from aurelion_aproximado import BOCETOS_NOMBRE, EstadisticasAproximadas, comparar
+
+    bocetos = EstadisticasAproximadas.desde_agregados(agregados, estrella)
+    bocetos.guardar(salida / BOCETOS_NOMBRE)
+    errores = comparar(bocetos, agregados)
+    return [
+        salida / BOCETOS_NOMBRE,
+        *_exportando(exportador, lambda hijo: hijo.exportar(errores, "errores_aproximacion.csv", index=True)),
+    ]
+
+
+def _almacen(data_limpia: dict, agregados: Any, corr: pd.DataFrame, ruta: Path, reemplazar: bool) -> Path:
+    from aurelion_almacen import escribir_almacen
+
+    metricas = {
+        **agregados.estadisticas,
+        "ventas_por_medio_pago": agregados.ventas_por_medio_pago,
+        "matriz_correlacion": corr.rename_axis("variable"),
+    }
+    escribir_almacen(ruta, data_limpia, metricas, reemplazar=reemplazar)
+    return ruta
+
+
+def etapas_analisis(
+    base_dir: Path,
+    salida: Path,
+    exportador: "ExportadorCSV | None",
+    usar_cache: bool = True,
+    forzar_cache: bool = False,
+    exportar_analitica: bool = False,
+    particionar_mes: bool = False,
+    umbral_kde: int | None = UMBRAL_KDE,
+    muestrear_kde: bool = True,
+    ruta_almacen: Path | None = None,
+    reemplazar_almacen: bool = False,
+    cubos: bool = False,
+    reconstruir_cubos: bool = False,
+    modelo_disperso: bool = False,
+    variables_modelo: tuple[str, ...] = ("categoria",),
+    pliegues: int = 5,
+    rfm: bool = False,
+    clusters_rfm: int = 0,
+    canasta: bool = False,
+    top_complementarios: int = 5,
+    soporte_minimo: float = 0.0,
+    aproximado: bool = False,
+) -> list[Etapa]:
+    """Las etapas de ``proyecto_Aurelion.main`` con sus dependencias.
+
+    Con ``exportador=None`` no se exportan CSV. Las opciones son las de
+    ``main``; ``ruta_almacen`` activa la escritura en SQLite.
+    """
+    from aurelion_cubos import CUBOS_NOMBRE
+    from aurelion_rfm import RFM_NOMBRE
+
+    pipeline = ("proyecto_Aurelion", "aurelion_esquema", "aurelion_validacion")
+    estrella = ("aurelion_estrella", "aurelion_agregacion")
+
+    def exportando(funcion: Callable[..., list[Path]]) -> functools.partial:
+        return functools.partial(funcion, exportador=exportador)
+
+    etapas = [
+        Etapa(
+            "carga",
+            _cargar,
+            salidas=("data", "rutas"),
+            parametros={"base_dir": base_dir, "usar_cache": usar_cache, "forzar_cache": forzar_cache},
+            cacheable=False,
+        ),
+        Etapa(
+            "limpieza",
+            _limpiar,
+            ("data",),
+            ("data_limpia", "detalle_limpio", "validacion"),
+            parametros={"materializar_analitica": exportar_analitica},
+            modulos=pipeline,
+        ),
+        Etapa("guardar_validacion", exportando(_guardar_validacion), ("validacion",)),
+        Etapa("esquema_estrella", _esquema_estrella, ("data_limpia",), ("estrella",), modulos=estrella),
+        Etapa("estadisticas", _estadisticas, ("estrella",), ("agregados",), modulos=estrella),
+        Etapa("correlaciones", _correlaciones, ("estrella",), ("corr",), modulos=estrella),
+        Etapa(
+            "graficar_distribuciones",
+            _graficar_distribuciones,
+            ("agregados",),
+            ejecutor="proceso",
+            parametros={
+                "salida": salida,
+                "umbral_kde": umbral_kde,
+                "muestrear_kde": muestrear_kde,
+            },
+            modulos=("aurelion_graficos", "proyecto_Aurelion"),
+        ),
+        Etapa(
+            "graficar_correlaciones",
+            _graficar_correlaciones,
+            ("corr",),
+            ejecutor="proceso",
+            parametros={"salida": salida},
+            modulos=("aurelion_graficos",),
+        ),
+        Etapa(
+            "modelo",
+            _modelo,
+            ("detalle_limpio",),
+            ("metricas_modelo", "artefacto_modelo"),
+            ejecutor="proceso",
+            parametros={"salida": salida},
+            modulos=("proyecto_Aurelion", "aurelion_prediccion"),
+        ),
+    ]
+    if exportador is not None:
+        etapas += [
+            Etapa("exportar_fuentes", exportando(_exportar_fuentes), ("data", "rutas")),
+            Etapa(
+                "exportar_limpios",
+                exportando(_exportar_limpios),
+                ("data_limpia", "rutas"),
+                parametros={"particionar_mes": particionar_mes},
+            ),
+            Etapa("guardar_estadisticas", exportando(_guardar_estadisticas), ("agregados",)),
+            Etapa("exportar_correlaciones", exportando(_exportar_correlaciones), ("corr",)),
+        ]
+    if ruta_almacen is not None:
+        etapas.append(Etapa(
+            "almacen",
+            _almacen,
+            ("data_limpia", "agregados", "corr"),
+            parametros={"ruta": ruta_almacen, "reemplazar": reemplazar_almacen},
+            modulos=("aurelion_almacen",),
+        ))
+    if cubos:
+        etapas.append(Etapa(
+            "cubos",
+            exportando(_cubos),
+            ("estrella",),
+            parametros={"ruta": base_dir / CACHE_DIR_NOMBRE / CUBOS_NOMBRE, "reconstruir": reconstruir_cubos},
+            modulos=("aurelion_cubos",),
+            cacheable=not reconstruir_cubos,
+        ))
+    if rfm:
+        etapas.append(Etapa(
+            "rfm",
+            exportando(_rfm),
+            ("estrella",),
+            parametros={"ruta": base_dir / CACHE_DIR_NOMBRE / RFM_NOMBRE, "clusters": clusters_rfm},
+            modulos=("aurelion_rfm",),
+        ))
+    if canasta:
+        etapas.append(Etapa(
+            "canasta",
+            exportando(_canasta),
+            ("estrella",),
+            parametros={"top": top_complementarios, "soporte_minimo": soporte_minimo},
+            modulos=("aurelion_canasta",),
+        ))
+    if aproximado:
+        etapas.append(Etapa(
+            "aproximado",
+            exportando(_aproximado),
+            ("agregados", "estrella"),
+            parametros={"salida": salida},
+            modulos=("aurelion_aproximado",),
+        ))
+    if modelo_disperso:
+        etapas.append(Etapa(
+            "modelo_disperso",
+            _modelo_disperso,
+            ("estrella",),
+            ("reporte_modelo_disperso",),
+            ejecutor="proceso",
+            parametros={"variables": tuple(variables_modelo), "pliegues": pliegues},
+            modulos=("aurelion_entrenamiento",),
+        ))
+    return etapas
+
+
+def ejecutar_analisis(
+    base_dir: Path,
+    salida: Path,
+    inst: "Instrumentacion | None" = None,
+    exportar_csv: bool = True,
+    hilos: int | None = None,
+    procesos: int | None = None,
+    **opciones: Any,
+) -> EjecucionDAG:
+    """Corre el análisis completo como grafo e imprime sus resultados.
+
+    El estado de cada etapa se guarda en ``salida/.cache_aurelion/etapas``,
+    junto a los archivos que escribe. ``opciones`` son las de
+    :func:`etapas_analisis`.
+    """
+    from aurelion_exportacion import ExportadorCSV
+
+    exportador = ExportadorCSV(salida) if exportar_csv else None
+    etapas = etapas_analisis(base_dir, salida, exportador, **opciones)
+    ejecutor = EjecutorDAG(
+        etapas,
+        salida / CACHE_DIR_NOMBRE / ESTADO_DIR_NOMBRE,
+        hilos,
+        procesos,
+        perfilar=inst.perfilar if inst is not None else None,
+        dir_perfiles=inst.dir_perfiles if inst is not None else None,
+    )
+    ejecucion = ejecutor.ejecutar()
+    if inst is not None:
+        inst.etapas.extend(ejecucion.registros())
+
+    if "limpieza" not in ejecucion.omitidas:
+        print(ejecucion.valor("validacion").resumen())
+    if exportador is not None:
+        exportador.guardar_manifiesto()
+        print(exportador.resumen())
+    if "almacen" in ejecutor.etapas:
+        print(f"Almacén SQLite actualizado: {ejecucion.valor('almacen')}")
+    print("=== Estadísticas descriptivas ===")
+    print(ejecucion.valor("agregados").estadisticas["resumen_general"].to_string())
+    metricas = ejecucion.valor("metricas_modelo")
+    nuevo = metricas["nuevo"] and "modelo" not in ejecucion.omitidas
+    print(f"R2 Score: {metricas['r2']:.2f}")
+    print(f"MAE: {metricas['mae']:.2f}")
+    print(
+        f"Modelo v{metricas['version']} {'guardado en' if nuevo else 'sin cambios:'} "
+        f"{ejecucion.valor('artefacto_modelo').relative_to(salida)}"
+    )
+    if "modelo_disperso" in ejecutor.etapas:
+        print(ejecucion.valor("reporte_modelo_disperso"))
+    print(ejecucion.resumen())
+    return ejecucion
@@ -0,0 +1,457 @@
+"""
+Entrenamiento escalable del modelo del importe para Tienda Aurelion.
+
+``entrenar_modelo`` arma un DataFrame denso con ``pd.get_dummies``; con
+variables de alta cardinalidad (id_producto, ciudad, medio_pago, mes) sobre
+millones de líneas esa tabla no entra en memoria. Aquí la matriz de diseño
+es una ``scipy.sparse.csr_matrix``: las variables numéricas estandarizadas
+más una columna por nivel de cada variable categórica (sin el primero, como
+``drop_first``). :class:`CodificadorDisperso` toma los niveles de las tablas
+de dimensión del esquema estrella, de modo que cada bloque de Detalle_ventas
+se codifica igual sin recorrer antes todos los hechos.
+
+Dos caminos:
+    :func:`entrenar_disperso`: con las tablas en memoria, validación cruzada
+        de k pliegues en paralelo (``cross_validate`` con ``n_jobs``) y un
+        ajuste final sobre todas las líneas.
+    :func:`entrenar_por_bloques`: fuera de memoria, ``SGDRegressor`` con
+        ``partial_fit`` sobre bloques de Detalle_ventas. Cada pliegue es un
+        modelo propio que se ajusta en un hilo; el pliegue de una línea sale
+        de un hash de ``id_venta``, así las líneas de una venta no quedan
+        repartidas entre entrenamiento y prueba. Hace una pasada para la
+        escala, ``epocas`` de ajuste y una de evaluación, por lo que conviene
+        leer desde la caché columnar.
+
+Ambos informan R2 y MAE (media y desvío entre pliegues), el tiempo de ajuste
+y el pico de memoria medido con ``tracemalloc``; la memoria de los procesos
+hijos de ``cross_validate`` no se cuenta.
+
+Uso:
+    python aurelion_entrenamiento.py --variables categoria id_producto ciudad medio_pago mes
+    python aurelion_entrenamiento.py --por-bloques --tamano-bloque 500000 --epocas 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from aurelion_cache import CACHE_DIR_NOMBRE
+from aurelion_estrella import Dimension, EsquemaEstrella
+
+VARIABLES_NUMERICAS = ("cantidad", "precio_unitario")
+# Variable categórica -> atributo calificado en el esquema estrella
+ATRIBUTOS = {
+    "categoria": "Productos.categoria",
+    "id_producto": "Productos.id_producto",
+    "ciudad": "Clientes.ciudad",
+    "medio_pago": "Ventas.medio_pago",
+    "mes": "Ventas.mes",
+}
+CATEGORICAS_POR_DEFECTO = ("categoria",)
+
+
+@dataclass
+class CodificadorDisperso:
+    """Matriz de diseño dispersa con niveles fijos por variable categórica."""
+
+    numericas: list[str]
+    categoricas: list[str]
+    niveles: dict[str, pd.Index]
+    media: np.ndarray
+    escala: np.ndarray
+
+    @classmethod
+    def ajustar(
+        cls,
+        estrella: EsquemaEstrella,
+        categoricas: Iterable[str] = CATEGORICAS_POR_DEFECTO,
+        escala: tuple[np.ndarray, np.ndarray] | None = None,
+    ) -> "CodificadorDisperso":
+        """Niveles desde las dimensiones y escala desde ``estrella`` o ``escala``."""
+        numericas = [col for col in VARIABLES_NUMERICAS if col in estrella.hechos.columns]
+        categoricas = list(categoricas)
+        desconocidas = set(categoricas) - set(ATRIBUTOS)
+        if desconocidas:
+            raise ValueError(f"Variables categóricas no soportadas: {sorted(desconocidas)}")
+        niveles = {}
+        for variable in categoricas:
+            tabla, _, columna = ATRIBUTOS[variable].partition(".")
+            niveles[variable] = estrella.dimensiones[tabla].codigos(columna)[1]
+        if escala is None:
+            escala = _media_escala(*_momentos(estrella.hechos[numericas].to_numpy(dtype=float)))
+        return cls(numericas, categoricas, niveles, *escala)
+
+    @property
+    def columnas(self) -> list[str]:
+        dummies = [
+            f"{variable}_{nivel}" for variable in self.categoricas for nivel in self.niveles[variable][1:]
+        ]
+        return self.numericas + dummies
+
+    def transformar(self, estrella: EsquemaEstrella) -> sparse.csr_matrix:
+        """Una fila por línea de ``estrella.hechos``; los niveles 0 y -1 quedan vacíos."""
+        n = len(estrella.hechos)
+        filas = [np.tile(np.arange(n), len(self.numericas))]
+        columnas = [np.repeat(np.arange(len(self.numericas)), n)]
+        numeros = (estrella.hechos[self.numericas].to_numpy(dtype=float) - self.media) / self.escala
+        valores = [numeros.ravel(order="F")]
+
+        desplazamiento = len(self.numericas)
+        for variable in self.categoricas:
+            codigos, unicos = estrella.codigos(ATRIBUTOS[variable])
+            niveles = self.niveles[variable]
+            if unicos is not niveles:
+                # Otra dimensión: se llevan los códigos a los niveles del ajuste
+                codigos = np.where(codigos >= 0, niveles.get_indexer(unicos)[np.maximum(codigos, 0)], -1)
+            presentes = np.flatnonzero(codigos > 0)
+            filas.append(presentes)
+            columnas.append(desplazamiento + codigos[presentes] - 1)
+            valores.append(np.ones(len(presentes)))
+            desplazamiento += len(niveles) - 1
+
+        return sparse.csr_matrix(
+            (np.concatenate(valores), (np.concatenate(filas), np.concatenate(columnas))),
+            shape=(n, desplazamiento),
+        )
+
+
+def _momentos(valores: np.ndarray) -> tuple[int, np.ndarray, np.ndarray]:
+    valores = np.nan_to_num(valores.reshape(len(valores), -1))
+    return len(valores), valores.sum(axis=0), (valores ** 2).sum(axis=0)
+
+
+def _media_escala(n: int, suma: np.ndarray, suma2: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    media = suma / max(n, 1)
+    desvio = np.sqrt(np.maximum(suma2 / max(n, 1) - media ** 2, 0))
+    return media, np.where(desvio > 0, desvio, 1.0)
+
+
+@dataclass
+class ReporteEntrenamiento:
+    """Métricas de validación cruzada y costo de un entrenamiento."""
+
+    modo: str
+    filas: int
+    columnas: int
+    no_nulos: int
+    pliegues: int
+    r2: float
+    r2_desvio: float
+    mae: float
+    mae_desvio: float
+    segundos_ajuste: float
+    segundos_total: float = 0.0
+    pico_memoria_bytes: int | None = None
+    detalle: dict[str, Any] = field(default_factory=dict)
+
+    def resumen(self) -> str:
+        pico = "n/d" if self.pico_memoria_bytes is None else f"{self.pico_memoria_bytes / 2**20:.1f} MiB"
+        return "\n".join([
+            f"=== Modelo disperso ({self.modo}, {self.pliegues} pliegues) ===",
+            f"Matriz: {self.filas:,} filas x {self.columnas:,} columnas, {self.no_nulos:,} no nulos",
+            f"R2 Score: {self.r2:.2f} (± {self.r2_desvio:.2f})",
+            f"MAE: {self.mae:.2f} (± {self.mae_desvio:.2f})",
+            f"Ajuste: {self.segundos_ajuste:.3f} s, total: {self.segundos_total:.3f} s, pico de memoria: {pico}",
+        ])
+
+
+def _medir(funcion: Callable[[], ReporteEntrenamiento], memoria: bool) -> ReporteEntrenamiento:
+    if memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        reporte = funcion()
+        if memoria:
+            reporte.pico_memoria_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        if memoria:
+            tracemalloc.stop()
+    reporte.segundos_total = time.perf_counter() - inicio
+    return reporte
+
+
+def _estimador(nombre: str, semilla: int) -> Any:
+    from sklearn.linear_model import LinearRegression, SGDRegressor
+
+    if nombre == "lineal":
+        return LinearRegression()
+    if nombre == "sgd":
+        return SGDRegressor(alpha=1e-6, random_state=semilla)
+    raise ValueError(f"Estimador desconocido: {nombre}")
+
+
+def entrenar_disperso(
+    estrella: EsquemaEstrella,
+    categoricas: Iterable[str] = CATEGORICAS_POR_DEFECTO,
+    pliegues: int = 5,
+    procesos: int | None = -1,
+    estimador: str = "lineal",
+    semilla: int = 42,
+    memoria: bool = True,
+) -> tuple[Any, CodificadorDisperso, ReporteEntrenamiento]:
+    """Validación cruzada en paralelo y ajuste final sobre la matriz dispersa.
+
+    Args:
+        estrella: Esquema estrella de las tablas limpias.
+        categoricas: Variables categóricas (claves de ``ATRIBUTOS``).
+        pliegues: Pliegues de ``KFold`` (mezclados con ``semilla``).
+        procesos: ``n_jobs`` de ``cross_validate``; -1 usa todos los núcleos.
+        estimador: ``"lineal"`` (``LinearRegression``) o ``"sgd"``.
+        memoria: Mide el pico de memoria con ``tracemalloc``.
+
+    Returns:
+        El modelo ajustado con todas las líneas, su codificador y el reporte.
+    """
+    from sklearn.model_selection import KFold, cross_validate
+
+    resultado: dict[str, Any] = {}
+
+    def entrenar() -> ReporteEntrenamiento:
+        codificador = CodificadorDisperso.ajustar(estrella, categoricas)
+        X = codificador.transformar(estrella)
+        y = estrella.hechos["importe"].to_numpy(dtype=float)
+        validacion = cross_validate(
+            _estimador(estimador, semilla),
+            X,
+            y,
+            cv=KFold(pliegues, shuffle=True, random_state=semilla),
+            scoring={"r2": "r2", "mae": "neg_mean_absolute_error"},
+            n_jobs=procesos,
+        )
+        inicio = time.perf_counter()
+        modelo = _estimador(estimador, semilla).fit(X, y)
+        resultado.update(modelo=modelo, codificador=codificador)
+        return ReporteEntrenamiento(
+            modo=f"memoria/{estimador}",
+            filas=X.shape[0],
+            columnas=X.shape[1],
+            no_nulos=X.nnz,
+            pliegues=pliegues,
+            r2=float(validacion["test_r2"].mean()),
+            r2_desvio=float(validacion["test_r2"].std()),
+            mae=float(-validacion["test_mae"].mean()),
+            mae_desvio=float(validacion["test_mae"].std()),
+            segundos_ajuste=time.perf_counter() - inicio,
+            detalle={
+                "segundos_ajuste_pliegues": validacion["fit_time"].tolist(),
+                "bytes_matriz": X.data.nbytes + X.indices.nbytes + X.indptr.nbytes,
+            },
+        )
+
+    reporte = _medir(entrenar, memoria)
+    return resultado["modelo"], resultado["codificador"], reporte
+
+
+def _pliego(id_venta: np.ndarray, pliegues: int) -> np.ndarray:
+    """Pliegue estable por venta (hash multiplicativo de Knuth)."""
+    claves = np.asarray(id_venta, dtype=np.uint64)
+    return ((claves * np.uint64(2654435761)) % np.uint64(2**32) % np.uint64(pliegues)).astype(np.int64)
+
+
+class _MetricasParciales:
+    """Sumas para R2 y MAE acumuladas bloque a bloque."""
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.suma_y = self.suma_y2 = self.sse = self.sae = 0.0
+
+    def agregar(self, y: np.ndarray, prediccion: np.ndarray) -> None:
+        error = y - prediccion
+        self.n += len(y)
+        self.suma_y += y.sum()
+        self.suma_y2 += (y ** 2).sum()
+        self.sse += (error ** 2).sum()
+        self.sae += np.abs(error).sum()
+
+    def r2(self) -> float:
+        total = self.suma_y2 - self.suma_y ** 2 / self.n if self.n else 0.0
+        return 1 - self.sse / total if total > 0 else float("nan")
+
+    def mae(self) -> float:
+        return self.sae / self.n if self.n else float("nan")
+
+
+def entrenar_por_bloques(
+    base_dir: Path,
+    categoricas: Iterable[str] = CATEGORICAS_POR_DEFECTO,
+    pliegues: int = 5,
+    tamano_bloque: int = 100_000,
+    epocas: int = 5,
+    cache_dir: Path | None = None,
+    ruta_detalle: Path | None = None,
+    hilos: int | None = None,
+    semilla: int = 42,
+    memoria: bool = True,
+) -> tuple[Any, CodificadorDisperso, ReporteEntrenamiento]:
+    """Ajusta ``SGDRegressor`` con ``partial_fit`` sin cargar todo el detalle.
+
+    Ventas, Productos y Clientes se cargan enteras (son las dimensiones);
+    Detalle_ventas se recorre por bloques con :func:`aurelion_streaming.iterar_detalle`.
+    El importe se estandariza para el ajuste; las métricas se informan en
+    la escala original y los coeficientes del modelo devuelto se pasan a esa
+    escala, de modo que ``modelo.predict`` devuelve importes.
+
+    Returns:
+        El modelo ajustado con todas las líneas, el codificador y el reporte.
+        Al modelo ya no se le debe llamar ``partial_fit``: sus coeficientes
+        no están en la escala con la que se entrenó.
+    """
+    from sklearn.linear_model import SGDRegressor
+
+    from aurelion_streaming import iterar_detalle
+    from proyecto_Aurelion import cargar_tabla, limpiar_clientes, limpiar_detalle, limpiar_productos, limpiar_ventas
+
+    resultado: dict[str, Any] = {}
+
+    def entrenar() -> ReporteEntrenamiento:
+        dimensiones = (
+            Dimension("Ventas", limpiar_ventas(cargar_tabla(base_dir, "Ventas", cache_dir)[0]), "id_venta"),
+            Dimension("Productos", limpiar_productos(cargar_tabla(base_dir, "Productos", cache_dir)[0]), "id_producto"),
+            Dimension("Clientes", limpiar_clientes(cargar_tabla(base_dir, "Clientes", cache_dir)[0]), "id_cliente"),
+        )
+        ruta = ruta_detalle or base_dir / "Detalle_ventas.xlsx"
+
+        def bloques() -> Iterator[EsquemaEstrella]:
+            for bloque in iterar_detalle(ruta, tamano_bloque, cache_dir):
+                bloque = limpiar_detalle(bloque, deduplicar=False)
+                if len(bloque):
+                    yield EsquemaEstrella(bloque, *dimensiones)
+
+        # Pasada 1: media y desvío de las variables numéricas y del importe
+        n, suma, suma2 = 0, 0.0, 0.0
+        for estrella in bloques():
+            columnas = [c for c in VARIABLES_NUMERICAS if c in estrella.hechos.columns] + ["importe"]
+            m, s, s2 = _momentos(estrella.hechos[columnas].to_numpy(dtype=float))
+            n, suma, suma2 = n + m, suma + s, suma2 + s2
+        if n == 0:
+            raise ValueError("Detalle_ventas no tiene líneas válidas para entrenar")
+        media, escala = _media_escala(n, suma, suma2)
+        codificador = None
+
+        # Un modelo por pliegue más el final, que ve todas las líneas
+        modelos = [SGDRegressor(alpha=1e-6, random_state=semilla) for _ in range(pliegues + 1)]
+        rng = np.random.default_rng(semilla)
+        segundos_ajuste = 0.0
+        filas = no_nulos = 0
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            for epoca in range(epocas):
+                for estrella in bloques():
+                    if codificador is None:
+                        codificador = CodificadorDisperso.ajustar(
+                            estrella, categoricas, (media[:-1], escala[:-1])
+                        )
+                    orden = rng.permutation(len(estrella.hechos))
+                    X = codificador.transformar(estrella)[orden]
+                    y = (estrella.hechos["importe"].to_numpy(dtype=float)[orden] - media[-1]) / escala[-1]
+                    pliego = _pliego(estrella.hechos["id_venta"].to_numpy()[orden], pliegues)
+                    if epoca == 0:
+                        filas, no_nulos = filas + X.shape[0], no_nulos + X.nnz
+
+                    def ajustar(k: int) -> None:
+                        entrenamiento = pliego != k if k < pliegues else slice(None)
+                        modelos[k].partial_fit(X[entrenamiento], y[entrenamiento])
+
+                    inicio = time.perf_counter()
+                    list(pool.map(ajustar, range(pliegues + 1)))
+                    segundos_ajuste += time.perf_counter() - inicio
+
+        # Última pasada: cada modelo de pliegue se evalúa en sus líneas reservadas
+        metricas = [_MetricasParciales() for _ in range(pliegues)]
+        for estrella in bloques():
+            X = codificador.transformar(estrella)
+            y = estrella.hechos["importe"].to_numpy(dtype=float)
+            pliego = _pliego(estrella.hechos["id_venta"].to_numpy(), pliegues)
+            for k in range(pliegues):
+                prueba = pliego == k
+                if prueba.any():
+                    metricas[k].agregar(y[prueba], modelos[k].predict(X[prueba]) * escala[-1] + media[-1])
+
+        r2 = np.array([m.r2() for m in metricas])
+        mae = np.array([m.mae() for m in metricas])
+        final = modelos[-1]
+        final.coef_ = final.coef_ * escala[-1]
+        final.intercept_ = final.intercept_ * escala[-1] + media[-1]
+        resultado.update(modelo=final, codificador=codificador)
+        return ReporteEntrenamiento(
+            modo="bloques/sgd",
+            filas=filas,
+            columnas=len(codificador.columnas),
+            no_nulos=no_nulos,
+            pliegues=pliegues,
+            r2=float(np.nanmean(r2)),
+            r2_desvio=float(np.nanstd(r2)),
+            mae=float(np.nanmean(mae)),
+            mae_desvio=float(np.nanstd(mae)),
+            segundos_ajuste=segundos_ajuste,
+            detalle={"epocas": epocas, "tamano_bloque": tamano_bloque, "escala_importe": [media[-1], escala[-1]]},
+        )
+
+    reporte = _medir(entrenar, memoria)
+    return resultado["modelo"], resultado["codificador"], reporte
+
+
+def main(args: argparse.Namespace) -> int:
+    base_dir = args.datos or Path(__file__).resolve().parent
+    cache_dir = None if args.sin_cache else base_dir / CACHE_DIR_NOMBRE
+    if args.por_bloques:
+        _, _, reporte = entrenar_por_bloques(
+            base_dir,
+            args.variables,
+            pliegues=args.pliegues,
+            tamano_bloque=args.tamano_bloque,
+            epocas=args.epocas,
+            cache_dir=cache_dir,
+            hilos=args.procesos if args.procesos > 0 else None,
+            memoria=not args.sin_memoria,
+        )
+    else:
+        from proyecto_Aurelion import cargar_datos, limpiar_datos
+
+        data, _ = cargar_datos(base_dir, cache_dir=cache_dir)
+        estrella = EsquemaEstrella.desde_tablas(limpiar_datos(data))
+        _, _, reporte = entrenar_disperso(
+            estrella,
+            args.variables,
+            pliegues=args.pliegues,
+            procesos=args.procesos,
+            estimador=args.estimador,
+            memoria=not args.sin_memoria,
+        )
+    print(reporte.resumen())
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datos", type=Path, default=None, help="Carpeta con los Excel (por defecto la del script).")
+    parser.add_argument(
+        "--variables",
+        nargs="+",
+        choices=list(ATRIBUTOS),
+        default=list(CATEGORICAS_POR_DEFECTO),
+        help="Variables categóricas codificadas one-hot.",
+    )
+    parser.add_argument("--pliegues", type=int, default=5, help="Pliegues de la validación cruzada.")
+    parser.add_argument(
+        "--procesos",
+        type=int,
+        default=-1,
+        help="Procesos de cross_validate (-1: todos) o hilos por bloque con --por-bloques.",
+    )
+    parser.add_argument("--estimador", choices=("lineal", "sgd"), default="lineal", help="Modelo en memoria.")
+    parser.add_argument("--por-bloques", action="store_true", help="Ajusta con partial_fit sobre bloques.")
+    parser.add_argument("--tamano-bloque", type=int, default=100_000, help="Filas de Detalle_ventas por bloque.")
+    parser.add_argument("--epocas", type=int, default=5, help="Pasadas de ajuste con --por-bloques.")
+    parser.add_argument("--sin-cache", action="store_true", help="Lee siempre los Excel sin la caché columnar.")
+    parser.add_argument("--sin-memoria", action="store_true", help="No mide el pico de memoria.")
+    raise SystemExit(main(parser.parse_args()))
@@ -0,0 +1,148 @@
+"""
+Esquema declarado de las tablas de Tienda Aurelion.
+
+Define el tipo lógico de cada columna de Clientes, Ventas, Detalle_ventas y
+Productos. :func:`aplicar_esquema` lo usa para guardar las columnas de baja
+cardinalidad como ``category`` y los ids y cantidades en el entero más chico
+posible, lo que reduce sobre todo el tamaño de ``ventas_analitica``.
+
+Tipos lógicos:
+    entero: ids y cantidades; se reducen al entero más chico que los contiene.
+    monto: precios e importes; se guardan como entero si no tienen decimales,
+        nunca por debajo de ``int32`` para que productos como
+        ``cantidad * precio_unitario`` no desborden.
+    categoria: texto repetido, se guarda como ``category``.
+    texto: texto con un valor por fila, se deja como está.
+    fecha: la conversión la hace la limpieza con ``pd.to_datetime``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+ESQUEMA: dict[str, dict[str, str]] = {
+    "Clientes": {
+        "id_cliente": "entero",
+        "nombre_cliente": "texto",
+        "email": "texto",
+        "ciudad": "categoria",
+        "fecha_alta": "fecha",
+    },
+    "Ventas": {
+        "id_venta": "entero",
+        "fecha": "fecha",
+        "id_cliente": "entero",
+        "nombre_cliente": "categoria",
+        "email": "categoria",
+        "medio_pago": "categoria",
+    },
+    "Detalle_ventas": {
+        "id_venta": "entero",
+        "id_producto": "entero",
+        "nombre_producto": "categoria",
+        "cantidad": "entero",
+        "precio_unitario": "monto",
+        "importe": "monto",
+    },
+    "Productos": {
+        "id_producto": "entero",
+        "nombre_producto": "texto",
+        "categoria": "categoria",
+        "precio_unitario": "monto",
+    },
+}
+
+
+@dataclass
+class ReporteMemoria:
+    """Bytes ocupados por cada tabla antes y después de aplicar el esquema."""
+
+    filas: list[tuple[str, int, int]] = field(default_factory=list)
+
+    def registrar(self, tabla: str, antes: pd.DataFrame, despues: pd.DataFrame) -> None:
+        self.filas.append((tabla, memoria(antes), memoria(despues)))
+
+    def registrar_compacta(self, tabla: str, df: pd.DataFrame) -> None:
+        """Registra una tabla ya compacta estimando lo que ocuparía sin esquema."""
+        self.filas.append((tabla, memoria_sin_esquema(df), memoria(df)))
+
+    def tabla(self) -> pd.DataFrame:
+        reporte = pd.DataFrame(self.filas, columns=["tabla", "bytes_antes", "bytes_despues"])
+        reporte["reduccion"] = 1 - reporte["bytes_despues"] / reporte["bytes_antes"]
+        return reporte.set_index("tabla")
+
+
+def memoria(df: pd.DataFrame) -> int:
+    """Bytes de ``df`` contando el contenido real de las columnas de texto."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def memoria_sin_esquema(df: pd.DataFrame) -> int:
+    """Bytes que ocuparía ``df`` con texto como ``object`` y enteros de 64 bits.
+
+    Expande una columna por vez, así que no duplica la tabla completa.
+    """
+    total = int(df.index.memory_usage(deep=True))
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            total += int(serie.astype(object).memory_usage(deep=True, index=False))
+        elif pd.api.types.is_integer_dtype(serie):
+            total += 8 * len(serie)
+        else:
+            total += int(serie.memory_usage(deep=True, index=False))
+    return total
+
+
+def _reducir_entero(serie: pd.Series, minimo: type[np.integer] | None = None) -> pd.Series:
+    """Pasa a entero chico si la columna es numérica, entera y sin nulos."""
+    if not pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie):
+        return serie
+    if pd.api.types.is_float_dtype(serie):
+        valores = serie.to_numpy()
+        if not np.isfinite(valores).all() or not (valores == np.round(valores)).all():
+            return serie
+    reducida = pd.to_numeric(serie, downcast="integer")
+    if minimo is not None and reducida.dtype.itemsize < np.dtype(minimo).itemsize:
+        reducida = reducida.astype(minimo)
+    return reducida
+
+
+def _convertir(serie: pd.Series, tipo: str) -> pd.Series:
+    if tipo == "entero":
+        return _reducir_entero(serie)
+    if tipo == "monto":
+        return _reducir_entero(serie, minimo=np.int32)
+    if tipo == "categoria" and (
+        pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)
+    ):
+        return serie.astype("category")
+    return serie
+
+
+def aplicar_esquema(
+    df: pd.DataFrame, tabla: str, reporte: ReporteMemoria | None = None
+) -> pd.DataFrame:
+    """Convierte las columnas de ``df`` a los tipos compactos de ``ESQUEMA[tabla]``.
+
+    Es idempotente y sólo convierte lo que se puede sin perder información:
+    las columnas que aún tienen nulos o valores no numéricos quedan como
+    están hasta que la limpieza las resuelva.
+    """
+    esquema = ESQUEMA.get(tabla, {})
+    convertidas = {}
+    for col in df.columns:
+        tipo = esquema.get(str(col).strip().lower())
+        if tipo is not None:
+            serie = df[col]
+            convertida = _convertir(serie, tipo)
+            if convertida is not serie:
+                convertidas[col] = convertida
+
+    resultado = df.assign(**convertidas) if convertidas else df
+    if reporte is not None:
+        reporte.registrar(tabla, df, resultado)
+    return resultado
@@ -0,0 +1,252 @@
+"""
+Capa de consultas en esquema estrella para Tienda Aurelion.
+
+Detalle_ventas es la tabla de hechos y Ventas, Productos y Clientes son
+dimensiones con un índice clave → fila construido una sola vez. Al armar el
+esquema, cada línea de detalle guarda la posición de su venta, su producto y
+(a través de la venta) su cliente, de modo que cualquier atributo de una
+dimensión se resuelve con un ``take`` sobre la dimensión, que es chica, en vez
+de un ``merge`` sobre los hechos.
+
+La tabla ancha ``ventas_analitica`` sólo se construye si se pide
+explícitamente con :meth:`EsquemaEstrella.ventas_analitica`.
+
+Ejemplo:
+    estrella = EsquemaEstrella.desde_tablas(limpiar_datos(data))
+    estrella.importe_por("categoria")
+    estrella.importe_por("mes", "medio_pago")
+    estrella.sumar("cantidad", "ciudad")
+"""
+
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from aurelion_agregacion import AgregadosVentas, factorizar, sumar_por_codigo
+from aurelion_esquema import ESQUEMA
+
+# Atributos calculados sobre una dimensión: nombre -> (dimensión, función)
+DERIVADOS: dict[str, tuple[str, Callable[[pd.DataFrame], pd.Series]]] = {
+    "mes": ("Ventas", lambda tabla: tabla["fecha"].dt.to_period("M").rename("mes")),
+}
+
+
+class Dimension:
+    """Tabla de dimensión con una fila por clave y su índice de búsqueda."""
+
+    def __init__(self, nombre: str, tabla: pd.DataFrame, clave: str) -> None:
+        self.nombre = nombre
+        self.clave = clave
+        self.tabla = tabla.drop_duplicates(subset=[clave]).reset_index(drop=True)
+        self.indice = pd.Index(self.tabla[clave], name=clave)
+        self._codigos: dict[str, tuple[np.ndarray, pd.Index]] = {}
+
+    def __len__(self) -> int:
+        return len(self.tabla)
+
+    def posiciones(self, claves: pd.Series | np.ndarray) -> np.ndarray:
+        """Fila de la dimensión para cada clave; -1 si la clave no existe."""
+        return self.indice.get_indexer(claves).astype(np.int32)
+
+    def columna(self, nombre: str) -> pd.Series:
+        if nombre in DERIVADOS and DERIVADOS[nombre][0] == self.nombre:
+            return DERIVADOS[nombre][1](self.tabla)
+        return self.tabla[nombre]
+
+    def tiene(self, nombre: str) -> bool:
+        return nombre in self.tabla.columns or DERIVADOS.get(nombre, ("",))[0] == self.nombre
+
+    def codigos(self, nombre: str) -> tuple[np.ndarray, pd.Index]:
+        """Factoriza un atributo sobre la dimensión (se calcula una vez)."""
+        if nombre not in self._codigos:
+            self._codigos[nombre] = factorizar(self.columna(nombre))
+        return self._codigos[nombre]
+
+
+def _tomar(codigos: np.ndarray, posiciones: np.ndarray) -> np.ndarray:
+    """Propaga códigos de una dimensión a los hechos; -1 si no hay fila."""
+    if not len(codigos):
+        return np.full(len(posiciones), -1)
+    return np.where(posiciones >= 0, codigos[np.maximum(posiciones, 0)], -1)
+
+
+class EsquemaEstrella:
+    """Hechos de Detalle_ventas con claves foráneas resueltas a posiciones.
+
+    Sólo participan las líneas cuya venta existe en Ventas, igual que en el
+    ``merge`` izquierdo desde Ventas que arma ``ventas_analitica``.
+    """
+
+    def __init__(
+        self,
+        hechos: pd.DataFrame,
+        ventas: Dimension,
+        productos: Dimension,
+        clientes: Dimension,
+    ) -> None:
+        self.ventas = ventas
+        self.productos = productos
+        self.clientes = clientes
+        self.dimensiones = {"Ventas": ventas, "Productos": productos, "Clientes": clientes}
+
+        pos_venta = ventas.posiciones(hechos["id_venta"])
+        en_ventas = pos_venta >= 0
+        self.hechos = hechos[en_ventas].reset_index(drop=True)
+        self.pos_venta = pos_venta[en_ventas]
+        self.pos_producto = productos.posiciones(self.hechos["id_producto"])
+        self.pos_cliente_venta = clientes.posiciones(ventas.tabla["id_cliente"])
+        self.pos_cliente = _tomar(self.pos_cliente_venta, self.pos_venta)
+
+    @classmethod
+    def desde_tablas(cls, data: dict[str, pd.DataFrame]) -> "EsquemaEstrella":
+        """Arma el esquema a partir de las tablas limpias de ``limpiar_datos``.
+
+        De Detalle_ventas sólo se conservan las columnas propias de la fuente;
+        la categoría y el precio de catálogo se resuelven desde Productos.
+        """
+        Detalle_ventas = data["Detalle_ventas"]
+        columnas_hecho = [c for c in Detalle_ventas.columns if c in ESQUEMA["Detalle_ventas"]]
+        return cls(
+            Detalle_ventas[columnas_hecho],
+            Dimension("Ventas", data["Ventas"], "id_venta"),
+            Dimension("Productos", data["Productos"], "id_producto"),
+            Dimension("Clientes", data["Clientes"], "id_cliente"),
+        )
+
+    def _posiciones_de(self, dimension: Dimension) -> np.ndarray:
+        if dimension is self.ventas:
+            return self.pos_venta
+        if dimension is self.productos:
+            return self.pos_producto
+        return self.pos_cliente
+
+    def _resolver(self, atributo: str) -> tuple[np.ndarray, pd.Index]:
+        """Códigos por línea de hecho y valores únicos de un atributo.
+
+        Se busca en los hechos y luego en Ventas, Productos y Clientes; un
+        nombre calificado como ``"Productos.precio_unitario"`` fuerza la tabla.
+        """
+        tabla, _, columna = atributo.rpartition(".")
+        if not tabla and columna in self.hechos.columns:
+            return factorizar(self.hechos[columna])
+        for nombre, dimension in self.dimensiones.items():
+            if tabla in ("", nombre) and dimension.tiene(columna):
+                codigos, unicos = dimension.codigos(columna)
+                return _tomar(codigos, self._posiciones_de(dimension)), unicos
+        raise KeyError(f"Atributo desconocido en el esquema estrella: {atributo}")
+
+    def codigos(self, atributo: str) -> tuple[np.ndarray, pd.Index]:
+        """Código por línea de hecho (-1 si falta) y valores de un atributo.
+
+        Con un nombre calificado como ``"Productos.categoria"`` los valores
+        son los de la dimensión completa, estables entre esquemas que
+        comparten la misma :class:`Dimension`.
+        """
+        return self._resolver(atributo)
+
+    def sumar(self, metrica: str, *por: str) -> pd.Series:
+        """Suma una columna numérica de los hechos agrupada por atributos.
+
+        Con varios atributos el resultado tiene un ``MultiIndex`` con las
+        combinaciones observadas, ordenadas como en ``groupby``.
+        """
+        valores = self.hechos[metrica]
+        entero = pd.api.types.is_integer_dtype(valores)
+        numeros = valores.to_numpy(dtype=float, na_value=0.0)
+        if not por:
+            total = numeros.sum()
+            return pd.Series([int(total) if entero else total], index=["total"], name=metrica)
+
+        resueltos = [self._resolver(atributo) for atributo in por]
+        if len(resueltos) == 1:
+            codigos, unicos = resueltos[0]
+            conteo = np.bincount(codigos[codigos >= 0], minlength=len(unicos))
+            return sumar_por_codigo(codigos, unicos, numeros, entero, metrica)[conteo > 0]
+
+        # Código combinado por línea; sólo se enumeran las combinaciones presentes.
+        tamanos = [len(unicos) for _, unicos in resueltos]
+        validos = np.logical_and.reduce([codigos >= 0 for codigos, _ in resueltos])
+        combinado = np.ravel_multi_index(
+            [codigos[validos] for codigos, _ in resueltos], tamanos
+        )
+        presentes, inverso = np.unique(combinado, return_inverse=True)
+        sumas = np.bincount(inverso, weights=numeros[validos], minlength=len(presentes))
+        niveles = np.unravel_index(presentes, tamanos)
+        indice = pd.MultiIndex.from_arrays(
+            [unicos.take(nivel) for (_, unicos), nivel in zip(resueltos, niveles)]
+        )
+        serie = pd.Series(sumas, index=indice, name=metrica)
+        return serie.astype(np.int64) if entero else serie
+
+    def importe_por(self, *por: str) -> pd.Series:
+        """Atajo de :meth:`sumar` para el importe."""
+        return self.sumar("importe", *por)
+
+    def agregados(self) -> AgregadosVentas:
+        """Mismos agregados que ``agregar_ventas(ventas_analitica)`` sin la tabla ancha."""
+        importe = self.hechos["importe"].to_numpy(dtype=float, na_value=0.0)
+        lineas = np.bincount(self.pos_venta, minlength=len(self.ventas))
+        # En la tabla ancha una venta sin líneas aporta NaN y el importe pasa a float.
+        entero = pd.api.types.is_integer_dtype(self.hechos["importe"]) and bool((lineas > 0).all())
+
+        sumas_venta = np.bincount(self.pos_venta, weights=importe, minlength=len(self.ventas))
+        ventas_totales = pd.Series(sumas_venta, index=self.ventas.indice, name="importe").sort_index()
+        if entero:
+            ventas_totales = ventas_totales.astype(np.int64)
+        codigos_cliente, clientes = self.ventas.codigos("id_cliente")
+        ticket_por_cliente = sumar_por_codigo(codigos_cliente, clientes, sumas_venta, entero)
+
+        if self.productos.tiene("categoria"):
+            codigos, categorias = self._resolver("categoria")
+            conteo = np.bincount(codigos[codigos >= 0], minlength=len(categorias))
+            importe_por_categoria = sumar_por_codigo(codigos, categorias, importe, entero)[conteo > 0]
+        else:
+            importe_por_categoria = pd.Series(dtype=float)
+
+        if self.ventas.tiene("medio_pago"):
+            medios = self.ventas.columna("medio_pago")
+            codigos_medio, unicos_medio = pd.factorize(medios)
+            ventas_por_medio_pago = pd.Series(
+                np.bincount(codigos_medio[codigos_medio >= 0], minlength=len(unicos_medio)),
+                index=pd.Index(np.asarray(unicos_medio, dtype=object), name="medio_pago"),
+                name="count",
+            )
+        else:
+            ventas_por_medio_pago = pd.Series(dtype=np.int64)
+
+        return AgregadosVentas(
+            ventas_totales=ventas_totales,
+            ticket_por_cliente=ticket_por_cliente,
+            importe_por_categoria=importe_por_categoria,
+            ventas_por_medio_pago=ventas_por_medio_pago,
+            productos_distintos=self.hechos["id_producto"].nunique(),
+            clientes_distintos=len(clientes),
+        )
+
+    def matriz_correlacion(self) -> pd.DataFrame:
+        """Correlación entre las variables numéricas de los hechos."""
+        num_cols = [c for c in ["cantidad", "importe"] if c in self.hechos.columns]
+        return self.hechos[num_cols].corr()
+
+    def ventas_analitica(self) -> pd.DataFrame:
+        """Materializa la tabla ancha con el mismo formato que el merge clásico."""
+        detalle = self.hechos.copy()
+        for columna in ("categoria", "precio_unitario"):
+            if self.productos.tiene(columna):
+                destino = columna if columna not in detalle.columns else f"{columna}_prod"
+                detalle[destino] = pd.api.extensions.take(
+                    self.productos.tabla[columna].array, self.pos_producto, allow_fill=True
+                )
+
+        ancha = self.ventas.tabla.merge(
+            detalle, on="id_venta", how="left", suffixes=("_venta", "_detalle")
+        )
+        columnas_clientes = [
+            col for col in self.clientes.tabla.columns if col == "id_cliente" or col not in ancha.columns
+        ]
+        return ancha.merge(
+            self.clientes.tabla[columnas_clientes], on="id_cliente", how="left", suffixes=("", "_cliente")
+        )
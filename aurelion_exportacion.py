@@ -0,0 +1,213 @@
+"""
+Exportación incremental y atómica de CSV para Tienda Aurelion.
+
+:class:`ExportadorCSV` calcula un hash del contenido de cada tabla (o de
+cada partición mensual) y lo compara con el registrado en el manifiesto de
+la carpeta de salida. Si coincide y el archivo sigue igual en disco, no se
+vuelve a escribir; así los consumidores que vigilan los CSV (Power BI, por
+ejemplo) no se refrescan sin motivo.
+
+Cada archivo se escribe primero en un temporal de la misma carpeta y se
+renombra con ``os.replace``, por lo que un lector nunca ve un CSV a medio
+escribir. Las tablas grandes pueden partirse por mes: una venta nueva en
+junio reescribe sólo ``<tabla>/<tabla>_2024-06.csv``. Al cambiar de un
+formato al otro se borran los archivos del formato anterior, para que los
+consumidores no vean los mismos datos dos veces.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+MANIFIESTO_NOMBRE = ".manifiesto_exportacion.json"
+VERSION_MANIFIESTO = 1
+SIN_FECHA = "sin_fecha"
+
+
+def escribir_atomico(ruta: Path, escribir: Callable[[Path], Any]) -> None:
+    """Llama a ``escribir(tmp)`` y mueve el temporal a ``ruta``."""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ruta.with_name(f".{ruta.name}.tmp")
+    try:
+        escribir(tmp)
+        os.replace(tmp, ruta)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _hash_filas(df: pd.DataFrame | pd.Series, index: bool) -> np.ndarray:
+    return pd.util.hash_pandas_object(df, index=index).to_numpy()
+
+
+def _firma(df: pd.DataFrame | pd.Series, index: bool) -> bytes:
+    """Columnas, tipos y opciones que cambian el CSV aunque los valores no cambien."""
+    columnas = [str(df.name)] if isinstance(df, pd.Series) else [str(c) for c in df.columns]
+    tipos = [str(df.dtype)] if isinstance(df, pd.Series) else [str(t) for t in df.dtypes]
+    nombres_indice = [str(n) for n in df.index.names] if index else []
+    return json.dumps([columnas, tipos, nombres_indice, index, pd.__version__]).encode()
+
+
+class ExportadorCSV:
+    """Escribe CSV en ``salida`` sólo cuando su contenido cambió.
+
+    El manifiesto se actualiza en memoria con cada exportación y se persiste
+    con :meth:`guardar_manifiesto`.
+    """
+
+    def __init__(self, salida: Path) -> None:
+        self.salida = salida
+        self.ruta_manifiesto = salida / MANIFIESTO_NOMBRE
+        self.manifiesto = self._leer_manifiesto()
+        self.escritos: list[str] = []
+        self.omitidos: list[str] = []
+        self.eliminados: list[str] = []
+
+    def derivado(self) -> "ExportadorCSV":
+        """Exportador que comparte el manifiesto con éste pero lleva sus propias listas.
+
+        Sirve para que etapas concurrentes sepan qué archivos exportó cada
+        una; el manifiesto se guarda una sola vez, desde el original.
+        """
+        hijo = copy.copy(self)
+        hijo.escritos, hijo.omitidos, hijo.eliminados = [], [], []
+        return hijo
+
+    def incorporar(self, hijo: "ExportadorCSV") -> None:
+        """Suma a este exportador lo que hizo un :meth:`derivado`."""
+        self.escritos.extend(hijo.escritos)
+        self.omitidos.extend(hijo.omitidos)
+        self.eliminados.extend(hijo.eliminados)
+
+    def _leer_manifiesto(self) -> dict[str, dict[str, Any]]:
+        try:
+            contenido = json.loads(self.ruta_manifiesto.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if contenido.get("version") != VERSION_MANIFIESTO:
+            return {}
+        return contenido.get("archivos", {})
+
+    def _vigente(self, relativa: str, huella: str) -> bool:
+        """El manifiesto tiene el mismo hash y el archivo no se tocó desde entonces."""
+        registro = self.manifiesto.get(relativa)
+        if registro is None or registro["hash"] != huella:
+            return False
+        try:
+            estado = (self.salida / relativa).stat()
+        except OSError:
+            return False
+        return estado.st_size == registro["bytes"] and estado.st_mtime_ns == registro["mtime_ns"]
+
+    def _escribir(
+        self, df: pd.DataFrame | pd.Series, relativa: str, huella: str, index: bool
+    ) -> bool:
+        if self._vigente(relativa, huella):
+            self.omitidos.append(relativa)
+            return False
+        ruta = self.salida / relativa
+        escribir_atomico(ruta, lambda tmp: df.to_csv(tmp, index=index))
+        estado = ruta.stat()
+        self.manifiesto[relativa] = {
+            "hash": huella,
+            "filas": len(df),
+            "bytes": estado.st_size,
+            "mtime_ns": estado.st_mtime_ns,
+        }
+        self.escritos.append(relativa)
+        return True
+
+    def _eliminar(self, relativas: list[str]) -> None:
+        """Borra del disco y del manifiesto archivos que ya no se exportan.
+
+        La carpeta de particiones que queda vacía también se borra.
+        """
+        for relativa in relativas:
+            ruta = self.salida / relativa
+            ruta.unlink(missing_ok=True)
+            del self.manifiesto[relativa]
+            self.eliminados.append(relativa)
+            if ruta.parent != self.salida and not any(ruta.parent.iterdir()):
+                ruta.parent.rmdir()
+
+    def _particiones(self, nombre: str) -> list[str]:
+        """Particiones mensuales de ``nombre`` registradas en el manifiesto."""
+        stem = Path(nombre).stem
+        # list() copia las claves de una vez: otra etapa puede estar exportando con un derivado
+        return [r for r in list(self.manifiesto) if r.startswith(f"{stem}/")]
+
+    def exportar(self, df: pd.DataFrame | pd.Series, nombre: str, index: bool = False) -> bool:
+        """Escribe ``nombre`` (relativo a ``salida``) si su contenido cambió.
+
+        Si antes se exportó partido por mes, se borran esas particiones.
+
+        Returns:
+            ``True`` si el archivo se escribió.
+        """
+        digest = hashlib.blake2b(_firma(df, index), digest_size=16)
+        digest.update(_hash_filas(df, index).tobytes())
+        escrito = self._escribir(df, nombre, digest.hexdigest(), index)
+        self._eliminar(self._particiones(nombre))
+        return escrito
+
+    def exportar_por_mes(
+        self, df: pd.DataFrame, nombre: str, meses: pd.Series, index: bool = False
+    ) -> int:
+        """Escribe una partición por mes en ``<stem>/<stem>_AAAA-MM.csv``.
+
+        Args:
+            df: Tabla a exportar.
+            nombre: Nombre del CSV sin partir; su stem da nombre a la carpeta.
+            meses: Período mensual de cada fila, alineado con ``df``. Las
+                filas sin mes van a ``<stem>_sin_fecha.csv``.
+            index: Si se escribe el índice.
+
+        Returns:
+            La cantidad de particiones reescritas. Las particiones que ya no
+            tienen filas se eliminan, igual que ``nombre`` si antes se
+            exportó sin partir.
+        """
+        stem = Path(nombre).stem
+        etiquetas = meses.astype(str).where(meses.notna(), SIN_FECHA).to_numpy()
+        codigos, unicas = pd.factorize(etiquetas, sort=True)
+        hashes = _hash_filas(df, index)
+        firma = _firma(df, index)
+
+        orden = np.argsort(codigos, kind="stable")
+        limites = np.searchsorted(codigos[orden], np.arange(len(unicas) + 1))
+        vigentes = set()
+        escritas = 0
+        for i, etiqueta in enumerate(unicas):
+            filas = orden[limites[i]:limites[i + 1]]
+            relativa = f"{stem}/{stem}_{etiqueta}.csv"
+            vigentes.add(relativa)
+            digest = hashlib.blake2b(firma, digest_size=16)
+            digest.update(hashes[filas].tobytes())
+            escritas += self._escribir(df.iloc[filas], relativa, digest.hexdigest(), index)
+
+        sobrantes = [r for r in self._particiones(nombre) if r not in vigentes]
+        if nombre in self.manifiesto:
+            sobrantes.append(nombre)
+        self._eliminar(sobrantes)
+        return escritas
+
+    def guardar_manifiesto(self) -> None:
+        contenido = {"version": VERSION_MANIFIESTO, "archivos": self.manifiesto}
+        escribir_atomico(
+            self.ruta_manifiesto,
+            lambda tmp: tmp.write_text(json.dumps(contenido, indent=2, sort_keys=True), encoding="utf-8"),
+        )
+
+    def resumen(self) -> str:
+        texto = f"Exportación CSV: {len(self.escritos)} escritos, {len(self.omitidos)} sin cambios"
+        if self.eliminados:
+            texto += f", {len(self.eliminados)} eliminados"
+        return texto
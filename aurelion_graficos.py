@@ -0,0 +1,155 @@
+"""
+Renderizado de gráficos de Tienda Aurelion en procesos independientes.
+
+Cada gráfico es un :class:`TrabajoGrafico` que recibe sólo los datos ya
+agregados que necesita (totales por venta, conteos por medio de pago o la
+matriz de correlación), de modo que puede enviarse a un
+``ProcessPoolExecutor`` sin serializar ``ventas_analitica``. Los procesos
+trabajadores usan el backend Agg.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+UMBRAL_KDE = 50_000
+
+
+@dataclass(frozen=True)
+class TrabajoGrafico:
+    """Un gráfico a renderizar: función, argumentos ya agregados y destino."""
+
+    funcion: Callable[..., None]
+    argumentos: tuple
+    ruta: Path
+
+    def ejecutar(self) -> Path:
+        self.funcion(*self.argumentos, self.ruta)
+        return self.ruta
+
+
+def _iniciar_trabajador() -> None:
+    import matplotlib
+
+    matplotlib.use("Agg", force=True)
+
+
+def graficar_distribucion_ticket(
+    ventas_totales: pd.Series, umbral_kde: int | None, muestrear_kde: bool, ruta: Path
+) -> None:
+    """Histograma del ticket por venta con su KDE.
+
+    Por encima de ``umbral_kde`` tickets la KDE se estima sobre una muestra
+    de ese tamaño (``muestrear_kde=True``) o se omite.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(8, 5))
+    if umbral_kde is None or len(ventas_totales) <= umbral_kde:
+        sns.histplot(ventas_totales, bins=20, kde=True, color="#4c72b0")
+    else:
+        ax = sns.histplot(ventas_totales, bins=20, kde=False, color="#4c72b0")
+        if muestrear_kde:
+            from scipy.stats import gaussian_kde
+
+            muestra = ventas_totales.sample(n=umbral_kde, random_state=42).to_numpy(dtype=float)
+            grilla = np.linspace(ventas_totales.min(), ventas_totales.max(), 200)
+            # Misma escala que la KDE de histplot con stat="count".
+            ancho_bin = (grilla[-1] - grilla[0]) / 20
+            densidad = gaussian_kde(muestra)(grilla) * len(ventas_totales) * ancho_bin
+            ax.plot(grilla, densidad, color="#4c72b0")
+    plt.title("Distribución del ticket por venta")
+    plt.xlabel("Monto de venta")
+    plt.ylabel("Frecuencia")
+    plt.tight_layout()
+    plt.savefig(ruta)
+    plt.close()
+
+
+def graficar_medio_pago(conteos: pd.Series, ruta: Path) -> None:
+    """Barras con el número de ventas por medio de pago."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(8, 5))
+    sns.barplot(
+        x=conteos.index,
+        y=conteos.to_numpy(),
+        hue=conteos.index,
+        palette="viridis",
+        legend=False,
+    )
+    plt.title("Ventas por medio de pago")
+    plt.xlabel("Medio de pago")
+    plt.ylabel("Número de ventas")
+    plt.tight_layout()
+    plt.savefig(ruta)
+    plt.close()
+
+
+def graficar_correlaciones(corr: pd.DataFrame, ruta: Path) -> None:
+    """Heatmap de la matriz de correlación."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(6, 4))
+    sns.heatmap(corr, annot=True, cmap="coolwarm", fmt=".2f")
+    plt.title("Correlación entre variables numéricas")
+    plt.tight_layout()
+    plt.savefig(ruta)
+    plt.close()
+
+
+class RenderizadorGraficos:
+    """Pool de procesos que renderiza gráficos sin bloquear al llamador.
+
+    Con ``procesos=0`` los trabajos se ejecutan en el momento en el proceso
+    actual, lo que sirve para depurar o en entornos sin ``fork``. Usado con
+    ``with``, el pool se apaga al salir aunque haya un error antes de
+    :meth:`esperar`.
+    """
+
+    def __init__(self, procesos: int | None = None) -> None:
+        self._pool = (
+            None
+            if procesos == 0
+            else ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador)
+        )
+        self._pendientes: list[Future] = []
+        self._listos: list[Path] = []
+
+    def enviar(self, trabajos: list[TrabajoGrafico]) -> None:
+        for trabajo in trabajos:
+            if self._pool is None:
+                self._listos.append(trabajo.ejecutar())
+            else:
+                self._pendientes.append(self._pool.submit(trabajo.ejecutar))
+
+    def esperar(self) -> list[Path]:
+        """Bloquea hasta terminar todos los trabajos y devuelve las rutas escritas."""
+        try:
+            self._listos.extend(futuro.result() for futuro in self._pendientes)
+        finally:
+            self._pendientes.clear()
+            self.cerrar()
+        return self._listos
+
+    def cerrar(self) -> None:
+        """Cancela los trabajos que no empezaron y apaga el pool."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        self._pendientes.clear()
+
+    def __enter__(self) -> "RenderizadorGraficos":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.cerrar()
@@ -0,0 +1,218 @@
+"""
+Actualización incremental de las estadísticas descriptivas de Tienda Aurelion.
+
+Los agregados de :class:`aurelion_streaming.AcumuladorVentas` (importe por
+venta y por categoría, conteos, productos y clientes distintos) se guardan en
+un archivo ``.npz`` junto con la marca de agua ``id_venta`` más alta
+procesada. En cada ejecución sólo se agregan las ventas con ``id_venta`` mayor
+a esa marca y sus líneas de detalle; el historial ya agregado no se recalcula.
+
+Junto con la marca se guarda cuántas filas de Ventas y de Detalle_ventas ya se
+leyeron, y la ejecución siguiente empieza en esas posiciones. Con la caché
+columnar vigente se va directo a la primera fila nueva por mmap; con un
+``.xlsx`` openpyxl igual recorre el XML de las filas anteriores (el formato no
+permite saltar), aunque sin convertirlas en DataFrame.
+
+Se asume que las filas se agregan al final, con ``id_venta`` creciente, y que
+las líneas de una venta llegan junto con ella. Si el catálogo reasigna
+categorías o se corrigen o borran filas antiguas, hay que reiniciar el estado
+(``--reiniciar``).
+``--verificar`` compara el resultado incremental contra el cálculo completo.
+
+Uso:
+    python aurelion_incremental.py [--reiniciar] [--verificar]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from aurelion_cache import CACHE_DIR_NOMBRE, cache_valida
+from aurelion_esquema import aplicar_esquema
+from aurelion_streaming import AcumuladorVentas, iterar_detalle
+from proyecto_Aurelion import (
+    cargar_datos,
+    cargar_tabla,
+    catalogo_productos,
+    estadisticas_descriptivas,
+    guardar_estadisticas,
+    limpiar_datos,
+    limpiar_productos,
+    limpiar_ventas,
+)
+
+ESTADO_NOMBRE = "estado_incremental.npz"
+
+
+TABLAS_LEIDAS = ("Ventas", "Detalle_ventas")
+
+
+def cargar_estado(
+    ruta_estado: Path, catalogo: pd.DataFrame
+) -> tuple[AcumuladorVentas, float, dict[str, int]] | None:
+    """Lee el estado guardado, su marca de agua y las filas leídas de cada tabla.
+
+    Devuelve ``None`` si no existe. Un estado anterior a las filas leídas las
+    toma como cero: se recorre todo y se filtra por la marca.
+    """
+    if not ruta_estado.exists():
+        return None
+    with np.load(ruta_estado, allow_pickle=False) as archivo:
+        estado = {clave: archivo[clave] for clave in archivo.files}
+    filas = {stem: int(estado.get(f"filas_{stem}", 0)) for stem in TABLAS_LEIDAS}
+    return AcumuladorVentas.desde_estado(estado, catalogo), float(estado["marca_agua"]), filas
+
+
+def guardar_estado(
+    acumulador: AcumuladorVentas, marca_agua: float, ruta_estado: Path, filas: dict[str, int] | None = None
+) -> None:
+    """Escribe el estado de forma atómica (archivo temporal y ``os.replace``)."""
+    ruta_estado.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ruta_estado.with_name(ruta_estado.name + ".tmp")
+    posiciones = {f"filas_{stem}": np.array(n) for stem, n in (filas or {}).items()}
+    with open(tmp, "wb") as archivo:
+        np.savez(archivo, marca_agua=np.array(marca_agua), **posiciones, **acumulador.a_estado())
+    os.replace(tmp, ruta_estado)
+
+
+def _filas_fuente(ruta: Path, cache_dir: Path | None) -> int | None:
+    """Filas de la caché vigente de ``ruta``; ``None`` si no hay caché que consultar."""
+    if cache_dir is None or not cache_valida(ruta, cache_dir / ruta.stem):
+        return None
+    meta = json.loads((cache_dir / ruta.stem / "meta.json").read_text(encoding="utf-8"))
+    return meta["filas"]
+
+
+def _filtrar_nuevas(bloque: pd.DataFrame, marca_agua: float) -> pd.DataFrame:
+    """Conserva sólo las líneas cuyo ``id_venta`` supera la marca de agua."""
+    columna = next(c for c in bloque.columns if c.strip().lower() == "id_venta")
+    return bloque[pd.to_numeric(bloque[columna], errors="coerce") > marca_agua]
+
+
+def actualizar_incremental(
+    base_dir: Path,
+    cache_dir: Path | None = None,
+    ruta_estado: Path | None = None,
+    tamano_bloque: int = 100_000,
+    reiniciar: bool = False,
+) -> dict[str, pd.Series]:
+    """Agrega las ventas nuevas al estado persistido y devuelve las métricas.
+
+    Args:
+        base_dir: Carpeta con los Excel de origen.
+        cache_dir: Carpeta de la caché columnar, si se usa.
+        ruta_estado: Archivo del estado. Por defecto dentro de ``cache_dir``
+            o de ``base_dir / CACHE_DIR_NOMBRE``.
+        tamano_bloque: Filas de Detalle_ventas procesadas por bloque.
+        reiniciar: Descarta el estado y recalcula desde cero.
+
+    Returns:
+        El mismo diccionario que devuelve ``estadisticas_descriptivas``.
+    """
+    if ruta_estado is None:
+        ruta_estado = (cache_dir or base_dir / CACHE_DIR_NOMBRE) / ESTADO_NOMBRE
+
+    Productos, _ = cargar_tabla(base_dir, "Productos", cache_dir)
+    catalogo = catalogo_productos(limpiar_productos(Productos))
+
+    previo = None if reiniciar else cargar_estado(ruta_estado, catalogo)
+    marca_agua = -np.inf if previo is None else previo[1]
+    leidas = dict.fromkeys(TABLAS_LEIDAS, 0) if previo is None else previo[2]
+    rutas = {stem: base_dir / f"{stem}.xlsx" for stem in TABLAS_LEIDAS}
+    for stem, ruta in rutas.items():
+        filas = _filas_fuente(ruta, cache_dir)
+        if filas is not None and filas < leidas[stem]:
+            raise ValueError(f"{ruta.name} tiene menos filas que las ya procesadas; use --reiniciar")
+
+    # Sólo las filas posteriores a las ya leídas; la marca descarta además
+    # las que se agregaron al final pero corresponden a ventas viejas.
+    bloques = list(iterar_detalle(rutas["Ventas"], tamano_bloque, cache_dir, leidas["Ventas"]))
+    leidas["Ventas"] += sum(len(bloque) for bloque in bloques)
+    if bloques:
+        Ventas = limpiar_ventas(aplicar_esquema(pd.concat(bloques, ignore_index=True), "Ventas"))
+        nuevas = Ventas[Ventas["id_venta"] > marca_agua]
+    else:
+        nuevas = pd.DataFrame({"id_venta": pd.Series(dtype=np.int64), "id_cliente": pd.Series(dtype=np.int64)})
+    if nuevas.empty and previo is not None:
+        if bloques:
+            # Filas agregadas pero de ventas viejas: no se vuelven a leer
+            guardar_estado(previo[0], marca_agua, ruta_estado, leidas)
+        return previo[0].finalizar()
+
+    acumulador = AcumuladorVentas(nuevas, catalogo)
+    for bloque in iterar_detalle(rutas["Detalle_ventas"], tamano_bloque, cache_dir, leidas["Detalle_ventas"]):
+        leidas["Detalle_ventas"] += len(bloque)
+        acumulador.agregar(_filtrar_nuevas(bloque, marca_agua))
+
+    if previo is not None:
+        previo[0].combinar(acumulador)
+        acumulador = previo[0]
+    if not nuevas.empty:
+        marca_agua = float(nuevas["id_venta"].max())
+    guardar_estado(acumulador, marca_agua, ruta_estado, leidas)
+    return acumulador.finalizar()
+
+
+def verificar_incremental(
+    incremental: dict[str, pd.Series], completo: dict[str, pd.Series]
+) -> list[str]:
+    """Compara métricas incrementales con las del cálculo completo.
+
+    Returns:
+        Los nombres de las métricas que difieren; vacía si todo coincide.
+    """
+    diferencias = []
+    for nombre, esperado in completo.items():
+        obtenido = incremental[nombre]
+        iguales = (
+            obtenido.index.astype(str).equals(esperado.index.astype(str))
+            and np.allclose(
+                obtenido.to_numpy(dtype=float), esperado.to_numpy(dtype=float), equal_nan=True
+            )
+        )
+        if not iguales:
+            diferencias.append(nombre)
+    return diferencias
+
+
+def main(reiniciar: bool = False, verificar: bool = False, tamano_bloque: int = 100_000) -> int:
+    base_dir = Path(__file__).resolve().parent
+    cache_dir = base_dir / CACHE_DIR_NOMBRE
+
+    stats = actualizar_incremental(
+        base_dir, cache_dir=cache_dir, tamano_bloque=tamano_bloque, reiniciar=reiniciar
+    )
+    guardar_estadisticas(stats, base_dir)
+    print("=== Estadísticas descriptivas (incremental) ===")
+    print(stats["resumen_general"].to_string())
+
+    if verificar:
+        data, _ = cargar_datos(base_dir, cache_dir=cache_dir)
+        completo = estadisticas_descriptivas(
+            limpiar_datos(data, materializar_analitica=True)["ventas_analitica"]
+        )
+        diferencias = verificar_incremental(stats, completo)
+        if diferencias:
+            print(f"Verificación: difieren {', '.join(diferencias)}")
+            return 1
+        print("Verificación: el resultado incremental coincide con el completo")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reiniciar", action="store_true", help="Descarta el estado guardado y recalcula todo.")
+    parser.add_argument(
+        "--verificar", action="store_true", help="Compara el resultado con el recálculo completo."
+    )
+    parser.add_argument(
+        "--tamano-bloque", type=int, default=100_000, help="Filas de Detalle_ventas por bloque."
+    )
+    args = parser.parse_args()
+    raise SystemExit(main(args.reiniciar, args.verificar, args.tamano_bloque))
@@ -0,0 +1,227 @@
+"""
+Instrumentación por etapa del pipeline de Tienda Aurelion.
+
+:class:`Instrumentacion` registra, para cada etapa envuelta con
+:meth:`Instrumentacion.etapa` (o decorada con
+:meth:`Instrumentacion.instrumentada`), el tiempo de reloj, el tiempo de CPU,
+el aumento del pico de RSS del proceso y las filas de entrada y salida. Al
+final de la corrida se puede imprimir un resumen y guardar un registro JSON;
+opcionalmente una etapa se perfila con ``cProfile``.
+
+El pico de RSS (``ru_maxrss``) sólo crece, así que el delta indica cuánto
+subió el máximo durante la etapa, no cuánta memoria liberó. El trabajo hecho
+en procesos hijos (por ejemplo, los gráficos) no cuenta en el CPU de la etapa.
+
+Ejemplo:
+    inst = Instrumentacion()
+    with inst.etapa("limpieza", data) as etapa:
+        data_limpia = etapa.salida(limpiar_datos(data))
+    print(inst.resumen())
+"""
+
+from __future__ import annotations
+
+import cProfile
+import functools
+import json
+import platform
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def contar_filas(valor: Any) -> int | None:
+    """Filas de un DataFrame, una Serie o la suma de un diccionario de tablas.
+
+    De una tupla se cuenta el primer elemento (``cargar_datos`` devuelve
+    ``(data, rutas)``); cualquier otro objeto con ``hechos`` cuenta esas filas.
+    """
+    if isinstance(valor, tuple) and valor:
+        valor = valor[0]
+    if isinstance(valor, dict):
+        filas = [f for f in map(contar_filas, valor.values()) if f is not None]
+        return sum(filas) if filas else None
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return len(valor)
+    hechos = getattr(valor, "hechos", None)
+    if isinstance(hechos, pd.DataFrame):
+        return len(hechos)
+    return None
+
+
+def _rss_pico() -> int | None:
+    """Pico de RSS del proceso en bytes, o ``None`` si no se puede medir."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB y macOS bytes
+    return pico if sys.platform == "darwin" else pico * 1024
+
+
+def _commit_actual() -> str | None:
+    try:
+        salida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return salida.stdout.strip() or None
+
+
+def _version(paquete: str) -> str | None:
+    """Versión instalada de ``paquete`` sin importarlo."""
+    try:
+        return metadata.version(paquete)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def entorno() -> dict[str, Any]:
+    """Versiones y máquina, para saber qué se compara contra qué.
+
+    Las versiones salen de los metadatos instalados: registrar la de
+    scikit-learn no debe importarlo en corridas que no entrenan el modelo.
+    """
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "python": platform.python_version(),
+        "pandas": _version("pandas"),
+        "numpy": _version("numpy"),
+        "sklearn": _version("scikit-learn"),
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+    }
+
+
+@dataclass
+class RegistroEtapa:
+    """Mediciones de una etapa."""
+
+    nombre: str
+    segundos: float = 0.0
+    cpu_segundos: float = 0.0
+    rss_pico_delta_bytes: int | None = None
+    filas_entrada: int | None = None
+    filas_salida: int | None = None
+    perfil: str | None = None
+
+    def salida(self, valor: Any) -> Any:
+        """Registra las filas de ``valor`` como salida y lo devuelve."""
+        self.filas_salida = contar_filas(valor)
+        return valor
+
+
+class Instrumentacion:
+    """Registro de las etapas de una corrida.
+
+    Args:
+        perfilar: Nombre de la etapa a perfilar con ``cProfile``.
+        dir_perfiles: Carpeta donde se guarda ``perfil_<etapa>.prof``.
+    """
+
+    def __init__(self, perfilar: str | None = None, dir_perfiles: Path | None = None) -> None:
+        self.etapas: list[RegistroEtapa] = []
+        self.perfilar = perfilar
+        self.dir_perfiles = dir_perfiles or Path.cwd()
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nombre: str, entrada: Any = None) -> Iterator[RegistroEtapa]:
+        """Mide el bloque ``with``; ``entrada`` puede ser un conteo o los datos."""
+        registro = RegistroEtapa(
+            nombre, filas_entrada=entrada if isinstance(entrada, int) else contar_filas(entrada)
+        )
+        perfil = cProfile.Profile() if nombre == self.perfilar else None
+        rss_antes = _rss_pico()
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        if perfil is not None:
+            perfil.enable()
+        try:
+            yield registro
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            registro.segundos = time.perf_counter() - inicio
+            registro.cpu_segundos = time.process_time() - inicio_cpu
+            rss_despues = _rss_pico()
+            if rss_antes is not None and rss_despues is not None:
+                registro.rss_pico_delta_bytes = rss_despues - rss_antes
+            if perfil is not None:
+                self.dir_perfiles.mkdir(parents=True, exist_ok=True)
+                ruta = self.dir_perfiles / f"perfil_{nombre}.prof"
+                perfil.dump_stats(ruta)
+                registro.perfil = str(ruta)
+            self.etapas.append(registro)
+
+    def instrumentada(self, nombre: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Decorador que mide cada llamada como la etapa ``nombre``.
+
+        Las filas de entrada se toman del primer argumento y las de salida
+        del valor devuelto.
+        """
+
+        def decorador(funcion: Callable[..., Any]) -> Callable[..., Any]:
+            @functools.wraps(funcion)
+            def envoltura(*args: Any, **kwargs: Any) -> Any:
+                with self.etapa(nombre, args[0] if args else None) as registro:
+                    return registro.salida(funcion(*args, **kwargs))
+
+            return envoltura
+
+        return decorador
+
+    @property
+    def segundos_totales(self) -> float:
+        return time.perf_counter() - self._inicio
+
+    def a_dict(self) -> dict[str, Any]:
+        return {
+            "entorno": entorno(),
+            "segundos_totales": self.segundos_totales,
+            "etapas": [asdict(etapa) for etapa in self.etapas],
+        }
+
+    def guardar(self, ruta: Path) -> None:
+        """Escribe el registro de la corrida en JSON."""
+        ruta.write_text(json.dumps(self.a_dict(), indent=2, ensure_ascii=False), encoding="utf-8")
+
+    def resumen(self) -> str:
+        """Tabla de tiempos, memoria y filas por etapa para la consola."""
+        total = self.segundos_totales
+        tabla = pd.DataFrame(
+            {
+                "segundos": [e.segundos for e in self.etapas],
+                "cpu": [e.cpu_segundos for e in self.etapas],
+                "%": [100 * e.segundos / total if total else 0.0 for e in self.etapas],
+                "rss_MiB": [
+                    None if e.rss_pico_delta_bytes is None else e.rss_pico_delta_bytes / 2**20
+                    for e in self.etapas
+                ],
+                "filas_entrada": pd.array([e.filas_entrada for e in self.etapas], dtype="Int64"),
+                "filas_salida": pd.array([e.filas_salida for e in self.etapas], dtype="Int64"),
+            },
+            index=pd.Index([e.nombre for e in self.etapas], name="etapa"),
+        )
+        return (
+            "=== Tiempos por etapa ===\n"
+            + tabla.to_string(float_format=lambda valor: f"{valor:.3f}", na_rep="-")
+            + f"\nTotal: {total:.3f} s"
+        )
@@ -0,0 +1,249 @@
+"""
+Procesamiento por lotes de varias tiendas o períodos de Tienda Aurelion.
+
+Cada carpeta con los cuatro Excel (Clientes, Ventas, Detalle_ventas y
+Productos) es un trabajo: carga, limpieza, estadísticas y exportación de los
+CSV, con las mismas etapas de ``aurelion_cli.py estadisticas``. Los trabajos
+corren en un ``ProcessPoolExecutor`` cuyos procesos importan pandas y el
+pipeline una sola vez al iniciar y los reutilizan para todas las carpetas
+que atienden.
+
+Un trabajo que falla no detiene a los demás: su error queda en
+``lotes_estado.csv`` junto con el tiempo de cada carpeta. Al terminar, los
+``resumen_general`` e ``importe_por_categoria`` de las carpetas correctas se
+consolidan en ``consolidado_resumen_general.csv`` (una fila por tienda) y
+``consolidado_importe_por_categoria.csv`` (tienda × categoría), con una
+fila de total.
+
+Uso:
+    python aurelion_lotes.py "tiendas/*/2024-*" --salida resultados --procesos 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+ARCHIVOS = ("Clientes.xlsx", "Ventas.xlsx", "Detalle_ventas.xlsx", "Productos.xlsx")
+ESTADO_NOMBRE = "lotes_estado.csv"
+
+
+@dataclass
+class ResultadoTienda:
+    """Lo que un trabajo devuelve al proceso principal; sólo datos chicos."""
+
+    tienda: str
+    entrada: Path
+    ok: bool
+    segundos: float
+    resumen_general: pd.Series | None = None
+    importe_por_categoria: pd.Series | None = None
+    archivos: dict[str, int] = field(default_factory=dict)
+    error: str | None = None
+
+
+def expandir_entradas(patrones: Iterable[str]) -> list[Path]:
+    """Carpetas que coinciden con ``patrones`` (rutas o globs) y tienen los cuatro Excel.
+
+    El orden es el de los patrones y, dentro de cada glob, alfabético; las
+    repetidas se ignoran.
+    """
+    carpetas: dict[Path, None] = {}
+    for patron in patrones:
+        coincidencias = sorted(glob.glob(patron, recursive=True)) or [patron]
+        for coincidencia in coincidencias:
+            ruta = Path(coincidencia).resolve()
+            if ruta.is_dir() and all((ruta / archivo).exists() for archivo in ARCHIVOS):
+                carpetas.setdefault(ruta)
+    return list(carpetas)
+
+
+def nombres_tienda(carpetas: list[Path]) -> dict[Path, Path]:
+    """Nombre relativo de cada carpeta respecto de su ancestro común.
+
+    La carpeta que es el propio ancestro (la madre de las demás) se nombra
+    como su carpeta en lugar de ``.``.
+    """
+    if len(carpetas) == 1:
+        return {carpetas[0]: Path(carpetas[0].name)}
+    comun = Path(os.path.commonpath(carpetas))
+    return {
+        carpeta: carpeta.relative_to(comun) if carpeta != comun else Path(carpeta.name)
+        for carpeta in carpetas
+    }
+
+
+def _iniciar_trabajador() -> None:
+    # Las importaciones pesadas se hacen una vez por proceso, no por carpeta
+    import aurelion_cli  # noqa: F401
+    import aurelion_estrella  # noqa: F401
+    import proyecto_Aurelion  # noqa: F401
+
+
+def procesar_tienda(tienda: str, entrada: Path, salida: Path, usar_cache: bool = True) -> ResultadoTienda:
+    """Carga, limpia, calcula las estadísticas y exporta una carpeta.
+
+    Usa la etapa ``estadisticas`` de :mod:`aurelion_cli`; lo que imprime se
+    descarta para no mezclar la salida de varios trabajadores.
+    Nunca lanza: un error se devuelve en :attr:`ResultadoTienda.error`.
+    """
+    inicio = time.perf_counter()
+    try:
+        from aurelion_cli import _estadisticas
+        from aurelion_exportacion import ExportadorCSV
+
+        salida.mkdir(parents=True, exist_ok=True)
+        exportador = ExportadorCSV(salida)
+        args = argparse.Namespace(entrada=entrada, salida=salida, sin_cache=not usar_cache)
+        with contextlib.redirect_stdout(io.StringIO()):
+            agregados, _ = _estadisticas(args, exportador)
+        stats = agregados.estadisticas
+        exportador.guardar_manifiesto()
+        return ResultadoTienda(
+            tienda,
+            entrada,
+            True,
+            time.perf_counter() - inicio,
+            resumen_general=stats["resumen_general"],
+            importe_por_categoria=stats["importe_por_categoria"],
+            archivos={"escritos": len(exportador.escritos), "sin_cambios": len(exportador.omitidos)},
+        )
+    except Exception:
+        return ResultadoTienda(
+            tienda, entrada, False, time.perf_counter() - inicio, error=traceback.format_exc(limit=5)
+        )
+
+
+def consolidar(resultados: list[ResultadoTienda]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Resumen general (tienda × métrica) e importe por categoría (tienda × categoría)."""
+    correctos = [r for r in resultados if r.ok]
+    if not correctos:
+        return pd.DataFrame(), pd.DataFrame()
+    indice = pd.Index([r.tienda for r in correctos], name="tienda")
+    resumen = pd.DataFrame([r.resumen_general for r in correctos], index=indice)
+    categorias = pd.DataFrame([r.importe_por_categoria for r in correctos], index=indice).fillna(0)
+    categorias = categorias[categorias.sum().sort_values(ascending=False).index]
+
+    # Totales: los conteos y montos se suman; el ticket promedio se recalcula.
+    # Productos y clientes distintos no son aditivos entre tiendas y quedan vacíos.
+    total = resumen.sum(numeric_only=True)
+    if {"monto_total", "ventas_registradas"} <= set(total.index) and total["ventas_registradas"]:
+        total["ticket_promedio"] = total["monto_total"] / total["ventas_registradas"]
+    for columna in ("productos_distintos", "clientes_distintos"):
+        if columna in total:
+            total[columna] = float("nan")
+    resumen.loc["TOTAL"] = total
+    categorias.loc["TOTAL"] = categorias.sum()
+    return resumen, categorias
+
+
+def ejecutar_lote(
+    carpetas: list[Path],
+    salida: Path | None = None,
+    procesos: int | None = None,
+    usar_cache: bool = True,
+) -> list[ResultadoTienda]:
+    """Procesa ``carpetas`` en paralelo e informa el avance por stderr.
+
+    Los resultados de cada carpeta van a ``salida / <tienda>``; sin
+    ``salida``, a la propia carpeta de entrada.
+    """
+    nombres = nombres_tienda(carpetas)
+    destinos = {carpeta: (salida / nombres[carpeta] if salida else carpeta) for carpeta in carpetas}
+    resultados: list[ResultadoTienda] = []
+    inicio = time.perf_counter()
+
+    def informar(resultado: ResultadoTienda) -> None:
+        resultados.append(resultado)
+        estado = "ok" if resultado.ok else "ERROR"
+        print(
+            f"[{len(resultados)}/{len(carpetas)}] {resultado.tienda}: {estado} en {resultado.segundos:.2f} s",
+            file=sys.stderr,
+        )
+
+    if procesos == 0:
+        for carpeta in carpetas:
+            informar(procesar_tienda(str(nombres[carpeta]), carpeta, destinos[carpeta], usar_cache))
+    else:
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador) as pool:
+            futuros = {
+                pool.submit(procesar_tienda, str(nombres[carpeta]), carpeta, destinos[carpeta], usar_cache): carpeta
+                for carpeta in carpetas
+            }
+            for futuro in as_completed(futuros):
+                carpeta = futuros[futuro]
+                try:
+                    informar(futuro.result())
+                except Exception as error:  # El proceso murió (memoria, señal)
+                    informar(ResultadoTienda(str(nombres[carpeta]), carpeta, False, 0.0, error=repr(error)))
+
+    print(f"Lote terminado en {time.perf_counter() - inicio:.2f} s", file=sys.stderr)
+    orden = {carpeta: i for i, carpeta in enumerate(carpetas)}
+    return sorted(resultados, key=lambda r: orden[r.entrada])
+
+
+def tabla_estado(resultados: list[ResultadoTienda]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "entrada": [str(r.entrada) for r in resultados],
+            "ok": [r.ok for r in resultados],
+            "segundos": [r.segundos for r in resultados],
+            "escritos": [r.archivos.get("escritos") for r in resultados],
+            "sin_cambios": [r.archivos.get("sin_cambios") for r in resultados],
+            "error": [None if r.error is None else r.error.strip().splitlines()[-1] for r in resultados],
+        },
+        index=pd.Index([r.tienda for r in resultados], name="tienda"),
+    )
+
+
+def main(patrones: list[str], salida: Path, procesos: int | None, usar_cache: bool) -> int:
+    from aurelion_exportacion import ExportadorCSV
+
+    carpetas = expandir_entradas(patrones)
+    if not carpetas:
+        print("Ninguna carpeta con los cuatro Excel coincide con las entradas.", file=sys.stderr)
+        return 1
+    resultados = ejecutar_lote(carpetas, salida, procesos, usar_cache)
+
+    exportador = ExportadorCSV(salida)
+    resumen, categorias = consolidar(resultados)
+    if not resumen.empty:
+        exportador.exportar(resumen, "consolidado_resumen_general.csv", index=True)
+        exportador.exportar(categorias, "consolidado_importe_por_categoria.csv", index=True)
+    estado = tabla_estado(resultados)
+    exportador.exportar(estado, ESTADO_NOMBRE, index=True)
+    exportador.guardar_manifiesto()
+
+    if not resumen.empty:
+        print("=== Resumen consolidado ===")
+        print(resumen.to_string(float_format=lambda x: f"{x:,.2f}"))
+    fallidos = estado[~estado["ok"]]
+    for tienda, fila in fallidos.iterrows():
+        print(f"Falló {tienda}: {fila['error']}", file=sys.stderr)
+    return 1 if len(fallidos) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entradas", nargs="+", help="Carpetas de datos o globs (entre comillas).")
+    parser.add_argument(
+        "--salida", type=Path, default=Path("resultados_lote"), help="Carpeta de resultados y del consolidado."
+    )
+    parser.add_argument(
+        "--procesos", type=int, default=None, help="Procesos del pool (0 procesa en el proceso principal)."
+    )
+    parser.add_argument("--sin-cache", action="store_true", help="Lee siempre los Excel sin la caché columnar.")
+    args = parser.parse_args()
+    raise SystemExit(main(args.entradas, args.salida, args.procesos, not args.sin_cache))
@@ -0,0 +1,520 @@
+"""
+Servicio de predicción del importe para Tienda Aurelion.
+
+``main()`` de ``proyecto_Aurelion.py`` entrena la regresión lineal del
+importe y la guarda como un artefacto versionado en ``modelos/``: un JSON
+con los coeficientes, el intercepto y el codificador de variables
+(:class:`CodificadorImporte`), que recuerda las categorías vistas en el
+entrenamiento, la categoría base que descarta ``drop_first`` y el orden de
+las columnas. Una nueva versión sólo se escribe si el modelo cambió.
+
+:class:`ServicioImporte` carga el artefacto una vez y predice lotes grandes
+como un producto matriz-vector de NumPy, armando la matriz de variables por
+bloques para acotar la memoria. Las líneas de detalle sin ``categoria`` la
+toman del catálogo guardado en el artefacto a partir de ``id_producto``; una
+categoría que no estaba en el entrenamiento se trata como la categoría base
+y la respuesta del servicio lo indica con ``categoria_desconocida``.
+
+El modo ``servir`` lee pedidos JSON por línea de stdin y responde por stdout.
+Los pedidos que llegan juntos (hasta ``--lote-max`` o dentro de
+``--espera-ms``) se resuelven con una sola predicción. Cada pedido lleva
+``cantidad``, ``precio_unitario`` y ``categoria`` (o ``id_producto``) como
+escalares o como listas de igual largo, y opcionalmente un ``id`` que se
+devuelve en la respuesta.
+
+Uso:
+    python aurelion_prediccion.py predecir --entrada Detalle_ventas.csv --salida predicciones.csv
+    echo '{"id": 1, "cantidad": 3, "precio_unitario": 2500, "categoria": "Limpieza"}' \\
+        | python aurelion_prediccion.py servir
+    python aurelion_prediccion.py benchmark --filas 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, TextIO
+
+import numpy as np
+import pandas as pd
+
+from aurelion_exportacion import escribir_atomico
+
+MODELOS_DIR_NOMBRE = "modelos"
+PREFIJO_ARTEFACTO = "modelo_importe_v"
+VERSION_ARTEFACTO = 1
+VARIABLES_BASICAS = ("cantidad", "precio_unitario")
+TAMANO_BLOQUE = 65_536
+
+
+@dataclass
+class CodificadorImporte:
+    """Variables del modelo del importe, equivalentes a ``pd.get_dummies``.
+
+    ``categorias`` guarda todas las categorías del entrenamiento en el orden
+    de ``get_dummies``; la primera es la base y no tiene columna propia.
+    """
+
+    variables: list[str]
+    categorias: list[str] | None = None
+    catalogo: dict[int, str] = field(default_factory=dict)
+
+    @classmethod
+    def ajustar(cls, Detalle_ventas: pd.DataFrame) -> "CodificadorImporte":
+        """Toma las variables presentes y las categorías del detalle enriquecido."""
+        variables = [col for col in VARIABLES_BASICAS if col in Detalle_ventas]
+        if "categoria" not in Detalle_ventas:
+            return cls(variables)
+        categoria = Detalle_ventas["categoria"]
+        if isinstance(categoria.dtype, pd.CategoricalDtype):
+            categorias = [str(c) for c in categoria.cat.categories]
+        else:
+            categorias = sorted(str(c) for c in categoria.dropna().unique())
+        catalogo: dict[int, str] = {}
+        if "id_producto" in Detalle_ventas:
+            pares = Detalle_ventas[["id_producto", "categoria"]].dropna().drop_duplicates("id_producto")
+            catalogo = dict(zip(pares["id_producto"].astype(np.int64).tolist(), pares["categoria"].astype(str)))
+        return cls(variables, categorias, catalogo)
+
+    @property
+    def columnas(self) -> list[str]:
+        """Columnas de la matriz en el orden de los coeficientes."""
+        dummies = [f"categoria_{c}" for c in (self.categorias or [])[1:]]
+        return self.variables + dummies
+
+    def faltantes(self, columnas: Iterable[str]) -> list[str]:
+        """Columnas necesarias para predecir que no están en ``columnas``."""
+        columnas = set(columnas)
+        faltan = [col for col in self.variables if col not in columnas]
+        if self.categorias and not {"categoria", "id_producto"} & columnas:
+            faltan.append("categoria o id_producto")
+        return faltan
+
+    def _codigos_categoria(self, df: pd.DataFrame) -> np.ndarray:
+        """Posición de la categoría de cada fila; -1 si falta o no se conoce.
+
+        Las filas sin ``categoria`` la buscan en el catálogo por ``id_producto``.
+        """
+        valores = pd.Series(
+            np.asarray(df["categoria"], dtype=object) if "categoria" in df else np.full(len(df), None, dtype=object)
+        )
+        valores = valores.where(valores.isna(), valores.astype(str))
+        if "id_producto" in df and valores.isna().any():
+            productos = pd.Series(pd.to_numeric(df["id_producto"], errors="coerce").to_numpy())
+            valores = valores.fillna(productos.map(self.catalogo))
+        return pd.Index(self.categorias).get_indexer(valores)
+
+    def categorias_desconocidas(self, df: pd.DataFrame) -> np.ndarray:
+        """Filas cuya categoría falta o no estaba en el entrenamiento (se predicen como la base)."""
+        if not self.categorias:
+            return np.zeros(len(df), dtype=bool)
+        return self._codigos_categoria(df) < 0
+
+    def transformar(self, df: pd.DataFrame) -> np.ndarray:
+        """Matriz ``float64`` de ``len(df)`` filas con las columnas de :attr:`columnas`."""
+        faltantes = self.faltantes(df.columns)
+        if faltantes:
+            raise ValueError(f"Faltan columnas para predecir: {', '.join(faltantes)}")
+        X = np.zeros((len(df), len(self.columnas)))
+        for j, col in enumerate(self.variables):
+            X[:, j] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        if self.categorias:
+            codigos = self._codigos_categoria(df)
+            # La categoría base (código 0) y las desconocidas (-1) no llevan columna
+            filas = np.flatnonzero(codigos > 0)
+            X[filas, len(self.variables) + codigos[filas] - 1] = 1.0
+        return X
+
+    def a_dict(self) -> dict[str, Any]:
+        return {
+            "variables": self.variables,
+            "categorias": self.categorias,
+            "catalogo": {str(k): v for k, v in self.catalogo.items()},
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: dict[str, Any]) -> "CodificadorImporte":
+        catalogo = {int(k): v for k, v in datos.get("catalogo", {}).items()}
+        return cls(list(datos["variables"]), datos.get("categorias"), catalogo)
+
+
+@dataclass
+class ArtefactoModelo:
+    """Regresión lineal del importe lista para predecir sin scikit-learn."""
+
+    codificador: CodificadorImporte
+    coeficientes: np.ndarray
+    intercepto: float
+    metricas: dict[str, float] = field(default_factory=dict)
+    filas_entrenamiento: int = 0
+    version: int = 0
+    creado: str = ""
+    entorno: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def desde_modelo(
+        cls,
+        modelo: Any,
+        codificador: CodificadorImporte,
+        metricas: dict[str, float],
+        filas_entrenamiento: int,
+    ) -> "ArtefactoModelo":
+        """Empaqueta un ``LinearRegression`` ajustado sobre ``codificador.transformar``."""
+        import sklearn
+
+        return cls(
+            codificador=codificador,
+            coeficientes=np.asarray(modelo.coef_, dtype=float),
+            intercepto=float(modelo.intercept_),
+            metricas={clave: float(valor) for clave, valor in metricas.items()},
+            filas_entrenamiento=filas_entrenamiento,
+            entorno={"sklearn": sklearn.__version__, "numpy": np.__version__, "pandas": pd.__version__},
+        )
+
+    def huella(self) -> str:
+        """Hash de lo que determina las predicciones; no incluye versión ni fecha."""
+        contenido = json.dumps(
+            [self.codificador.a_dict(), self.coeficientes.tolist(), self.intercepto], sort_keys=True
+        )
+        return hashlib.sha256(contenido.encode()).hexdigest()
+
+    def predecir(self, df: pd.DataFrame, tamano_bloque: int = TAMANO_BLOQUE) -> np.ndarray:
+        """Importe estimado por fila; ``NaN`` donde falta una variable numérica."""
+        resultado = np.empty(len(df))
+        for inicio in range(0, len(df), tamano_bloque):
+            bloque = df.iloc[inicio:inicio + tamano_bloque]
+            resultado[inicio:inicio + len(bloque)] = (
+                self.codificador.transformar(bloque) @ self.coeficientes + self.intercepto
+            )
+        return resultado
+
+    def a_dict(self) -> dict[str, Any]:
+        return {
+            "formato": VERSION_ARTEFACTO,
+            "version": self.version,
+            "creado": self.creado,
+            "huella": self.huella(),
+            "columnas": self.codificador.columnas,
+            "codificador": self.codificador.a_dict(),
+            "coeficientes": self.coeficientes.tolist(),
+            "intercepto": self.intercepto,
+            "metricas": self.metricas,
+            "filas_entrenamiento": self.filas_entrenamiento,
+            "entorno": self.entorno,
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: dict[str, Any]) -> "ArtefactoModelo":
+        if datos.get("formato") != VERSION_ARTEFACTO:
+            raise ValueError(f"Formato de artefacto no soportado: {datos.get('formato')}")
+        artefacto = cls(
+            codificador=CodificadorImporte.desde_dict(datos["codificador"]),
+            coeficientes=np.asarray(datos["coeficientes"], dtype=float),
+            intercepto=float(datos["intercepto"]),
+            metricas=datos.get("metricas", {}),
+            filas_entrenamiento=datos.get("filas_entrenamiento", 0),
+            version=datos["version"],
+            creado=datos.get("creado", ""),
+            entorno=datos.get("entorno", {}),
+        )
+        if artefacto.codificador.columnas != datos["columnas"] or len(artefacto.coeficientes) != len(datos["columnas"]):
+            raise ValueError("Las columnas del artefacto no coinciden con sus coeficientes")
+        return artefacto
+
+
+def _version(ruta: Path) -> int:
+    return int(ruta.stem[len(PREFIJO_ARTEFACTO):])
+
+
+def ultimo_artefacto(directorio: Path) -> Path | None:
+    """Ruta de la versión más alta guardada en ``directorio``."""
+    rutas = [
+        ruta for ruta in directorio.glob(f"{PREFIJO_ARTEFACTO}*.json")
+        if ruta.stem[len(PREFIJO_ARTEFACTO):].isdigit()
+    ]
+    return max(rutas, key=_version, default=None)
+
+
+def cargar_artefacto(ruta: Path) -> ArtefactoModelo:
+    """Lee un artefacto; si ``ruta`` es un directorio, su última versión."""
+    if ruta.is_dir():
+        ultimo = ultimo_artefacto(ruta)
+        if ultimo is None:
+            raise FileNotFoundError(f"No hay modelos guardados en {ruta}")
+        ruta = ultimo
+    return ArtefactoModelo.desde_dict(json.loads(ruta.read_text(encoding="utf-8")))
+
+
+def guardar_artefacto(artefacto: ArtefactoModelo, directorio: Path) -> tuple[Path, bool]:
+    """Guarda ``artefacto`` como una versión nueva si difiere de la última.
+
+    Returns:
+        La ruta del artefacto vigente y si se escribió una versión nueva.
+    """
+    ultimo = ultimo_artefacto(directorio)
+    if ultimo is not None:
+        previo = json.loads(ultimo.read_text(encoding="utf-8"))
+        if previo.get("huella") == artefacto.huella():
+            artefacto.version, artefacto.creado = previo["version"], previo.get("creado", "")
+            return ultimo, False
+    artefacto.version = 1 if ultimo is None else _version(ultimo) + 1
+    artefacto.creado = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    ruta = directorio / f"{PREFIJO_ARTEFACTO}{artefacto.version:04d}.json"
+    contenido = json.dumps(artefacto.a_dict(), indent=2, ensure_ascii=False)
+    escribir_atomico(ruta, lambda tmp: tmp.write_text(contenido, encoding="utf-8"))
+    return ruta, True
+
+
+class ServicioImporte:
+    """Predicción por lotes con un artefacto cargado una sola vez."""
+
+    def __init__(self, artefacto: ArtefactoModelo, tamano_bloque: int = TAMANO_BLOQUE) -> None:
+        self.artefacto = artefacto
+        self.tamano_bloque = tamano_bloque
+
+    @classmethod
+    def desde_ruta(cls, ruta: Path, tamano_bloque: int = TAMANO_BLOQUE) -> "ServicioImporte":
+        return cls(cargar_artefacto(ruta), tamano_bloque)
+
+    @staticmethod
+    def _normalizar(filas: pd.DataFrame | dict[str, Any]) -> pd.DataFrame:
+        df = filas if isinstance(filas, pd.DataFrame) else pd.DataFrame(filas)
+        return df.rename(columns=lambda c: str(c).strip().lower())
+
+    def predecir(self, filas: pd.DataFrame | dict[str, Any]) -> np.ndarray:
+        return self.artefacto.predecir(self._normalizar(filas), self.tamano_bloque)
+
+    def responder(self, lineas: list[str]) -> list[dict[str, Any]]:
+        """Resuelve un lote de pedidos JSON con una sola predicción.
+
+        Un pedido inválido recibe ``error`` sin afectar al resto del lote. Si
+        alguna fila trae una categoría desconocida, la respuesta agrega
+        ``categoria_desconocida`` (un booleano, o una lista si el pedido
+        traía listas).
+        """
+        respuestas: list[dict[str, Any]] = [{} for _ in lineas]
+        pedidos: list[tuple[int, pd.DataFrame, bool]] = []
+        for i, linea in enumerate(lineas):
+            try:
+                pedido = json.loads(linea)
+                if not isinstance(pedido, dict):
+                    raise ValueError("el pedido debe ser un objeto JSON")
+                if "id" in pedido:
+                    respuestas[i]["id"] = pedido.pop("id")
+                escalar = not any(isinstance(v, list) for v in pedido.values())
+                faltantes = self.artefacto.codificador.faltantes(str(k).strip().lower() for k in pedido)
+                if faltantes:
+                    raise ValueError(f"Faltan campos: {', '.join(faltantes)}")
+                pedidos.append((i, pd.DataFrame([pedido] if escalar else pedido), escalar))
+            except ValueError as error:
+                respuestas[i]["error"] = str(error)
+
+        if pedidos:
+            lote = self._normalizar(pd.concat([df for _, df, _ in pedidos], ignore_index=True))
+            importes = self.artefacto.predecir(lote, self.tamano_bloque)
+            desconocidas = self.artefacto.codificador.categorias_desconocidas(lote)
+            inicio = 0
+            for i, df, escalar in pedidos:
+                fin = inicio + len(df)
+                valores = [None if np.isnan(v) else float(v) for v in importes[inicio:fin]]
+                respuestas[i]["importe"] = valores[0] if escalar else valores
+                if desconocidas[inicio:fin].any():
+                    marcas = desconocidas[inicio:fin].tolist()
+                    respuestas[i]["categoria_desconocida"] = marcas[0] if escalar else marcas
+                inicio = fin
+        return respuestas
+
+
+def servir(
+    servicio: ServicioImporte,
+    entrada: TextIO = sys.stdin,
+    salida: TextIO = sys.stdout,
+    lote_max: int = 1024,
+    espera: float = 0.005,
+) -> int:
+    """Atiende pedidos JSON por línea hasta el fin de ``entrada``.
+
+    Un hilo lee las líneas; el principal junta las que llegan hasta
+    ``espera`` segundos después de la primera (o ``lote_max``) y las predice
+    juntas. Devuelve la cantidad de pedidos atendidos.
+    """
+    cola: queue.Queue[str | None] = queue.Queue()
+
+    def leer() -> None:
+        for linea in entrada:
+            if linea.strip():
+                cola.put(linea)
+        cola.put(None)
+
+    threading.Thread(target=leer, daemon=True).start()
+    atendidos = 0
+    terminado = False
+    while not terminado:
+        primera = cola.get()
+        if primera is None:
+            break
+        lote = [primera]
+        limite = time.monotonic() + espera
+        while len(lote) < lote_max:
+            try:
+                siguiente = cola.get(timeout=max(limite - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if siguiente is None:
+                terminado = True
+                break
+            lote.append(siguiente)
+        for respuesta in servicio.responder(lote):
+            salida.write(json.dumps(respuesta, ensure_ascii=False) + "\n")
+        salida.flush()
+        atendidos += len(lote)
+    return atendidos
+
+
+def filas_sinteticas(artefacto: ArtefactoModelo, filas: int, semilla: int = 42) -> pd.DataFrame:
+    """Líneas de detalle con los rangos de :mod:`aurelion_benchmark`."""
+    from aurelion_benchmark import CANTIDAD_MAXIMA, PRECIO_MAXIMO, PRECIO_MINIMO
+
+    rng = np.random.default_rng(semilla)
+    categorias = np.array(artefacto.codificador.categorias or ["(sin dato)"], dtype=object)
+    return pd.DataFrame({
+        "cantidad": rng.integers(1, CANTIDAD_MAXIMA + 1, filas),
+        "precio_unitario": rng.integers(PRECIO_MINIMO, PRECIO_MAXIMO + 1, filas),
+        "categoria": categorias[rng.integers(0, len(categorias), filas)],
+    })
+
+
+def medir_servicio(
+    servicio: ServicioImporte,
+    filas: int,
+    tamanos_lote: Iterable[int],
+    max_pedidos: int = 2_000,
+    semilla: int = 42,
+) -> pd.DataFrame:
+    """Latencia por lote y filas por segundo para cada tamaño de lote.
+
+    Cada tamaño usa a lo sumo ``max_pedidos`` lotes para que los lotes de
+    una fila no dominen el tiempo total. La fila ``stdio`` mide el protocolo
+    de :func:`servir` completo, con pedidos de una fila en JSON.
+    """
+    datos = filas_sinteticas(servicio.artefacto, filas, semilla)
+    registros = []
+    for tamano in tamanos_lote:
+        tamano = min(tamano, filas)
+        lotes = [datos.iloc[i:i + tamano] for i in range(0, min(filas, tamano * max_pedidos), tamano)]
+        latencias = np.empty(len(lotes))
+        for k, lote in enumerate(lotes):
+            inicio = time.perf_counter()
+            servicio.predecir(lote)
+            latencias[k] = time.perf_counter() - inicio
+        registros.append(_medicion(f"api_{tamano}", tamano, sum(len(l) for l in lotes), latencias))
+
+    import io
+
+    pedidos = min(filas, max_pedidos * 10)
+    lineas = "".join(
+        json.dumps({"id": i, **fila}) + "\n"
+        for i, fila in enumerate(datos.iloc[:pedidos].astype(object).to_dict("records"))
+    )
+    inicio = time.perf_counter()
+    servir(servicio, io.StringIO(lineas), io.StringIO())
+    # Sólo se conoce el tiempo total: la latencia informada es la media por pedido
+    promedio = (time.perf_counter() - inicio) / pedidos
+    registros.append(_medicion("stdio", 1, pedidos, np.full(pedidos, promedio)))
+    return pd.DataFrame(registros).set_index("modo")
+
+
+def _medicion(modo: str, tamano: int, filas: int, latencias: np.ndarray) -> dict[str, Any]:
+    return {
+        "modo": modo,
+        "tamano_lote": tamano,
+        "filas": filas,
+        "filas_por_segundo": filas / latencias.sum() if latencias.sum() else float("inf"),
+        "latencia_p50_ms": float(np.percentile(latencias, 50) * 1e3),
+        "latencia_p95_ms": float(np.percentile(latencias, 95) * 1e3),
+        "latencia_p99_ms": float(np.percentile(latencias, 99) * 1e3),
+    }
+
+
+def _leer_tabla(ruta: Path) -> pd.DataFrame:
+    return pd.read_excel(ruta) if ruta.suffix.lower() == ".xlsx" else pd.read_csv(ruta)
+
+
+def main(args: argparse.Namespace) -> int:
+    ruta_modelo = args.modelo or Path(__file__).resolve().parent / MODELOS_DIR_NOMBRE
+    try:
+        servicio = ServicioImporte.desde_ruta(ruta_modelo)
+    except FileNotFoundError:
+        print(f"No hay modelos en {ruta_modelo}; ejecutar proyecto_Aurelion.py primero.", file=sys.stderr)
+        return 1
+    artefacto = servicio.artefacto
+
+    if args.comando == "predecir":
+        df = _leer_tabla(args.entrada)
+        inicio = time.perf_counter()
+        df["importe_estimado"] = servicio.predecir(df)
+        segundos = time.perf_counter() - inicio
+        df.to_csv(args.salida, index=False)
+        print(
+            f"Modelo v{artefacto.version}: {len(df):,} filas en {segundos:.3f} s; "
+            f"predicciones en {args.salida}",
+            file=sys.stderr,
+        )
+    elif args.comando == "servir":
+        servir(servicio, lote_max=args.lote_max, espera=args.espera_ms / 1000)
+    else:
+        resultado = medir_servicio(servicio, args.filas, args.tamanos_lote, semilla=args.semilla)
+        print(f"=== Servicio del modelo v{artefacto.version} ({args.filas:,} filas) ===")
+        print(resultado.to_string(float_format=lambda x: f"{x:,.3f}"))
+        if args.guardar is not None:
+            from aurelion_instrumentacion import entorno
+
+            documento = {
+                "version_modelo": artefacto.version,
+                "entorno": entorno(),
+                "resultados": resultado.reset_index().to_dict("records"),
+            }
+            args.guardar.write_text(json.dumps(documento, indent=2, ensure_ascii=False), encoding="utf-8")
+            print(f"Resultados guardados en {args.guardar}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--modelo",
+        type=Path,
+        default=None,
+        help=f"Artefacto o carpeta de modelos (por defecto {MODELOS_DIR_NOMBRE}/ junto al script).",
+    )
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    predecir = comandos.add_parser("predecir", help="Predice el importe de un CSV o Excel de detalle.")
+    predecir.add_argument("--entrada", type=Path, required=True, help="Líneas de detalle a predecir.")
+    predecir.add_argument(
+        "--salida", type=Path, default=Path("predicciones_importe.csv"), help="CSV con importe_estimado."
+    )
+    servir_cmd = comandos.add_parser("servir", help="Atiende pedidos JSON por línea en stdin/stdout.")
+    servir_cmd.add_argument("--lote-max", type=int, default=1024, help="Pedidos máximos por lote.")
+    servir_cmd.add_argument(
+        "--espera-ms", type=float, default=5.0, help="Espera para juntar pedidos tras el primero de un lote."
+    )
+    bench = comandos.add_parser("benchmark", help="Mide latencia y rendimiento sobre datos sintéticos.")
+    bench.add_argument("--filas", type=int, default=1_000_000, help="Filas sintéticas a predecir.")
+    bench.add_argument(
+        "--tamanos-lote",
+        type=int,
+        nargs="+",
+        default=[1, 64, 4_096, TAMANO_BLOQUE, 1_000_000],
+        help="Filas por lote a medir.",
+    )
+    bench.add_argument("--semilla", type=int, default=42, help="Semilla de los datos sintéticos.")
+    bench.add_argument("--guardar", type=Path, default=None, help="Archivo JSON de resultados.")
+    raise SystemExit(main(parser.parse_args()))
@@ -0,0 +1,172 @@
+"""
+Resultados del análisis de Tienda Aurelion en un solo JSON para consultas rápidas.
+
+``proyecto_Aurelion.main`` guarda al terminar, en
+``<salida>/.cache_aurelion/resultados_asistente.json``, el resumen general, el
+importe por categoría, las métricas y coeficientes del último modelo y las
+rutas de los gráficos. El asistente de documentación lo lee sin importar
+pandas ni re-ejecutar el análisis.
+
+Junto con los datos se registra la firma (bytes, mtime y hash) de cada
+archivo del que salieron. :func:`cargar_resultados` compara esas firmas con
+el disco: si sólo cambió el mtime pero el hash coincide, el JSON sigue
+vigente; si cambió el contenido, o apareció un modelo nuevo, se reconstruye
+leyendo esos mismos archivos (unos pocos KB), nunca los Excel.
+
+Este módulo usa sólo la biblioteca estándar a propósito.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+CACHE_DIR_NOMBRE = ".cache_aurelion"  # el de aurelion_cache, que importa pandas
+RESULTADOS_NOMBRE = "resultados_asistente.json"
+VERSION_RESULTADOS = 1
+
+RESUMEN_NOMBRE = "resumen_general.csv"
+CATEGORIAS_NOMBRE = "importe_por_categoria.csv"
+GRAFICOS = ("distribucion_ticket.png", "ventas_por_medio_pago.png", "correlaciones.png")
+# Mismos nombres que aurelion_prediccion.MODELOS_DIR_NOMBRE y PREFIJO_ARTEFACTO
+PATRON_MODELO = "modelos/modelo_importe_v*.json"
+
+
+def ruta_resultados(salida: Path) -> Path:
+    return salida / CACHE_DIR_NOMBRE / RESULTADOS_NOMBRE
+
+
+def _hash_archivo(ruta: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def firma_archivo(ruta: Path) -> dict[str, Any]:
+    estado = ruta.stat()
+    return {"bytes": estado.st_size, "mtime_ns": estado.st_mtime_ns, "hash": _hash_archivo(ruta)}
+
+
+def fuentes(salida: Path) -> list[str]:
+    """Archivos de ``salida`` (relativos) de los que se arman los resultados.
+
+    Del modelo sólo cuenta la versión más reciente.
+    """
+    relativas = [nombre for nombre in (RESUMEN_NOMBRE, CATEGORIAS_NOMBRE) if (salida / nombre).exists()]
+    modelos = sorted(salida.glob(PATRON_MODELO))
+    if modelos:
+        relativas.append(modelos[-1].relative_to(salida).as_posix())
+    relativas.extend(nombre for nombre in GRAFICOS if (salida / nombre).exists())
+    return relativas
+
+
+def _leer_serie(ruta: Path) -> dict[str, float]:
+    """Lee un CSV de dos columnas (índice, valor) como el que escribe ``Series.to_csv``."""
+    with open(ruta, newline="", encoding="utf-8") as archivo:
+        filas = list(csv.reader(archivo))
+    return {fila[0]: float(fila[1]) for fila in filas[1:] if len(fila) >= 2 and fila[1] != ""}
+
+
+def _leer_modelo(ruta: Path) -> dict[str, Any]:
+    datos = json.loads(ruta.read_text(encoding="utf-8"))
+    return {
+        "version": datos["version"],
+        "creado": datos.get("creado"),
+        "metricas": datos.get("metricas", {}),
+        "filas_entrenamiento": datos.get("filas_entrenamiento"),
+        "coeficientes": dict(zip(datos["columnas"], datos["coeficientes"])),
+        "intercepto": datos["intercepto"],
+    }
+
+
+def construir_resultados(salida: Path) -> dict[str, Any]:
+    """Arma los resultados a partir de los archivos que dejó el análisis en ``salida``."""
+    relativas = fuentes(salida)
+    resultados: dict[str, Any] = {
+        "version": VERSION_RESULTADOS,
+        "generado": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "fuentes": {relativa: firma_archivo(salida / relativa) for relativa in relativas},
+        "resumen_general": None,
+        "importe_por_categoria": None,
+        "modelo": None,
+        "graficos": [nombre for nombre in GRAFICOS if nombre in relativas],
+    }
+    for relativa in relativas:
+        ruta = salida / relativa
+        if relativa == RESUMEN_NOMBRE:
+            resultados["resumen_general"] = _leer_serie(ruta)
+        elif relativa == CATEGORIAS_NOMBRE:
+            resultados["importe_por_categoria"] = _leer_serie(ruta)
+        elif relativa.endswith(".json"):
+            resultados["modelo"] = _leer_modelo(ruta)
+    return resultados
+
+
+def guardar_resultados(salida: Path, resultados: dict[str, Any] | None = None) -> Path:
+    """Escribe los resultados de ``salida`` (o ``resultados``, si se pasan) en la caché."""
+    resultados = construir_resultados(salida) if resultados is None else resultados
+    ruta = ruta_resultados(salida)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    tmp.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, ruta)
+    return ruta
+
+
+def _vigentes(salida: Path, resultados: dict[str, Any]) -> tuple[bool, bool]:
+    """(vigentes, hay que reescribir las firmas) comparando con el disco."""
+    registradas = resultados.get("fuentes", {})
+    if sorted(registradas) != sorted(fuentes(salida)):
+        return False, False
+    retocadas = False
+    for relativa, firma in registradas.items():
+        try:
+            estado = (salida / relativa).stat()
+        except OSError:
+            return False, False
+        if estado.st_size != firma["bytes"]:
+            return False, False
+        if estado.st_mtime_ns != firma["mtime_ns"]:
+            # Reescrito: sigue vigente si el contenido es el mismo
+            if _hash_archivo(salida / relativa) != firma["hash"]:
+                return False, False
+            firma["mtime_ns"] = estado.st_mtime_ns
+            retocadas = True
+    return True, retocadas
+
+
+def cargar_resultados(salida: Path) -> dict[str, Any] | None:
+    """Resultados vigentes de ``salida``; ``None`` si el análisis nunca corrió ahí.
+
+    Si el JSON falta o quedó viejo se reconstruye desde los archivos de
+    ``salida`` y se guarda de nuevo.
+    """
+    try:
+        resultados = json.loads(ruta_resultados(salida).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        resultados = None
+    if resultados is not None and resultados.get("version") == VERSION_RESULTADOS:
+        vigentes, retocadas = _vigentes(salida, resultados)
+        if vigentes:
+            if retocadas:
+                _guardar_si_se_puede(salida, resultados)
+            return resultados
+    if not fuentes(salida):
+        return None
+    resultados = construir_resultados(salida)
+    _guardar_si_se_puede(salida, resultados)
+    return resultados
+
+
+def _guardar_si_se_puede(salida: Path, resultados: dict[str, Any]) -> None:
+    try:
+        guardar_resultados(salida, resultados)
+    except OSError:
+        pass  # Carpeta de sólo lectura: los resultados se usan igual, sin cachear
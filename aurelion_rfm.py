@@ -0,0 +1,329 @@
+"""
+Segmentación RFM de clientes de Tienda Aurelion.
+
+Por cliente se calcula, en un único ``groupby``, la última compra (de
+``fecha``), la frecuencia (ventas distintas) y el monto (suma de
+``importe``). Cada medida recibe un puntaje de 1 a 5 según los quintiles
+de la población y el par recencia/frecuencia define el segmento
+(:data:`SEGMENTOS`). Opcionalmente se agrupa a los clientes con k-means
+sobre las tres medidas estandarizadas (en escala logarítmica para frecuencia
+y monto).
+
+Los cortes de los quintiles se guardan sobre la fecha de la última compra y
+no sobre los días transcurridos, de modo que el paso del tiempo no cambia
+los puntajes. Así, al llegar ventas nuevas (``id_venta`` mayor a la marca de
+agua guardada) sólo se actualizan y vuelven a puntuar los clientes que
+compraron; los cortes y los centros de k-means se recalculan con
+``recalibrar=True``, al reiniciar o al pedir otra cantidad de clusters. Como
+en :mod:`aurelion_incremental`, se asume que las ventas llegan con
+``id_venta`` creciente.
+
+Uso:
+    python aurelion_rfm.py [--reiniciar] [--recalibrar] [--kmeans 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from aurelion_cache import CACHE_DIR_NOMBRE
+from aurelion_estrella import EsquemaEstrella
+
+RFM_NOMBRE = "rfm_clientes.npz"
+MEDIDAS = ("ultima_compra", "frecuencia", "monetario")
+CUANTILES = (0.2, 0.4, 0.6, 0.8)
+# Clientes con los que se ajusta k-means; el resto se asigna al centro más cercano
+MUESTRA_KMEANS = 100_000
+# Segmento -> condición sobre los puntajes de recencia (r) y frecuencia (f);
+# se asigna la primera que se cumple.
+SEGMENTOS = {
+    "Campeones": lambda r, f: (r >= 4) & (f >= 4),
+    "No se pueden perder": lambda r, f: (r <= 1) & (f >= 4),
+    "En riesgo": lambda r, f: (r <= 2) & (f >= 3),
+    "Leales": lambda r, f: f >= 4,
+    "Potenciales leales": lambda r, f: (r >= 4) & (f >= 2),
+    "Nuevos": lambda r, f: r >= 4,
+    "Necesitan atención": lambda r, f: (r == 3) & (f >= 2),
+    "Prometedores": lambda r, f: r == 3,
+    "Hibernando": lambda r, f: r == 2,
+    "Perdidos": lambda r, f: r <= 1,
+}
+
+
+def agregar_clientes(ventas: pd.DataFrame) -> pd.DataFrame:
+    """Última compra, frecuencia y monto por ``id_cliente``.
+
+    ``ventas`` puede ser ``ventas_analitica`` (una fila por línea) o una
+    tabla con una fila por venta; ambas necesitan ``id_cliente``,
+    ``id_venta``, ``fecha`` e ``importe``.
+    """
+    return ventas.groupby("id_cliente", observed=True, sort=False).agg(
+        ultima_compra=("fecha", "max"),
+        frecuencia=("id_venta", "nunique"),
+        monetario=("importe", "sum"),
+    )
+
+
+def ventas_por_cliente(estrella: EsquemaEstrella, desde_id_venta: float | None = None) -> pd.DataFrame:
+    """Una fila por venta con su importe total, sin armar ``ventas_analitica``."""
+    ventas = estrella.ventas.tabla
+    importe = estrella.hechos["importe"].to_numpy(dtype=float, na_value=0.0)
+    por_venta = pd.DataFrame({
+        "id_venta": ventas["id_venta"].to_numpy(),
+        "id_cliente": ventas["id_cliente"].to_numpy(),
+        "fecha": ventas["fecha"].to_numpy(),
+        "importe": np.bincount(estrella.pos_venta, weights=importe, minlength=len(ventas)),
+    })
+    if desde_id_venta is not None:
+        por_venta = por_venta[por_venta["id_venta"] > desde_id_venta]
+    return por_venta
+
+
+def _puntaje(valores: np.ndarray, cortes: np.ndarray) -> np.ndarray:
+    """Quintil de 1 a 5; un valor faltante puntúa 1."""
+    puntaje = 1 + np.searchsorted(cortes, valores, side="right")
+    return np.where(np.isnan(valores), 1, puntaje).astype(np.int8)
+
+
+def _dias(fechas: pd.Series | np.ndarray) -> np.ndarray:
+    """Días desde 1970 como flotante; ``NaN`` para fechas faltantes."""
+    return pd.to_datetime(np.asarray(fechas)).to_numpy(dtype="datetime64[D]").astype(float)
+
+
+@dataclass
+class SegmentacionRFM:
+    """Medidas, puntajes y segmentos por cliente, con lo necesario para actualizarlos.
+
+    ``clientes`` está indexada por ``id_cliente``. ``cortes`` guarda los
+    quintiles de cada medida (la última compra en días desde 1970) y
+    ``centros`` los de k-means en el espacio estandarizado de ``escala``.
+    """
+
+    clientes: pd.DataFrame
+    marca_agua: float = -np.inf
+    cortes: dict[str, np.ndarray] = field(default_factory=dict)
+    escala: np.ndarray | None = None
+    centros: np.ndarray | None = None
+
+    @classmethod
+    def desde_ventas(cls, ventas: pd.DataFrame, clusters: int = 0) -> "SegmentacionRFM":
+        """Segmenta desde ``ventas_analitica`` o una tabla por venta."""
+        segmentacion = cls(agregar_clientes(ventas), marca_agua=float(ventas["id_venta"].max()))
+        segmentacion.calibrar(clusters)
+        return segmentacion
+
+    def _matriz(self, clientes: pd.DataFrame) -> np.ndarray:
+        return np.column_stack([
+            _dias(clientes["ultima_compra"]),
+            clientes["frecuencia"].to_numpy(dtype=float),
+            clientes["monetario"].to_numpy(dtype=float),
+        ])
+
+    def calibrar(self, clusters: int = 0, semilla: int = 42) -> None:
+        """Recalcula los cortes (y k-means si ``clusters``) y vuelve a puntuar a todos."""
+        valores = self._matriz(self.clientes)
+        self.cortes = {
+            medida: np.nanquantile(valores[:, j], CUANTILES) if len(valores) else np.array([])
+            for j, medida in enumerate(MEDIDAS)
+        }
+        self.escala = self.centros = None
+        if clusters:
+            from sklearn.cluster import MiniBatchKMeans
+
+            log = self._log(valores)
+            self.escala = np.vstack([np.nanmean(log, axis=0), np.nanstd(log, axis=0)])
+            self.escala[1, self.escala[1] == 0] = 1.0
+            puntos = self._estandarizar(log)
+            if len(puntos) > MUESTRA_KMEANS:
+                puntos = puntos[np.random.default_rng(semilla).choice(len(puntos), MUESTRA_KMEANS, replace=False)]
+            modelo = MiniBatchKMeans(n_clusters=clusters, random_state=semilla, n_init=3)
+            self.centros = modelo.fit(puntos).cluster_centers_
+        self.clientes = self._puntuar(self.clientes)
+
+    @staticmethod
+    def _log(valores: np.ndarray) -> np.ndarray:
+        log = valores.copy()
+        log[:, 1:] = np.log1p(np.maximum(log[:, 1:], 0))
+        return log
+
+    def _estandarizar(self, log: np.ndarray) -> np.ndarray:
+        return np.nan_to_num((log - self.escala[0]) / self.escala[1])
+
+    def _puntuar(self, clientes: pd.DataFrame) -> pd.DataFrame:
+        """Puntajes, segmento y cluster de ``clientes`` con los cortes vigentes."""
+        valores = self._matriz(clientes)
+        r, f, m = (_puntaje(valores[:, j], self.cortes[medida]) for j, medida in enumerate(MEDIDAS))
+        condiciones = [condicion(r, f) for condicion in SEGMENTOS.values()]
+        clientes = clientes[list(MEDIDAS)].assign(
+            r=r,
+            f=f,
+            m=m,
+            rfm=r.astype(np.int16) * 100 + f * 10 + m,
+            segmento=pd.Categorical(
+                np.select(condiciones, list(SEGMENTOS), default="Perdidos"), categories=list(SEGMENTOS)
+            ),
+        )
+        if self.centros is not None:
+            puntos = self._estandarizar(self._log(valores))
+            distancias = ((puntos[:, None, :] - self.centros[None, :, :]) ** 2).sum(axis=2)
+            clientes["cluster"] = distancias.argmin(axis=1).astype(np.int16)
+        return clientes
+
+    def actualizar(self, ventas: pd.DataFrame) -> pd.Index:
+        """Incorpora ventas nuevas y vuelve a puntuar sólo a sus clientes.
+
+        Las ventas con ``id_venta`` menor o igual a la marca de agua se
+        ignoran. Devuelve los ``id_cliente`` actualizados.
+        """
+        ventas = ventas[ventas["id_venta"] > self.marca_agua]
+        if ventas.empty:
+            return pd.Index([], name="id_cliente")
+        nuevos = agregar_clientes(ventas)
+        posiciones = self.clientes.index.get_indexer(nuevos.index)
+        existentes = posiciones >= 0
+
+        previos = self.clientes.iloc[posiciones[existentes]]
+        combinados = pd.DataFrame(
+            {
+                "ultima_compra": np.fmax(
+                    previos["ultima_compra"].to_numpy(), nuevos["ultima_compra"].to_numpy()[existentes]
+                ),
+                "frecuencia": previos["frecuencia"].to_numpy() + nuevos["frecuencia"].to_numpy()[existentes],
+                "monetario": previos["monetario"].to_numpy() + nuevos["monetario"].to_numpy()[existentes],
+            },
+            index=previos.index,
+        )
+        afectados = pd.concat([combinados, nuevos[~existentes]])
+        puntuados = self._puntuar(afectados)
+        self.clientes = pd.concat([self.clientes.drop(index=previos.index), puntuados])
+        self.marca_agua = float(ventas["id_venta"].max())
+        return puntuados.index
+
+    def tabla(self, fecha_referencia: pd.Timestamp | None = None) -> pd.DataFrame:
+        """``clientes`` con ``recencia_dias`` respecto de ``fecha_referencia``.
+
+        Por defecto la referencia es el día siguiente a la última compra registrada.
+        """
+        ultima = self.clientes["ultima_compra"]
+        if fecha_referencia is None:
+            fecha_referencia = ultima.max() + pd.Timedelta(days=1)
+        recencia = (pd.Timestamp(fecha_referencia) - ultima).dt.days
+        return self.clientes.assign(recencia_dias=recencia).sort_index()
+
+    def resumen(self) -> pd.DataFrame:
+        """Clientes, monto y medias por segmento."""
+        return self.tabla().groupby("segmento", observed=True).agg(
+            clientes=("frecuencia", "size"),
+            recencia_media=("recencia_dias", "mean"),
+            frecuencia_media=("frecuencia", "mean"),
+            monetario_total=("monetario", "sum"),
+        ).sort_values("monetario_total", ascending=False)
+
+    def a_estado(self) -> dict[str, np.ndarray]:
+        estado = {
+            "id_cliente": self.clientes.index.to_numpy(),
+            "ultima_compra": self.clientes["ultima_compra"].to_numpy(dtype="datetime64[ns]"),
+            "frecuencia": self.clientes["frecuencia"].to_numpy(dtype=np.int64),
+            "monetario": self.clientes["monetario"].to_numpy(dtype=float),
+            "marca_agua": np.array(self.marca_agua),
+            **{f"cortes__{medida}": cortes for medida, cortes in self.cortes.items()},
+        }
+        if self.centros is not None:
+            estado.update(escala=self.escala, centros=self.centros)
+        return estado
+
+    @classmethod
+    def desde_estado(cls, estado: dict[str, np.ndarray]) -> "SegmentacionRFM":
+        clientes = pd.DataFrame(
+            {medida: estado[medida] for medida in MEDIDAS},
+            index=pd.Index(estado["id_cliente"], name="id_cliente"),
+        )
+        segmentacion = cls(
+            clientes,
+            marca_agua=float(estado["marca_agua"]),
+            cortes={medida: estado[f"cortes__{medida}"] for medida in MEDIDAS},
+            escala=estado.get("escala"),
+            centros=estado.get("centros"),
+        )
+        segmentacion.clientes = segmentacion._puntuar(clientes)
+        return segmentacion
+
+
+def cargar_rfm(ruta: Path) -> SegmentacionRFM | None:
+    if not ruta.exists():
+        return None
+    with np.load(ruta, allow_pickle=False) as archivo:
+        return SegmentacionRFM.desde_estado({clave: archivo[clave] for clave in archivo.files})
+
+
+def guardar_rfm(segmentacion: SegmentacionRFM, ruta: Path) -> None:
+    """Escribe la segmentación de forma atómica (archivo temporal y ``os.replace``)."""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    with open(tmp, "wb") as archivo:
+        np.savez(archivo, **segmentacion.a_estado())
+    os.replace(tmp, ruta)
+
+
+def actualizar_rfm(
+    estrella: EsquemaEstrella,
+    ruta: Path,
+    reiniciar: bool = False,
+    recalibrar: bool = False,
+    clusters: int = 0,
+) -> tuple[SegmentacionRFM, int]:
+    """Agrega a la segmentación guardada las ventas nuevas de ``estrella`` y la persiste.
+
+    ``clusters`` es la cantidad de clusters de k-means buscada (0 sin
+    k-means). Si difiere de la guardada, la segmentación se recalibra como
+    con ``recalibrar``.
+
+    Returns:
+        La segmentación y la cantidad de clientes actualizados; todos si se
+        recalibró, porque se vuelve a puntuar a cada cliente.
+    """
+    previo = None if reiniciar else cargar_rfm(ruta)
+    if previo is None:
+        segmentacion = SegmentacionRFM.desde_ventas(ventas_por_cliente(estrella), clusters)
+        actualizados = len(segmentacion.clientes)
+    else:
+        segmentacion = previo
+        actualizados = len(segmentacion.actualizar(ventas_por_cliente(estrella, previo.marca_agua)))
+        guardados = 0 if segmentacion.centros is None else len(segmentacion.centros)
+        if recalibrar or clusters != guardados:
+            segmentacion.calibrar(clusters)
+            actualizados = len(segmentacion.clientes)
+    guardar_rfm(segmentacion, ruta)
+    return segmentacion, actualizados
+
+
+def main(reiniciar: bool, recalibrar: bool, clusters: int) -> int:
+    from proyecto_Aurelion import cargar_datos, limpiar_datos
+
+    base_dir = Path(__file__).resolve().parent
+    cache_dir = base_dir / CACHE_DIR_NOMBRE
+    data, _ = cargar_datos(base_dir, cache_dir=cache_dir)
+    estrella = EsquemaEstrella.desde_tablas(limpiar_datos(data))
+    segmentacion, actualizados = actualizar_rfm(
+        estrella, cache_dir / RFM_NOMBRE, reiniciar=reiniciar, recalibrar=recalibrar, clusters=clusters
+    )
+    print(f"Clientes actualizados: {actualizados:,} de {len(segmentacion.clientes):,}")
+    print(segmentacion.resumen().to_string(float_format=lambda x: f"{x:,.1f}"))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reiniciar", action="store_true", help="Descarta la segmentación guardada.")
+    parser.add_argument(
+        "--recalibrar", action="store_true", help="Recalcula los quintiles y vuelve a puntuar a todos."
+    )
+    parser.add_argument("--kmeans", type=int, default=0, help="Clusters de k-means (0 para omitirlo).")
+    args = parser.parse_args()
+    raise SystemExit(main(args.reiniciar, args.recalibrar, args.kmeans))
@@ -0,0 +1,342 @@
+"""
+Estadísticas descriptivas de Tienda Aurelion calculadas por bloques.
+
+Detalle_ventas se recorre en bloques de tamaño fijo y cada bloque se limpia y
+enriquece contra las tablas de búsqueda de Ventas y Productos, que sí se
+mantienen en memoria. Los importes se acumulan por venta y por categoría, de
+modo que nunca se construye ``ventas_analitica`` completa y el pico de memoria
+depende del tamaño de bloque y no del historial.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from aurelion_agregacion import componer_estadisticas
+from aurelion_aproximado import HyperLogLog
+from aurelion_cache import cache_valida, iterar_cache
+from proyecto_Aurelion import (
+    cargar_tabla,
+    catalogo_productos,
+    enriquecer_detalle,
+    limpiar_detalle,
+    limpiar_productos,
+    limpiar_ventas,
+)
+
+
+def _convertir_celda(valor: object) -> object:
+    # Mismo criterio que pd.read_excel: los flotantes enteros se leen como int.
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def iterar_excel(ruta: Path, tamano_bloque: int, desde: int = 0) -> Iterator[pd.DataFrame]:
+    """Lee la primera hoja de un Excel en bloques usando openpyxl en modo lectura.
+
+    Las primeras ``desde`` filas de datos se saltean sin convertirlas, pero
+    openpyxl igual tiene que recorrer su XML: un .xlsx no permite saltar
+    directo a una fila.
+    """
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+        lote: list[tuple] = []
+        for fila in filas:
+            if all(valor is None for valor in fila):
+                continue
+            if desde:
+                desde -= 1
+                continue
+            lote.append(tuple(_convertir_celda(valor) for valor in fila))
+            if len(lote) == tamano_bloque:
+                yield pd.DataFrame(lote, columns=encabezado)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=encabezado)
+    finally:
+        libro.close()
+
+
+def iterar_detalle(
+    ruta: Path, tamano_bloque: int, cache_dir: Path | None = None, desde: int = 0
+) -> Iterator[pd.DataFrame]:
+    """Recorre Detalle_ventas por bloques desde la fuente más rápida disponible.
+
+    Prioriza la caché columnar vigente (lectura con mmap), luego un CSV y por
+    último el Excel. Con ``desde`` empieza en esa fila de datos: la caché va
+    directo a ella, el CSV y el Excel la alcanzan sin armar las anteriores.
+    """
+    if cache_dir is not None and cache_valida(ruta, cache_dir / ruta.stem):
+        yield from iterar_cache(cache_dir / ruta.stem, tamano_bloque, desde)
+    elif ruta.suffix.lower() == ".csv":
+        yield from pd.read_csv(ruta, chunksize=tamano_bloque, skiprows=range(1, desde + 1))
+    else:
+        yield from iterar_excel(ruta, tamano_bloque, desde)
+
+
+class AcumuladorVentas:
+    """Agregados parciales de importe por venta y por categoría.
+
+    Las ventas y categorías se indexan una sola vez a partir de las tablas de
+    búsqueda, por lo que cada bloque se suma con ``np.bincount`` sobre
+    posiciones enteras en lugar de un ``groupby``.
+
+    Args:
+        Ventas: Ventas ya limpias; se asume una fila por ``id_venta``.
+        catalogo: Una fila por producto, con su ``categoria``.
+        deduplicar: Descarta líneas de detalle idénticas dentro de cada
+            venta, aunque la venta quede partida entre dos bloques. Como las
+            líneas de una venta llegan juntas, sólo se guardan los hashes de
+            la última venta del bloque y la memoria sigue acotada por el
+            bloque. A diferencia de ``drop_duplicates`` sobre la tabla
+            completa, no detecta una línea repetida que reaparece después de
+            otras ventas.
+        precision_productos: Si se indica, los productos distintos se
+            cuentan con un :class:`~aurelion_aproximado.HyperLogLog` de esa
+            precisión en lugar de un ``set``.
+    """
+
+    def __init__(
+        self,
+        Ventas: pd.DataFrame,
+        catalogo: pd.DataFrame,
+        deduplicar: bool = True,
+        precision_productos: int | None = None,
+    ) -> None:
+        Ventas = Ventas.drop_duplicates(subset=["id_venta"])
+        self.catalogo = catalogo
+        self.ids_venta = pd.Index(Ventas["id_venta"], name="id_venta")
+        self.cliente_por_venta = Ventas["id_cliente"].to_numpy()
+        self.importe_por_venta = np.zeros(len(self.ids_venta))
+        self.lineas_por_venta = np.zeros(len(self.ids_venta), dtype=np.int64)
+
+        if "categoria" in catalogo.columns:
+            categorias = catalogo["categoria"].dropna().unique()
+            self.categorias = pd.Index(np.asarray(categorias, dtype=object), name="categoria")
+        else:
+            self.categorias = None
+        n_categorias = 0 if self.categorias is None else len(self.categorias)
+        self.importe_por_categoria = np.zeros(n_categorias)
+        self.lineas_por_categoria = np.zeros(n_categorias, dtype=np.int64)
+
+        self.productos: set | HyperLogLog = set() if precision_productos is None else HyperLogLog(precision_productos)
+        self.importe_entero = True
+        self.deduplicar = deduplicar
+        # Venta con la que terminó el último bloque y los hashes de sus líneas
+        self._venta_abierta: object = None
+        self._hashes_abiertos = np.empty(0, dtype=np.uint64)
+
+    def _descartar_repetidos(self, bloque: pd.DataFrame) -> pd.DataFrame:
+        # Los numéricos se pasan a float para que el hash no dependa del
+        # dtype que pandas infirió en cada bloque.
+        canonico = bloque.apply(
+            lambda col: col.astype(float) if pd.api.types.is_numeric_dtype(col) else col
+        )
+        hashes = pd.util.hash_pandas_object(canonico, index=False).to_numpy()
+        nuevos = ~pd.Series(hashes).duplicated().to_numpy()
+        # El hash incluye id_venta: sólo pueden coincidir líneas de la venta abierta
+        nuevos &= ~np.isin(hashes, self._hashes_abiertos)
+        if len(bloque):
+            ids = bloque["id_venta"].to_numpy()
+            ultima = ids[-1]
+            previos = self._hashes_abiertos if ultima == self._venta_abierta else np.empty(0, dtype=np.uint64)
+            self._hashes_abiertos = np.union1d(previos, hashes[ids == ultima])
+            self._venta_abierta = ultima
+        return bloque[nuevos]
+
+    def agregar(self, bloque: pd.DataFrame) -> None:
+        """Limpia, enriquece y suma un bloque crudo de Detalle_ventas."""
+        bloque = limpiar_detalle(bloque, deduplicar=False)
+        if self.deduplicar:
+            bloque = self._descartar_repetidos(bloque)
+        bloque = enriquecer_detalle(bloque, self.catalogo)
+
+        posiciones = self.ids_venta.get_indexer(bloque["id_venta"])
+        en_ventas = posiciones >= 0
+        bloque = bloque[en_ventas]
+        posiciones = posiciones[en_ventas]
+        if bloque.empty:
+            return
+
+        if not pd.api.types.is_integer_dtype(bloque["importe"]):
+            self.importe_entero = False
+        importe = bloque["importe"].to_numpy(dtype=float)
+        n_ventas = len(self.ids_venta)
+        self.importe_por_venta += np.bincount(posiciones, weights=importe, minlength=n_ventas)
+        self.lineas_por_venta += np.bincount(posiciones, minlength=n_ventas)
+        self.productos.update(bloque["id_producto"].unique().tolist())
+
+        if self.categorias is not None:
+            codigos = self.categorias.get_indexer(bloque["categoria"])
+            validos = codigos >= 0
+            n_categorias = len(self.categorias)
+            self.importe_por_categoria += np.bincount(
+                codigos[validos], weights=importe[validos], minlength=n_categorias
+            )
+            self.lineas_por_categoria += np.bincount(codigos[validos], minlength=n_categorias)
+
+    def combinar(self, otro: "AcumuladorVentas") -> None:
+        """Incorpora los agregados de ``otro``, que debe cubrir ventas distintas."""
+        if self.ids_venta.intersection(otro.ids_venta).size:
+            raise ValueError("Los acumuladores comparten id_venta y no se pueden combinar")
+
+        self.ids_venta = self.ids_venta.append(otro.ids_venta).rename("id_venta")
+        self.cliente_por_venta = np.concatenate([self.cliente_por_venta, otro.cliente_por_venta])
+        self.importe_por_venta = np.concatenate([self.importe_por_venta, otro.importe_por_venta])
+        self.lineas_por_venta = np.concatenate([self.lineas_por_venta, otro.lineas_por_venta])
+
+        if otro.categorias is not None:
+            propias = self.categorias if self.categorias is not None else pd.Index([], name="categoria")
+            categorias = propias.append(otro.categorias.difference(propias)).rename("categoria")
+            importe = np.zeros(len(categorias))
+            lineas = np.zeros(len(categorias), dtype=np.int64)
+            importe[: len(propias)] = self.importe_por_categoria
+            lineas[: len(propias)] = self.lineas_por_categoria
+            posiciones = categorias.get_indexer(otro.categorias)
+            np.add.at(importe, posiciones, otro.importe_por_categoria)
+            np.add.at(lineas, posiciones, otro.lineas_por_categoria)
+            self.categorias = categorias
+            self.importe_por_categoria = importe
+            self.lineas_por_categoria = lineas
+
+        self.productos |= otro.productos
+        self.importe_entero = self.importe_entero and otro.importe_entero
+
+    def a_estado(self) -> dict[str, np.ndarray]:
+        """Serializa los agregados como arreglos aptos para ``np.savez``."""
+        categorias = self.categorias if self.categorias is not None else pd.Index([])
+        if isinstance(self.productos, HyperLogLog):
+            productos = self.productos.a_estado("productos_hll")
+        else:
+            productos = {"productos": np.array(sorted(self.productos))}
+        return {
+            "ids_venta": self.ids_venta.to_numpy(),
+            "cliente_por_venta": self.cliente_por_venta,
+            "importe_por_venta": self.importe_por_venta,
+            "lineas_por_venta": self.lineas_por_venta,
+            "categorias": categorias.to_numpy().astype(str),
+            "tiene_categorias": np.array(self.categorias is not None),
+            "importe_por_categoria": self.importe_por_categoria,
+            "lineas_por_categoria": self.lineas_por_categoria,
+            **productos,
+            "importe_entero": np.array(self.importe_entero),
+        }
+
+    @classmethod
+    def desde_estado(
+        cls, estado: dict[str, np.ndarray], catalogo: pd.DataFrame
+    ) -> "AcumuladorVentas":
+        """Reconstruye un acumulador guardado con :meth:`a_estado`."""
+        Ventas = pd.DataFrame({
+            "id_venta": estado["ids_venta"],
+            "id_cliente": estado["cliente_por_venta"],
+        })
+        acumulador = cls(Ventas, catalogo, deduplicar=False)
+        acumulador.importe_por_venta = np.asarray(estado["importe_por_venta"], dtype=float)
+        acumulador.lineas_por_venta = np.asarray(estado["lineas_por_venta"], dtype=np.int64)
+        if bool(estado["tiene_categorias"]):
+            acumulador.categorias = pd.Index(estado["categorias"].astype(object), name="categoria")
+        else:
+            acumulador.categorias = None
+        acumulador.importe_por_categoria = np.asarray(estado["importe_por_categoria"], dtype=float)
+        acumulador.lineas_por_categoria = np.asarray(estado["lineas_por_categoria"], dtype=np.int64)
+        if "productos_hll_registros" in estado:
+            acumulador.productos = HyperLogLog.desde_estado(estado, "productos_hll")
+        else:
+            acumulador.productos = set(estado["productos"].tolist())
+        acumulador.importe_entero = bool(estado["importe_entero"])
+        return acumulador
+
+    def totales(self) -> tuple[pd.Series, pd.Series, pd.Series]:
+        """Importe por venta, por cliente y por categoría acumulados hasta ahora."""
+        # Igual que en el merge completo: una venta sin líneas aporta NaN y
+        # convierte la columna importe en flotante.
+        entero = self.importe_entero and bool((self.lineas_por_venta > 0).all())
+        dtype = np.int64 if entero else np.float64
+
+        ventas_totales = pd.Series(
+            self.importe_por_venta, index=self.ids_venta, name="importe"
+        ).sort_index().astype(dtype)
+        clientes = pd.Series(self.cliente_por_venta, index=self.ids_venta, name="id_cliente")
+        ticket_por_cliente = ventas_totales.groupby(clientes.reindex(ventas_totales.index)).sum()
+
+        if self.categorias is None:
+            ticket_por_categoria = pd.Series(dtype=float)
+        else:
+            observadas = self.lineas_por_categoria > 0
+            ticket_por_categoria = pd.Series(
+                self.importe_por_categoria[observadas],
+                index=self.categorias[observadas],
+                name="importe",
+            ).sort_index().astype(dtype)
+
+        return ventas_totales, ticket_por_cliente, ticket_por_categoria
+
+    def finalizar(self) -> dict[str, pd.Series]:
+        """Devuelve las mismas métricas que ``estadisticas_descriptivas``."""
+        ventas_totales, ticket_por_cliente, ticket_por_categoria = self.totales()
+        return componer_estadisticas(
+            ventas_totales,
+            ticket_por_cliente,
+            ticket_por_categoria,
+            productos_distintos=len(self.productos),
+            clientes_distintos=len(ticket_por_cliente),
+        )
+
+
+def acumular_por_bloques(
+    base_dir: Path,
+    tamano_bloque: int = 100_000,
+    cache_dir: Path | None = None,
+    ruta_detalle: Path | None = None,
+    deduplicar: bool = True,
+    precision_productos: int | None = None,
+) -> AcumuladorVentas:
+    """Recorre Detalle_ventas por bloques y devuelve el acumulador cargado.
+
+    Los argumentos son los de :func:`estadisticas_por_bloques` y
+    :class:`AcumuladorVentas`.
+    """
+    Ventas, _ = cargar_tabla(base_dir, "Ventas", cache_dir)
+    Productos, _ = cargar_tabla(base_dir, "Productos", cache_dir)
+    Ventas = limpiar_ventas(Ventas)
+    catalogo = catalogo_productos(limpiar_productos(Productos))
+
+    acumulador = AcumuladorVentas(Ventas, catalogo, deduplicar=deduplicar, precision_productos=precision_productos)
+    ruta = ruta_detalle or base_dir / "Detalle_ventas.xlsx"
+    for bloque in iterar_detalle(ruta, tamano_bloque, cache_dir):
+        acumulador.agregar(bloque)
+    return acumulador
+
+
+def estadisticas_por_bloques(
+    base_dir: Path,
+    tamano_bloque: int = 100_000,
+    cache_dir: Path | None = None,
+    ruta_detalle: Path | None = None,
+    deduplicar: bool = True,
+) -> dict[str, pd.Series]:
+    """Calcula las métricas descriptivas sin materializar ``ventas_analitica``.
+
+    Args:
+        base_dir: Carpeta con los Excel de Ventas, Productos y Detalle_ventas.
+        tamano_bloque: Filas de Detalle_ventas procesadas por bloque.
+        cache_dir: Carpeta de la caché columnar, si se usa.
+        ruta_detalle: Fuente alternativa de Detalle_ventas (``.xlsx`` o
+            ``.csv``). Por defecto ``base_dir / "Detalle_ventas.xlsx"``.
+        deduplicar: Ver :class:`AcumuladorVentas`.
+
+    Returns:
+        El mismo diccionario que devuelve ``estadisticas_descriptivas``.
+    """
+    return acumular_por_bloques(base_dir, tamano_bloque, cache_dir, ruta_detalle, deduplicar).finalizar()
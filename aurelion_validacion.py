@@ -0,0 +1,265 @@
+"""
+Reglas de calidad de datos de Tienda Aurelion.
+
+Cada tabla tiene una lista declarativa de :class:`Regla`. :func:`validar`
+evalúa todas las reglas de una tabla de forma vectorizada y guarda el
+resultado en una máscara de bits por fila (un bit por regla), de modo que
+las filas rechazadas se descartan con un único filtro sin importar cuántas
+reglas haya.
+
+Las reglas con severidad ``"error"`` mandan la fila a cuarentena; las de
+severidad ``"aviso"`` sólo se cuentan. :class:`ReporteValidacion` acumula la
+cantidad de filas que incumple cada regla y las filas en cuarentena con sus
+códigos de motivo, tal como venían en el origen.
+
+Las reglas de integridad referencial sólo se evalúan si se pasan las claves
+válidas de la tabla padre en ``referencias``.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Mapping
+
+import numpy as np
+import pandas as pd
+
+from aurelion_exportacion import ExportadorCSV
+
+CUARENTENA_NOMBRE = "cuarentena.csv"
+REPORTE_VALIDACION_NOMBRE = "validacion_reporte.csv"
+# Diferencia tolerada entre importe y cantidad * precio_unitario (redondeo)
+TOLERANCIA_IMPORTE = 1.0
+
+
+@dataclass(frozen=True)
+class Contexto:
+    """Datos que ve una regla: la tabla convertida, la original y las claves padre."""
+
+    df: pd.DataFrame
+    original: pd.DataFrame
+    referencias: Mapping[str, pd.Series]
+
+
+@dataclass(frozen=True)
+class Regla:
+    """Condición que marca filas inválidas.
+
+    Se omite si a la tabla le falta alguna de ``columnas`` o, cuando tiene
+    ``referencia``, si no se pasaron esas claves padre.
+    """
+
+    codigo: str
+    descripcion: str
+    invalidas: Callable[[Contexto], pd.Series | np.ndarray]
+    columnas: tuple[str, ...] = ()
+    severidad: str = "error"
+    referencia: str | None = None
+
+    def aplica(self, ctx: Contexto) -> bool:
+        return all(col in ctx.df.columns for col in self.columnas) and (
+            self.referencia is None or self.referencia in ctx.referencias
+        )
+
+
+def _duplicado() -> Regla:
+    return Regla("duplicado", "Fila idéntica a una anterior", lambda ctx: ctx.df.duplicated())
+
+
+def _claves_faltantes(*claves: str) -> Regla:
+    return Regla(
+        "clave_faltante",
+        f"Falta {' o '.join(claves)}",
+        lambda ctx: ctx.df[list(claves)].isna().any(axis=1),
+        columnas=claves,
+    )
+
+
+def _no_numerico(columna: str) -> Regla:
+    return Regla(
+        f"{columna}_no_numerico",
+        f"{columna} tiene un valor que no es un número",
+        lambda ctx: ctx.original[columna].notna() & ctx.df[columna].isna(),
+        columnas=(columna,),
+    )
+
+
+def _no_negativo(columna: str) -> Regla:
+    # Los nulos también fallan, igual que el filtro ``>= 0`` original.
+    return Regla(
+        f"{columna}_invalido",
+        f"{columna} es negativo o falta",
+        lambda ctx: ~(ctx.df[columna] >= 0),
+        columnas=(columna,),
+    )
+
+
+def _fecha_invalida(columna: str, severidad: str) -> Regla:
+    return Regla(
+        f"{columna}_invalida",
+        f"{columna} no se pudo interpretar como fecha",
+        lambda ctx: ctx.original[columna].notna() & ctx.df[columna].isna(),
+        columnas=(columna,),
+        severidad=severidad,
+    )
+
+
+def _inexistente(columna: str, padre: str, severidad: str) -> Regla:
+    return Regla(
+        f"{padre.lower().rstrip('s')}_inexistente",
+        f"{columna} no existe en {padre}",
+        lambda ctx: ctx.df[columna].notna() & ~ctx.df[columna].isin(ctx.referencias[columna]),
+        columnas=(columna,),
+        severidad=severidad,
+        referencia=columna,
+    )
+
+
+def _importe_inconsistente(ctx: Contexto) -> pd.Series:
+    esperado = ctx.df["cantidad"] * ctx.df["precio_unitario"]
+    return (ctx.df["importe"] - esperado).abs() > TOLERANCIA_IMPORTE
+
+
+REGLAS: dict[str, tuple[Regla, ...]] = {
+    "Clientes": (
+        _duplicado(),
+        _claves_faltantes("id_cliente"),
+        _fecha_invalida("fecha_alta", severidad="aviso"),
+    ),
+    "Ventas": (
+        _duplicado(),
+        _claves_faltantes("id_venta", "id_cliente"),
+        _fecha_invalida("fecha", severidad="error"),
+        _inexistente("id_cliente", "Clientes", severidad="aviso"),
+    ),
+    "Detalle_ventas": (
+        _duplicado(),
+        _claves_faltantes("id_venta", "id_producto"),
+        _no_numerico("cantidad"),
+        _no_numerico("precio_unitario"),
+        _no_numerico("importe"),
+        Regla(
+            "cantidad_no_positiva",
+            "cantidad es cero, negativa o falta",
+            lambda ctx: ~(ctx.df["cantidad"] > 0),
+            columnas=("cantidad",),
+        ),
+        _no_negativo("precio_unitario"),
+        _no_negativo("importe"),
+        Regla(
+            "importe_inconsistente",
+            "importe difiere de cantidad * precio_unitario",
+            _importe_inconsistente,
+            columnas=("cantidad", "precio_unitario", "importe"),
+        ),
+        _inexistente("id_venta", "Ventas", severidad="error"),
+        _inexistente("id_producto", "Productos", severidad="aviso"),
+    ),
+    "Productos": (
+        _duplicado(),
+        _claves_faltantes("id_producto"),
+        _no_numerico("precio_unitario"),
+        _no_negativo("precio_unitario"),
+    ),
+}
+
+
+@dataclass
+class ReporteValidacion:
+    """Filas que incumple cada regla y filas en cuarentena, por tabla."""
+
+    conteos: list[tuple[str, str, str, int]] = field(default_factory=list)
+    cuarentenas: list[pd.DataFrame] = field(default_factory=list)
+
+    def registrar(
+        self,
+        tabla: str,
+        reglas: list[Regla],
+        mascara: np.ndarray,
+        rechazadas: np.ndarray,
+        original: pd.DataFrame,
+    ) -> None:
+        bits = (mascara[:, None] >> np.arange(len(reglas), dtype=np.uint64)) & np.uint64(1)
+        for regla, filas in zip(reglas, bits.sum(axis=0)):
+            self.conteos.append((tabla, regla.codigo, regla.severidad, int(filas)))
+
+        posiciones = np.flatnonzero(rechazadas)
+        if not len(posiciones):
+            return
+        codigos = np.array([regla.codigo for regla in reglas], dtype=object)
+        motivos = ["|".join(codigos[fila.astype(bool)]) for fila in bits[posiciones]]
+        registros = [
+            json.dumps(registro, ensure_ascii=False, default=str)
+            for registro in original.iloc[posiciones].to_dict("records")
+        ]
+        self.cuarentenas.append(pd.DataFrame({
+            "tabla": tabla,
+            "fila": original.index[posiciones],
+            "motivos": motivos,
+            "registro": registros,
+        }))
+
+    def tabla(self) -> pd.DataFrame:
+        return pd.DataFrame(self.conteos, columns=["tabla", "regla", "severidad", "filas"])
+
+    def cuarentena(self) -> pd.DataFrame:
+        if not self.cuarentenas:
+            return pd.DataFrame(columns=["tabla", "fila", "motivos", "registro"])
+        return pd.concat(self.cuarentenas, ignore_index=True)
+
+    def resumen(self) -> str:
+        conteos = self.tabla()
+        incumplidas = conteos[conteos["filas"] > 0]
+        texto = f"Validación: {len(self.cuarentena())} filas en cuarentena"
+        if incumplidas.empty:
+            return texto + ", todas las reglas se cumplen"
+        return texto + "\n" + incumplidas.to_string(index=False)
+
+    def guardar(self, salida: Path, exportador: ExportadorCSV | None = None) -> None:
+        """Escribe el conteo por regla y la cuarentena en ``salida``."""
+        if exportador is None:
+            self.tabla().to_csv(salida / REPORTE_VALIDACION_NOMBRE, index=False)
+            self.cuarentena().to_csv(salida / CUARENTENA_NOMBRE, index=False)
+        else:
+            exportador.exportar(self.tabla(), REPORTE_VALIDACION_NOMBRE)
+            exportador.exportar(self.cuarentena(), CUARENTENA_NOMBRE)
+
+
+def validar(
+    df: pd.DataFrame,
+    tabla: str,
+    original: pd.DataFrame | None = None,
+    referencias: Mapping[str, pd.Series] | None = None,
+    omitir: tuple[str, ...] = (),
+    reporte: ReporteValidacion | None = None,
+) -> pd.DataFrame:
+    """Aplica las reglas de ``REGLAS[tabla]`` y devuelve las filas válidas.
+
+    Args:
+        df: Tabla con columnas normalizadas y tipos ya convertidos.
+        tabla: Nombre de la tabla en ``REGLAS``.
+        original: La misma tabla antes de convertir tipos, para distinguir
+            valores ausentes de valores que no se pudieron interpretar. Por
+            defecto ``df``.
+        referencias: Claves válidas de las tablas padre por columna
+            (``{"id_venta": Ventas["id_venta"], ...}``).
+        omitir: Códigos de regla a no evaluar.
+        reporte: Acumulador opcional de conteos y cuarentena.
+    """
+    ctx = Contexto(df, df if original is None else original, referencias or {})
+    reglas = [r for r in REGLAS.get(tabla, ()) if r.codigo not in omitir and r.aplica(ctx)]
+
+    mascara = np.zeros(len(df), dtype=np.uint64)
+    errores = np.uint64(0)
+    for bit, regla in enumerate(reglas):
+        invalidas = np.asarray(regla.invalidas(ctx), dtype=bool)
+        mascara |= invalidas.astype(np.uint64) << np.uint64(bit)
+        if regla.severidad == "error":
+            errores |= np.uint64(1) << np.uint64(bit)
+
+    rechazadas = (mascara & errores) != 0
+    if reporte is not None:
+        reporte.registrar(tabla, reglas, mascara, rechazadas, ctx.original)
+    return df[~rechazadas] if rechazadas.any() else df
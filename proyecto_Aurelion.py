@@ -6,28 +6,82 @@ correlaciones, generación de gráficos, y un modelo de regresión lineal
 para estimar el importe de ventas basado en cantidad y precio unitario.
 """
 
+from __future__ import annotations
+
+import argparse
 from pathlib import Path
-import matplotlib.pyplot as plt
+from typing import TYPE_CHECKING, Mapping
 import pandas as pd
-import seaborn as sns
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_absolute_error, r2_score
-from sklearn.model_selection import train_test_split
-
 
-def _resolver_ruta(base_dir: Path, stem: str) -> Path:
-    """Encuentra el archivo Excel disponible para un dataset."""
+from aurelion_agregacion import AgregadosVentas, agregar_ventas
+from aurelion_almacen import ALMACEN_NOMBRE, escribir_almacen
+from aurelion_cache import (
+    CACHE_DIR_NOMBRE,
+    ReporteCache,
+    cache_valida,
+    guardar_cache,
+    leer_cache,
+)
+from aurelion_esquema import ReporteMemoria, aplicar_esquema
+from aurelion_estrella import EsquemaEstrella
+from aurelion_exportacion import ExportadorCSV
+from aurelion_graficos import (
+    UMBRAL_KDE,
+    RenderizadorGraficos,
+    TrabajoGrafico,
+    graficar_correlaciones,
+    graficar_distribucion_ticket,
+    graficar_medio_pago,
+)
+from aurelion_instrumentacion import Instrumentacion
+from aurelion_prediccion import (
+    MODELOS_DIR_NOMBRE,
+    ArtefactoModelo,
+    CodificadorImporte,
+    guardar_artefacto,
+)
+from aurelion_resultados import guardar_resultados
+from aurelion_validacion import ReporteValidacion, validar
+
+if TYPE_CHECKING:
+    from sklearn.linear_model import LinearRegression
+
+
+def _resolver_ruta(
+    base_dir: Path, stem: str, cache_dir: Path | None = None
+) -> tuple[Path, Path | None]:
+    """Encuentra el archivo Excel de un dataset y, si está vigente, su caché.
+
+    La caché sólo se devuelve cuando su firma coincide con la ruta, el mtime y
+    el tamaño actuales del Excel; en cualquier otro caso se usa el Excel.
+    """
 
     ruta = base_dir / f"{stem}.xlsx"
-    if ruta.exists():
-        return ruta
-    raise FileNotFoundError(f"No se encontró {stem}.xlsx en {base_dir}")
-
-def cargar_datos(base_dir: Path) -> tuple[dict[str, pd.DataFrame], dict[str, Path]]:
+    if not ruta.exists():
+        raise FileNotFoundError(f"No se encontró {stem}.xlsx en {base_dir}")
+    if cache_dir is not None and cache_valida(ruta, cache_dir / stem):
+        return ruta, cache_dir / stem
+    return ruta, None
+
+def cargar_datos(
+    base_dir: Path,
+    cache_dir: Path | None = None,
+    forzar_cache: bool = False,
+    reporte: ReporteCache | None = None,
+    reporte_memoria: ReporteMemoria | None = None,
+) -> tuple[dict[str, pd.DataFrame], dict[str, Path]]:
     """Carga los archivos de clientes, ventas, detalle y productos.
 
+    Las tablas se devuelven con los tipos compactos de ``ESQUEMA``.
+
     Args:
         base_dir: Carpeta donde residen los archivos.
+        cache_dir: Carpeta de la caché columnar. Si es ``None`` se lee
+            siempre el Excel.
+        forzar_cache: Ignora la caché existente y la reconstruye.
+        reporte: Acumulador opcional de aciertos y fallos de caché.
+        reporte_memoria: Acumulador opcional de bytes antes y después de
+            aplicar el esquema.
 
     Returns:
         Una tupla con el diccionario de dataframes y las rutas de origen.
@@ -43,205 +97,300 @@ def cargar_datos(base_dir: Path) -> tuple[dict[str, pd.DataFrame], dict[str, Pat
     data: dict[str, pd.DataFrame] = {}
     rutas: dict[str, Path] = {}
     for nombre, stem in stems.items():
-        ruta = _resolver_ruta(base_dir, stem)
-        rutas[nombre] = ruta
-        data[nombre] = pd.read_excel(ruta)
+        data[nombre], rutas[nombre] = cargar_tabla(
+            base_dir, stem, cache_dir, forzar_cache, reporte, reporte_memoria
+        )
 
     return data, rutas
 
 
+def cargar_tabla(
+    base_dir: Path,
+    stem: str,
+    cache_dir: Path | None = None,
+    forzar_cache: bool = False,
+    reporte: ReporteCache | None = None,
+    reporte_memoria: ReporteMemoria | None = None,
+) -> tuple[pd.DataFrame, Path]:
+    """Carga un único dataset desde su caché vigente o desde el Excel.
+
+    La caché guarda la tabla tal como viene del Excel; el esquema compacto se
+    aplica después de leerla.
+    """
+    ruta, ruta_cache = _resolver_ruta(
+        base_dir, stem, None if forzar_cache else cache_dir
+    )
+    if ruta_cache is not None:
+        if reporte is not None:
+            reporte.aciertos.append(stem)
+        df = leer_cache(ruta_cache)
+    else:
+        df = pd.read_excel(ruta)
+        if cache_dir is not None:
+            guardada = guardar_cache(df, ruta, cache_dir / stem)
+            if reporte is not None:
+                (reporte.fallos if guardada else reporte.no_cacheables).append(stem)
+    return aplicar_esquema(df, stem, reporte_memoria), ruta
+
+
 def exportar_fuentes_csv(
-    data: dict[str, pd.DataFrame], rutas: dict[str, Path], destino: Path
+    data: dict[str, pd.DataFrame],
+    rutas: dict[str, Path],
+    destino: Path,
+    exportador: ExportadorCSV | None = None,
 ) -> None:
     """Convierte los Excel a CSV y los deja en un directorio plano.
     Los archivos mantienen el nombre original y no se crean subcarpetas.
+    Con ``exportador`` sólo se reescriben los que cambiaron.
     """
 
     for nombre, df in data.items():
         ruta_origen = rutas.get(nombre, Path())
         if ruta_origen.suffix.lower() == ".xlsx":
-            df.to_csv(destino / f"{ruta_origen.stem}.csv", index=False)
-
-
-def limpiar_datos(data: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
-    """Aplica reglas básicas de limpieza y consistencia a los datasets."""
-    Clientes = data["Clientes"].copy()
-    Ventas = data["Ventas"].copy()
-    Detalle_ventas = data["Detalle_ventas"].copy()
-    Productos = data["Productos"].copy()
-
-    # Normalizar nombres de columnas en minúsculas
-    for df in (Clientes, Ventas, Detalle_ventas, Productos):
-        df.columns = [c.strip().lower() for c in df.columns]
-
-    # Tipos
-    for col in ("fecha_alta", "fecha"):
-        if col in Clientes:
-            Clientes[col] = pd.to_datetime(Clientes[col], errors="coerce")
-        if col in Ventas:
-            Ventas[col] = pd.to_datetime(Ventas[col], errors="coerce")
-
-    for df, cols in ((Detalle_ventas, ["cantidad", "precio_unitario", "importe"]), (Productos, ["precio_unitario"])):
-        for col in cols:
-            if col in df:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    # Eliminar duplicados exactos
-    Clientes = Clientes.drop_duplicates()
-    Ventas = Ventas.drop_duplicates()
-    Detalle_ventas = Detalle_ventas.drop_duplicates()
-    Productos = Productos.drop_duplicates()
-
-    # Quitar registros con claves faltantes
-    Ventas = Ventas.dropna(subset=["id_venta", "id_cliente"])
-    Detalle_ventas = Detalle_ventas.dropna(subset=["id_venta", "id_producto"])
-    Productos = Productos.dropna(subset=["id_producto"])
-
-    # Consistencias básicas
-    Detalle_ventas = Detalle_ventas[Detalle_ventas["cantidad"] > 0]
-    for col in ("precio_unitario", "importe"):
-        if col in Detalle_ventas:
-            Detalle_ventas = Detalle_ventas[Detalle_ventas[col] >= 0]
-    if "precio_unitario" in Productos:
-        Productos = Productos[Productos["precio_unitario"] >= 0]
+            if exportador is None:
+                df.to_csv(destino / f"{ruta_origen.stem}.csv", index=False)
+            else:
+                exportador.exportar(df, f"{ruta_origen.stem}.csv")
+
+
+def _normalizar_columnas(df: pd.DataFrame) -> pd.DataFrame:
+    """Normaliza los nombres de columnas en minúsculas y sin espacios."""
+    df.columns = [c.strip().lower() for c in df.columns]
+    return df
+
+
+def limpiar_clientes(
+    Clientes: pd.DataFrame, reporte: ReporteValidacion | None = None
+) -> pd.DataFrame:
+    """Normaliza tipos y descarta clientes duplicados o sin clave."""
+    original = _normalizar_columnas(Clientes.copy())
+    Clientes = original
+    if "fecha_alta" in Clientes:
+        Clientes = Clientes.assign(fecha_alta=pd.to_datetime(Clientes["fecha_alta"], errors="coerce"))
+    return validar(Clientes, "Clientes", original, reporte=reporte)
+
+
+def limpiar_ventas(
+    Ventas: pd.DataFrame,
+    referencias: Mapping[str, pd.Series] | None = None,
+    reporte: ReporteValidacion | None = None,
+) -> pd.DataFrame:
+    """Normaliza tipos y descarta ventas duplicadas, sin claves o sin fecha válida."""
+    original = _normalizar_columnas(Ventas.copy())
+    Ventas = original
+    if "fecha" in Ventas:
+        Ventas = Ventas.assign(fecha=pd.to_datetime(Ventas["fecha"], errors="coerce"))
+    return validar(Ventas, "Ventas", original, referencias, reporte=reporte)
+
+
+def limpiar_detalle(
+    Detalle_ventas: pd.DataFrame,
+    deduplicar: bool = True,
+    referencias: Mapping[str, pd.Series] | None = None,
+    reporte: ReporteValidacion | None = None,
+) -> pd.DataFrame:
+    """Aplica las reglas de limpieza a un bloque de Detalle_ventas.
+
+    Convierte montos a numérico y descarta claves faltantes, cantidades no
+    positivas, precios o importes negativos e importes que no coinciden con
+    cantidad por precio (ver ``REGLAS`` en :mod:`aurelion_validacion`). Con
+    ``deduplicar=False`` se omite la eliminación de duplicados exactos para
+    que el llamador la resuelva entre bloques.
+    """
+    original = _normalizar_columnas(Detalle_ventas.copy())
+    Detalle_ventas = original.assign(**{
+        col: pd.to_numeric(original[col], errors="coerce")
+        for col in ("cantidad", "precio_unitario", "importe")
+        if col in original
+    })
+    omitir = () if deduplicar else ("duplicado",)
+    return validar(Detalle_ventas, "Detalle_ventas", original, referencias, omitir, reporte)
 
-    # Enriquecer el detalle con información del catálogo de productos
-    if "id_producto" in Detalle_ventas.columns and "id_producto" in Productos.columns:
-        columnas_productos = [
-            col
-            for col in ("id_producto", "categoria", "precio_unitario")
-            if col in Productos.columns
-        ]
-        productos_unicos = Productos[columnas_productos].drop_duplicates(
-            subset=["id_producto"]
-        )
-        Detalle_ventas = Detalle_ventas.merge(
-            productos_unicos, on="id_producto", how="left", suffixes=("", "_prod")
+
+def limpiar_productos(
+    Productos: pd.DataFrame, reporte: ReporteValidacion | None = None
+) -> pd.DataFrame:
+    """Normaliza el catálogo y descarta productos sin clave o con precio negativo."""
+    original = _normalizar_columnas(Productos.copy())
+    Productos = original
+    if "precio_unitario" in Productos:
+        Productos = Productos.assign(
+            precio_unitario=pd.to_numeric(Productos["precio_unitario"], errors="coerce")
         )
+    return validar(Productos, "Productos", original, reporte=reporte)
+
+
+def catalogo_productos(Productos: pd.DataFrame) -> pd.DataFrame:
+    """Devuelve una fila por producto con las columnas usadas para enriquecer."""
+    columnas_productos = [
+        col
+        for col in ("id_producto", "categoria", "precio_unitario")
+        if col in Productos.columns
+    ]
+    return Productos[columnas_productos].drop_duplicates(subset=["id_producto"])
 
-    # Unir todo en un solo DataFrame para análisis
-    ventas_analitica = Ventas.merge(Detalle_ventas, on="id_venta", how="left", suffixes=("_venta", "_detalle"))
-    ventas_analitica = ventas_analitica.merge(Clientes, on="id_cliente", how="left", suffixes=("", "_cliente"))
 
-    return {
+def enriquecer_detalle(Detalle_ventas: pd.DataFrame, catalogo: pd.DataFrame) -> pd.DataFrame:
+    """Agrega categoría y precio de catálogo a las líneas de detalle."""
+    if "id_producto" not in Detalle_ventas.columns or "id_producto" not in catalogo.columns:
+        return Detalle_ventas
+    return Detalle_ventas.merge(
+        catalogo, on="id_producto", how="left", suffixes=("", "_prod")
+    )
+
+
+def limpiar_datos(
+    data: dict[str, pd.DataFrame],
+    materializar_analitica: bool = False,
+    reporte_validacion: ReporteValidacion | None = None,
+) -> dict[str, pd.DataFrame]:
+    """Aplica reglas básicas de limpieza y consistencia a los datasets.
+
+    Las tablas padre se limpian primero para que Ventas y Detalle_ventas se
+    validen contra sus claves ya depuradas. Las filas descartadas y el
+    motivo quedan en ``reporte_validacion`` si se pasa uno.
+
+    La tabla ancha ``ventas_analitica`` sólo se arma con
+    ``materializar_analitica=True``; para métricas conviene consultar el
+    esquema estrella (:class:`aurelion_estrella.EsquemaEstrella`).
+    """
+    Clientes = limpiar_clientes(data["Clientes"], reporte_validacion)
+    Productos = limpiar_productos(data["Productos"], reporte_validacion)
+    Ventas = limpiar_ventas(
+        data["Ventas"],
+        {"id_cliente": Clientes["id_cliente"]} if "id_cliente" in Clientes else None,
+        reporte_validacion,
+    )
+    Detalle_ventas = limpiar_detalle(
+        data["Detalle_ventas"],
+        referencias={
+            "id_venta": Ventas["id_venta"],
+            **({"id_producto": Productos["id_producto"]} if "id_producto" in Productos else {}),
+        },
+        reporte=reporte_validacion,
+    )
+
+    # Tipos compactos una vez resueltos nulos y valores inválidos
+    Clientes = aplicar_esquema(Clientes, "Clientes")
+    Ventas = aplicar_esquema(Ventas, "Ventas")
+    Detalle_ventas = aplicar_esquema(Detalle_ventas, "Detalle_ventas")
+    Productos = aplicar_esquema(Productos, "Productos")
+
+    # Enriquecer el detalle con información del catálogo de productos
+    Detalle_ventas = enriquecer_detalle(Detalle_ventas, catalogo_productos(Productos))
+
+    data_limpia = {
         "Clientes": Clientes,
         "Ventas": Ventas,
         "Detalle_ventas": Detalle_ventas,
         "Productos": Productos,
-        "ventas_analitica": ventas_analitica,
     }
+    if materializar_analitica:
+        data_limpia["ventas_analitica"] = EsquemaEstrella.desde_tablas(data_limpia).ventas_analitica()
+    return data_limpia
 
 
 def estadisticas_descriptivas(ventas_analitica: pd.DataFrame) -> dict[str, pd.Series]:
     """Calcula métricas descriptivas clave."""
-    ventas_totales = ventas_analitica.groupby("id_venta")["importe"].sum()
-    ticket_por_cliente = ventas_analitica.groupby("id_cliente")["importe"].sum()
-    if "categoria" in ventas_analitica.columns:
-        ticket_por_categoria = ventas_analitica.groupby("categoria")["importe"].sum()
-    else:
-        ticket_por_categoria = pd.Series(dtype=float)
-
-    resumen_general = pd.Series({
-        "ventas_registradas": ventas_totales.shape[0],
-        "monto_total": ventas_totales.sum(),
-        "ticket_promedio": ventas_totales.mean(),
-        "productos_distintos": ventas_analitica["id_producto"].nunique(),
-        "clientes_distintos": ventas_analitica["id_cliente"].nunique(),
-    })
-
-    return {
-        "resumen_general": resumen_general,
-        "ticket_por_venta": ventas_totales.describe(),
-        "ticket_por_cliente": ticket_por_cliente.describe(),
-        "importe_por_categoria": ticket_por_categoria.sort_values(ascending=False),
-    }
+    return agregar_ventas(ventas_analitica).estadisticas
+
+
+def trabajos_distribuciones(
+    agregados: AgregadosVentas,
+    salida: Path,
+    umbral_kde: int | None = UMBRAL_KDE,
+    muestrear_kde: bool = True,
+) -> list[TrabajoGrafico]:
+    """Arma los trabajos de gráfico de las distribuciones a partir de los agregados."""
+    return [
+        TrabajoGrafico(
+            graficar_distribucion_ticket,
+            (agregados.ventas_totales, umbral_kde, muestrear_kde),
+            salida / "distribucion_ticket.png",
+        ),
+        TrabajoGrafico(
+            graficar_medio_pago,
+            (agregados.ventas_por_medio_pago,),
+            salida / "ventas_por_medio_pago.png",
+        ),
+    ]
+
+
+def matriz_correlacion(ventas_analitica: pd.DataFrame) -> pd.DataFrame:
+    """Calcula la matriz de correlación entre las variables numéricas."""
+    num_cols = [c for c in ["cantidad", "importe"] if c in ventas_analitica.columns]
+    return ventas_analitica[num_cols].corr()
 
 
-def crear_distribuciones(ventas_analitica: pd.DataFrame, salida: Path) -> None:
+def crear_distribuciones(
+    ventas_analitica: pd.DataFrame, salida: Path, umbral_kde: int | None = UMBRAL_KDE
+) -> None:
     """Genera histogramas y distribuciones básicas."""
-    ventas_totales = ventas_analitica.groupby("id_venta")["importe"].sum()
-
-    plt.figure(figsize=(8, 5))
-    sns.histplot(ventas_totales, bins=20, kde=True, color="#4c72b0")
-    plt.title("Distribución del ticket por venta")
-    plt.xlabel("Monto de venta")
-    plt.ylabel("Frecuencia")
-    plt.tight_layout()
-    plt.savefig(salida / "distribucion_ticket.png")
-    plt.close()
-
-    plt.figure(figsize=(8, 5))
-    sns.countplot(
-        data=ventas_analitica.drop_duplicates("id_venta"),
-        x="medio_pago",
-        hue="medio_pago",
-        palette="viridis",
-        legend=False,
-    )
-    plt.title("Ventas por medio de pago")
-    plt.xlabel("Medio de pago")
-    plt.ylabel("Número de ventas")
-    plt.tight_layout()
-    plt.savefig(salida / "ventas_por_medio_pago.png")
-    plt.close()
+    agregados = agregar_ventas(ventas_analitica)
+    for trabajo in trabajos_distribuciones(agregados, salida, umbral_kde):
+        trabajo.ejecutar()
 
 
 def crear_correlaciones(ventas_analitica: pd.DataFrame, salida: Path) -> pd.DataFrame:
     """Calcula matriz de correlación y genera un heatmap."""
-    num_cols = [c for c in ["cantidad", "importe"] if c in ventas_analitica.columns]
-    corr = ventas_analitica[num_cols].corr()
-
-    plt.figure(figsize=(6, 4))
-    sns.heatmap(corr, annot=True, cmap="coolwarm", fmt=".2f")
-    plt.title("Correlación entre variables numéricas")
-    plt.tight_layout()
-    plt.savefig(salida / "correlaciones.png")
-    plt.close()
+    corr = matriz_correlacion(ventas_analitica)
+    graficar_correlaciones(corr, salida / "correlaciones.png")
     return corr
 
-def main() -> None:
-    base_dir = Path(__file__).resolve().parent
-    salida = base_dir
+def guardar_estadisticas(
+    stats: dict[str, pd.Series], salida: Path, exportador: ExportadorCSV | None = None
+) -> None:
+    """Escribe las métricas descriptivas en sus CSV de salida.
 
-    data, rutas = cargar_datos(base_dir)
-    data_limpia = limpiar_datos(data)
-    ventas_analitica = data_limpia["ventas_analitica"]
-    
-    exportar_fuentes_csv(data, rutas, salida)
+    Sin ``exportador`` se usa uno propio sobre ``salida`` y se guarda su
+    manifiesto al terminar.
+    """
+    propio = exportador is None
+    exportador = exportador or ExportadorCSV(salida)
+    for nombre in ("resumen_general", "ticket_por_venta", "ticket_por_cliente", "importe_por_categoria"):
+        exportador.exportar(stats[nombre], f"{nombre}.csv", index=True)
+    if propio:
+        exportador.guardar_manifiesto()
 
-    # Exportar versiones limpias
-    for nombre, df in data_limpia.items():
-        base_nombre = rutas.get(nombre, Path()).stem if nombre in rutas else nombre
-        df.to_csv(salida / f"{base_nombre}_limpio.csv", index=False)
 
-    stats = estadisticas_descriptivas(ventas_analitica)
-    crear_distribuciones(ventas_analitica, salida)
-    corr = crear_correlaciones(ventas_analitica, salida)
+def meses_de_tabla(nombre: str, df: pd.DataFrame, data_limpia: dict[str, pd.DataFrame]) -> pd.Series | None:
+    """Mes de ``fecha`` de cada fila, para exportar la tabla partida por mes.
 
-    # Guardar estadísticas
-    stats["resumen_general"].to_csv(salida / "resumen_general.csv")
-    stats["ticket_por_venta"].to_csv(salida / "ticket_por_venta.csv")
-    stats["ticket_por_cliente"].to_csv(salida / "ticket_por_cliente.csv")
-    stats["importe_por_categoria"].to_csv(salida / "importe_por_categoria.csv")
-    corr.to_csv(salida / "matriz_correlacion.csv")
+    Detalle_ventas toma el mes de su venta. Devuelve ``None`` para las tablas
+    sin fecha de venta.
+    """
+    if "fecha" in df.columns:
+        return df["fecha"].dt.to_period("M")
+    if nombre == "Detalle_ventas" and "id_venta" in df.columns:
+        Ventas = data_limpia["Ventas"].drop_duplicates(subset=["id_venta"])
+        meses = pd.Series(Ventas["fecha"].dt.to_period("M").to_numpy(), index=Ventas["id_venta"].to_numpy())
+        return pd.Series(meses.reindex(df["id_venta"].to_numpy()).to_numpy(), index=df.index)
+    return None
 
-    print("=== Estadísticas descriptivas ===")
-    print(stats["resumen_general"].to_string())
 
-    # Modelo de regresión lineal para estimar el importe
-    df_ml = data_limpia["Detalle_ventas"].copy()
-    if "categoria" in df_ml:
-        df_ml = pd.get_dummies(df_ml, columns=["categoria"], drop_first=True)
+def entrenar_modelo(
+    Detalle_ventas: pd.DataFrame, codificador: CodificadorImporte | None = None
+) -> tuple[LinearRegression, dict[str, float]]:
+    """Entrena la regresión lineal del importe y la evalúa sobre un 20 % reservado.
 
-    variables_basicas = [col for col in ("cantidad", "precio_unitario") if col in df_ml]
-    variables_categorias = [col for col in df_ml.columns if col.startswith("categoria_")]
-    columnas_modelo = variables_basicas + variables_categorias
+    Las variables salen de ``codificador`` (por defecto uno ajustado sobre
+    ``Detalle_ventas``), el mismo que usa :mod:`aurelion_prediccion` para
+    predecir, de modo que las columnas coinciden con las del entrenamiento.
 
-    if not columnas_modelo:
+    Returns:
+        El modelo ajustado y sus métricas ``r2`` y ``mae`` sobre el conjunto de prueba.
+    """
+    # scikit-learn tarda en importarse; sólo lo paga quien entrena
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_absolute_error, r2_score
+    from sklearn.model_selection import train_test_split
+
+    codificador = codificador or CodificadorImporte.ajustar(Detalle_ventas)
+    if not codificador.columnas:
         raise ValueError("No hay columnas disponibles para entrenar el modelo")
 
-    X = df_ml[columnas_modelo]
-    y = df_ml["importe"]
+    X = codificador.transformar(Detalle_ventas)
+    y = Detalle_ventas["importe"]
 
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
@@ -251,8 +400,466 @@ def main() -> None:
     modelo_aurelion.fit(X_train, y_train)
 
     y_pred = modelo_aurelion.predict(X_test)
-    print(f"R2 Score: {r2_score(y_test, y_pred):.2f}")
-    print(f"MAE: {mean_absolute_error(y_test, y_pred):.2f}")
+    return modelo_aurelion, {
+        "r2": r2_score(y_test, y_pred),
+        "mae": mean_absolute_error(y_test, y_pred),
+    }
+
+
+ETAPAS = (
+    "carga",
+    "limpieza",
+    "esquema_estrella",
+    "exportar_fuentes",
+    "exportar_limpios",
+    "estadisticas",
+    "correlaciones",
+    "enviar_graficos",
+    "guardar_estadisticas",
+    "almacen",
+    "modelo",
+    "modelo_disperso",
+    "cubos",
+    "rfm",
+    "canasta",
+    "aproximado",
+    "esperar_graficos",
+    "estadisticas_por_bloques",
+)
+
+
+def main(
+    usar_cache: bool = True,
+    forzar_cache: bool = False,
+    por_bloques: bool = False,
+    tamano_bloque: int = 100_000,
+    procesos_graficos: int | None = None,
+    umbral_kde: int | None = UMBRAL_KDE,
+    muestrear_kde: bool = True,
+    mostrar_memoria: bool = False,
+    exportar_analitica: bool = False,
+    formato_salida: str = "csv",
+    ruta_almacen: Path | None = None,
+    reemplazar_almacen: bool = False,
+    mostrar_tiempos: bool = False,
+    registro_ejecucion: Path | None = None,
+    perfilar_etapa: str | None = None,
+    particionar_mes: bool = False,
+    cubos: bool = False,
+    reconstruir_cubos: bool = False,
+    modelo_disperso: bool = False,
+    variables_modelo: tuple[str, ...] = ("categoria",),
+    pliegues: int = 5,
+    rfm: bool = False,
+    clusters_rfm: int = 0,
+    canasta: bool = False,
+    top_complementarios: int = 5,
+    soporte_minimo: float = 0.0,
+    aproximado: bool = False,
+    dag: bool = False,
+    entrada: Path | None = None,
+    salida: Path | None = None,
+) -> Instrumentacion:
+    """Ejecuta el análisis completo.
+
+    ``entrada`` es la carpeta de los Excel (y de la caché) y ``salida`` la de
+    los CSV, gráficos y modelos; por defecto ambas son la carpeta del script.
+    Con ``dag`` las etapas corren concurrentes y se omiten las que no
+    cambiaron (ver :mod:`aurelion_dag`).
+    """
+    base_dir = entrada or Path(__file__).resolve().parent
+    salida = salida or base_dir
+    salida.mkdir(parents=True, exist_ok=True)
+    exportar_csv = formato_salida in ("csv", "ambos")
+    inst = Instrumentacion(perfilar=perfilar_etapa, dir_perfiles=salida)
+
+    if por_bloques:
+        # Modo fuera de memoria: sólo se calculan las métricas descriptivas.
+        from aurelion_streaming import estadisticas_por_bloques
+
+        with inst.etapa("estadisticas_por_bloques") as etapa:
+            cache_dir = base_dir / CACHE_DIR_NOMBRE if usar_cache else None
+            if aproximado:
+                from aurelion_aproximado import BOCETOS_NOMBRE, estadisticas_aproximadas_por_bloques
+
+                bocetos = estadisticas_aproximadas_por_bloques(base_dir, tamano_bloque, cache_dir)
+                bocetos.guardar(salida / BOCETOS_NOMBRE)
+                stats = etapa.salida(bocetos.estadisticas())
+            else:
+                stats = etapa.salida(estadisticas_por_bloques(base_dir, tamano_bloque, cache_dir))
+        with inst.etapa("guardar_estadisticas", stats):
+            guardar_estadisticas(stats, salida)
+        print("=== Estadísticas descriptivas (por bloques) ===")
+        print(stats["resumen_general"].to_string())
+        guardar_resultados(salida)
+        _informar_tiempos(inst, mostrar_tiempos, registro_ejecucion)
+        return inst
+
+    if dag:
+        from aurelion_dag import ejecutar_analisis
+
+        almacen = formato_salida in ("sqlite", "ambos")
+        ejecutar_analisis(
+            base_dir,
+            salida,
+            inst,
+            exportar_csv=exportar_csv,
+            procesos=procesos_graficos,
+            usar_cache=usar_cache,
+            forzar_cache=forzar_cache,
+            exportar_analitica=exportar_analitica,
+            particionar_mes=particionar_mes,
+            umbral_kde=umbral_kde,
+            muestrear_kde=muestrear_kde,
+            ruta_almacen=(ruta_almacen or salida / ALMACEN_NOMBRE) if almacen else None,
+            reemplazar_almacen=reemplazar_almacen,
+            cubos=cubos,
+            reconstruir_cubos=reconstruir_cubos,
+            modelo_disperso=modelo_disperso,
+            variables_modelo=variables_modelo,
+            pliegues=pliegues,
+            rfm=rfm,
+            clusters_rfm=clusters_rfm,
+            canasta=canasta,
+            top_complementarios=top_complementarios,
+            soporte_minimo=soporte_minimo,
+            aproximado=aproximado,
+        )
+        guardar_resultados(salida)
+        _informar_tiempos(inst, mostrar_tiempos, registro_ejecucion)
+        return inst
+
+    reporte_cache = ReporteCache()
+    reporte_memoria = ReporteMemoria()
+    with inst.etapa("carga") as etapa:
+        data, rutas = etapa.salida(cargar_datos(
+            base_dir,
+            cache_dir=base_dir / CACHE_DIR_NOMBRE if usar_cache else None,
+            forzar_cache=forzar_cache,
+            reporte=reporte_cache,
+            reporte_memoria=reporte_memoria,
+        ))
+    if usar_cache:
+        print(reporte_cache.resumen())
+    reporte_validacion = ReporteValidacion()
+    with inst.etapa("limpieza", data) as etapa:
+        data_limpia = etapa.salida(
+            limpiar_datos(data, materializar_analitica=exportar_analitica, reporte_validacion=reporte_validacion)
+        )
+    exportador = ExportadorCSV(salida)
+    reporte_validacion.guardar(salida, exportador)
+    print(reporte_validacion.resumen())
+    with inst.etapa("esquema_estrella", data_limpia["Detalle_ventas"]) as etapa:
+        estrella = etapa.salida(EsquemaEstrella.desde_tablas(data_limpia))
+    if mostrar_memoria:
+        if exportar_analitica:
+            reporte_memoria.registrar_compacta("ventas_analitica", data_limpia["ventas_analitica"])
+        print("=== Memoria por tabla (bytes) ===")
+        print(reporte_memoria.tabla().to_string())
+
+    if exportar_csv:
+        with inst.etapa("exportar_fuentes", data):
+            exportar_fuentes_csv(data, rutas, salida, exportador)
+
+        # Exportar versiones limpias
+        with inst.etapa("exportar_limpios", data_limpia):
+            for nombre, df in data_limpia.items():
+                base_nombre = rutas.get(nombre, Path()).stem if nombre in rutas else nombre
+                meses = meses_de_tabla(nombre, df, data_limpia) if particionar_mes else None
+                if meses is None:
+                    exportador.exportar(df, f"{base_nombre}_limpio.csv")
+                else:
+                    exportador.exportar_por_mes(df, f"{base_nombre}_limpio.csv", meses)
+
+    with inst.etapa("estadisticas", estrella) as etapa:
+        agregados = estrella.agregados()
+        stats = etapa.salida(agregados.estadisticas)
+
+    # Los gráficos se renderizan en segundo plano mientras sigue el análisis
+    with inst.etapa("correlaciones", estrella) as etapa:
+        corr = etapa.salida(estrella.matriz_correlacion())
+    with RenderizadorGraficos(procesos_graficos) as graficos:
+        with inst.etapa("enviar_graficos", agregados.ventas_totales):
+            graficos.enviar(trabajos_distribuciones(agregados, salida, umbral_kde, muestrear_kde))
+            graficos.enviar([TrabajoGrafico(graficar_correlaciones, (corr,), salida / "correlaciones.png")])
+
+        # Guardar estadísticas
+        if exportar_csv:
+            with inst.etapa("guardar_estadisticas", stats):
+                guardar_estadisticas(stats, salida, exportador)
+                exportador.exportar(corr, "matriz_correlacion.csv", index=True)
+        if cubos:
+            from aurelion_cubos import CUBOS_NOMBRE, GRANOS, actualizar_cubo
+
+            with inst.etapa("cubos", estrella) as etapa:
+                cubo = actualizar_cubo(
+                    estrella, base_dir / CACHE_DIR_NOMBRE / CUBOS_NOMBRE, reconstruir=reconstruir_cubos
+                )
+                etapa.salida(cubo.celdas)
+                if exportar_csv:
+                    for grano in GRANOS:
+                        exportador.exportar(cubo.rollup(grano), f"rollup_{grano}.csv", index=True)
+        if rfm:
+            from aurelion_rfm import RFM_NOMBRE, actualizar_rfm
+
+            with inst.etapa("rfm", estrella) as etapa:
+                segmentacion, actualizados = actualizar_rfm(
+                    estrella, base_dir / CACHE_DIR_NOMBRE / RFM_NOMBRE, clusters=clusters_rfm
+                )
+                etapa.salida(segmentacion.clientes)
+                if exportar_csv:
+                    exportador.exportar(segmentacion.tabla(), "rfm_clientes.csv", index=True)
+            print(
+                f"Segmentación RFM: {actualizados:,} clientes actualizados "
+                f"de {len(segmentacion.clientes):,}"
+            )
+        if canasta:
+            from aurelion_canasta import MotorCanasta
+
+            with inst.etapa("canasta", estrella) as etapa:
+                motor = MotorCanasta.desde_estrella(estrella, soporte_minimo)
+                complementarios = etapa.salida(
+                    motor.complementarios_producto(top_complementarios, soporte_minimo)
+                )
+                if exportar_csv:
+                    exportador.exportar(complementarios, "complementarios_producto.csv", index=True)
+                    if motor.categorias is not None:
+                        exportador.exportar(
+                            motor.complementarios_categoria(top_complementarios, soporte_minimo),
+                            "complementarios_categoria.csv",
+                            index=True,
+                        )
+        if aproximado:
+            from aurelion_aproximado import BOCETOS_NOMBRE, EstadisticasAproximadas, comparar
+
+            with inst.etapa("aproximado", estrella) as etapa:
+                bocetos = EstadisticasAproximadas.desde_agregados(agregados, estrella)
+                bocetos.guardar(salida / BOCETOS_NOMBRE)
+                errores = etapa.salida(comparar(bocetos, agregados))
+                if exportar_csv:
+                    exportador.exportar(errores, "errores_aproximacion.csv", index=True)
+        exportador.guardar_manifiesto()
+        if exportar_csv:
+            print(exportador.resumen())
+        if formato_salida in ("sqlite", "ambos"):
+            ruta_almacen = ruta_almacen or salida / ALMACEN_NOMBRE
+            metricas = {
+                **stats,
+                "ventas_por_medio_pago": agregados.ventas_por_medio_pago,
+                "matriz_correlacion": corr.rename_axis("variable"),
+            }
+            with inst.etapa("almacen", data_limpia):
+                escribir_almacen(ruta_almacen, data_limpia, metricas, reemplazar=reemplazar_almacen)
+            print(f"Almacén SQLite actualizado: {ruta_almacen}")
+
+        print("=== Estadísticas descriptivas ===")
+        print(stats["resumen_general"].to_string())
+
+        # Modelo de regresión lineal para estimar el importe
+        with inst.etapa("modelo", data_limpia["Detalle_ventas"]):
+            codificador = CodificadorImporte.ajustar(data_limpia["Detalle_ventas"])
+            modelo, metricas_modelo = entrenar_modelo(data_limpia["Detalle_ventas"], codificador)
+            artefacto = ArtefactoModelo.desde_modelo(
+                modelo, codificador, metricas_modelo, len(data_limpia["Detalle_ventas"])
+            )
+            ruta_modelo, modelo_nuevo = guardar_artefacto(artefacto, salida / MODELOS_DIR_NOMBRE)
+        print(f"R2 Score: {metricas_modelo['r2']:.2f}")
+        print(f"MAE: {metricas_modelo['mae']:.2f}")
+        print(
+            f"Modelo v{artefacto.version} {'guardado en' if modelo_nuevo else 'sin cambios:'} "
+            f"{ruta_modelo.relative_to(salida)}"
+        )
+        if modelo_disperso:
+            from aurelion_entrenamiento import entrenar_disperso
+
+            with inst.etapa("modelo_disperso", estrella):
+                _, _, reporte_modelo = entrenar_disperso(estrella, variables_modelo, pliegues=pliegues)
+            print(reporte_modelo.resumen())
+
+        with inst.etapa("esperar_graficos"):
+            graficos.esperar()
+    # Métricas, modelo y gráficos para el asistente de documentación
+    guardar_resultados(salida)
+    _informar_tiempos(inst, mostrar_tiempos, registro_ejecucion)
+    return inst
+
+
+def _informar_tiempos(
+    inst: Instrumentacion, mostrar_tiempos: bool, registro_ejecucion: Path | None
+) -> None:
+    if mostrar_tiempos or registro_ejecucion is not None:
+        print(inst.resumen())
+    if registro_ejecucion is not None:
+        inst.guardar(registro_ejecucion)
+        print(f"Registro de la ejecución guardado en {registro_ejecucion}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sin-cache", action="store_true", help="Lee siempre los Excel sin usar la caché columnar."
+    )
+    parser.add_argument(
+        "--reconstruir-cache", action="store_true", help="Ignora la caché existente y la vuelve a generar."
+    )
+    parser.add_argument(
+        "--por-bloques",
+        action="store_true",
+        help="Calcula sólo las estadísticas leyendo Detalle_ventas por bloques.",
+    )
+    parser.add_argument(
+        "--tamano-bloque", type=int, default=100_000, help="Filas de Detalle_ventas por bloque."
+    )
+    parser.add_argument(
+        "--procesos-graficos",
+        type=int,
+        default=None,
+        help="Procesos para renderizar gráficos (0 los genera en el proceso principal).",
+    )
+    parser.add_argument(
+        "--umbral-kde",
+        type=int,
+        default=UMBRAL_KDE,
+        help="Tickets a partir de los cuales la KDE se estima sobre una muestra.",
+    )
+    parser.add_argument(
+        "--omitir-kde",
+        action="store_true",
+        help="Por encima de --umbral-kde no dibuja la KDE en lugar de muestrearla.",
+    )
+    parser.add_argument(
+        "--reporte-memoria",
+        action="store_true",
+        help="Muestra los bytes de cada tabla antes y después de aplicar el esquema compacto.",
+    )
+    parser.add_argument(
+        "--exportar-analitica",
+        action="store_true",
+        help="Arma la tabla ancha ventas_analitica y la guarda en ventas_analitica_limpio.csv.",
+    )
+    parser.add_argument(
+        "--salida",
+        choices=("csv", "sqlite", "ambos"),
+        default="csv",
+        help="Formato de salida de las tablas limpias y las métricas.",
+    )
+    parser.add_argument(
+        "--almacen",
+        type=Path,
+        default=None,
+        help=f"Archivo SQLite de salida (por defecto {ALMACEN_NOMBRE} en la carpeta de salida).",
+    )
+    parser.add_argument(
+        "--reemplazar-almacen",
+        action="store_true",
+        help="Vacía las tablas del almacén antes de escribir en lugar de hacer upsert.",
+    )
+    parser.add_argument(
+        "--tiempos", action="store_true", help="Muestra el tiempo, la CPU y la memoria de cada etapa."
+    )
+    parser.add_argument(
+        "--registro-ejecucion",
+        type=Path,
+        default=None,
+        help="Guarda las mediciones por etapa en este archivo JSON.",
+    )
+    parser.add_argument(
+        "--perfilar",
+        choices=ETAPAS,
+        default=None,
+        help="Perfila una etapa con cProfile y guarda perfil_<etapa>.prof.",
+    )
+    parser.add_argument(
+        "--particionar-mes",
+        action="store_true",
+        help="Exporta Ventas, Detalle_ventas y ventas_analitica limpios en un CSV por mes.",
+    )
+    parser.add_argument(
+        "--cubos",
+        action="store_true",
+        help="Actualiza los cubos por fecha y exporta rollup_dia/semana/mes.csv.",
+    )
+    parser.add_argument(
+        "--reconstruir-cubos", action="store_true", help="Recalcula los cubos por fecha desde cero."
+    )
+    parser.add_argument(
+        "--modelo-disperso",
+        action="store_true",
+        help="Valida además el modelo con matriz dispersa y k pliegues en paralelo.",
+    )
+    parser.add_argument(
+        "--variables-modelo",
+        nargs="+",
+        choices=("categoria", "id_producto", "ciudad", "medio_pago", "mes"),
+        default=["categoria"],
+        help="Variables categóricas del modelo disperso.",
+    )
+    parser.add_argument("--pliegues", type=int, default=5, help="Pliegues de la validación del modelo disperso.")
+    parser.add_argument(
+        "--rfm", action="store_true", help="Actualiza la segmentación RFM y exporta rfm_clientes.csv."
+    )
+    parser.add_argument(
+        "--rfm-kmeans", type=int, default=0, help="Clusters de k-means para la segmentación RFM (0 la omite)."
+    )
+    parser.add_argument(
+        "--canasta",
+        action="store_true",
+        help="Calcula los productos complementarios y exporta complementarios_producto/categoria.csv.",
+    )
+    parser.add_argument(
+        "--top-complementarios", type=int, default=5, help="Complementarios por producto o categoría."
+    )
+    parser.add_argument(
+        "--soporte-minimo",
+        type=float,
+        default=0.0,
+        help="Proporción mínima de tickets para productos y pares de la canasta.",
+    )
+    parser.add_argument(
+        "--aproximado",
+        action="store_true",
+        help="Guarda bocetos combinables de las métricas; con --por-bloques las calcula con ellos.",
+    )
+    parser.add_argument(
+        "--dag",
+        action="store_true",
+        help="Corre las etapas como grafo concurrente y omite las que no cambiaron desde la corrida anterior.",
+    )
+    parser.add_argument(
+        "--entrada", type=Path, default=None, help="Carpeta con los Excel (por defecto la del script)."
+    )
+    parser.add_argument(
+        "--destino", type=Path, default=None, help="Carpeta de los CSV, gráficos y modelos (por defecto --entrada)."
+    )
+    args = parser.parse_args()
+    main(
+        usar_cache=not args.sin_cache,
+        forzar_cache=args.reconstruir_cache,
+        por_bloques=args.por_bloques,
+        tamano_bloque=args.tamano_bloque,
+        procesos_graficos=args.procesos_graficos,
+        umbral_kde=args.umbral_kde,
+        muestrear_kde=not args.omitir_kde,
+        mostrar_memoria=args.reporte_memoria,
+        exportar_analitica=args.exportar_analitica,
+        formato_salida=args.salida,
+        ruta_almacen=args.almacen,
+        reemplazar_almacen=args.reemplazar_almacen,
+        mostrar_tiempos=args.tiempos,
+        registro_ejecucion=args.registro_ejecucion,
+        perfilar_etapa=args.perfilar,
+        particionar_mes=args.particionar_mes,
+        cubos=args.cubos or args.reconstruir_cubos,
+        reconstruir_cubos=args.reconstruir_cubos,
+        modelo_disperso=args.modelo_disperso,
+        variables_modelo=tuple(args.variables_modelo),
+        pliegues=args.pliegues,
+        rfm=args.rfm or args.rfm_kmeans > 0,
+        clusters_rfm=args.rfm_kmeans,
+        canasta=args.canasta,
+        top_complementarios=args.top_complementarios,
+        soporte_minimo=args.soporte_minimo,
+        aproximado=args.aproximado,
+        dag=args.dag,
+        entrada=args.entrada,
+        salida=args.destino,
+    )